@@ -17,6 +17,10 @@ def create_app():
     app.config['MAX_CONTENT_LENGTH'] = 32 * 1024 * 1024  # 32MB max file size
     app.config['JSON_SORT_KEYS'] = False
     
+    # Plan torch/tokenizer threading for this process (gunicorn's post_fork may already have)
+    from app.services.thread_plan import current_plan
+    current_plan()
+    
     # Register blueprints
     from app.routes.text_processing import text_bp
     from app.routes.health import health_bp
@@ -24,4 +28,12 @@ def create_app():
     app.register_blueprint(health_bp)
     app.register_blueprint(text_bp, url_prefix='/api')
     
+    # EXECUTION_MODE=compiled: load and compile models in the background, not on a request
+    from app.services.acceleration import start_background_warmup
+    start_background_warmup()
+    
+    # Start the analysis worker processes before the first large analyze request
+    from app.services.analysis_pool import start_pool_warmup
+    start_pool_warmup()
+    
     return app
\ No newline at end of file
@@ -0,0 +1,419 @@
+"""Offline bulk processing of document corpora.
+
+Streams documents from a JSONL file (one {"id", "text", ...options} object per
+line) or a directory of .txt/.md files, runs the requested tasks on a pool of
+worker processes and writes one result row per document as it completes:
+
+    python -m app.bulk --input archive.jsonl --output results.jsonl --tasks summarize,analyze
+    python -m app.bulk --input docs/ --output results.parquet --workers 4
+
+Models are loaded once in the parent before the pool forks, so workers share
+their memory copy-on-write. Progress is checkpointed next to the output;
+rerunning the same command resumes where an interrupted run stopped. At most
+--max-in-flight documents are held in memory at any time.
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import shutil
+import signal
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from app.models.document import Document
+from app.models.text_models import TextRequest
+from app.services.pipeline import TASKS
+from app.services.scheduler import BULK
+from app.services.thread_plan import configure_threads
+
+DOCUMENT_SUFFIXES = ('.txt', '.md')
+
+# Model each task needs, loaded up front with --preload
+# The summarize router may pick either summarization model
+TASK_MODELS = {
+    'summarize': ('summarizer', 'small_summarizer'),
+    'paraphrase': ('paraphraser',),
+    'analyze': ('sentiment_analyzer',),
+}
+
+CHECKPOINT_VERSION = 1
+
+
+def iter_documents(path: str, text_field: str = 'text', id_field: str = 'id',
+                   skip=None) -> Iterator[Tuple[int, Optional[Dict[str, Any]]]]:
+    """Yield (sequence number, item) in a stable order without reading the corpus into memory.
+
+    Items for which skip(seq) is true are yielded as None without being read or parsed.
+    """
+    skip = skip or (lambda seq: False)
+    if os.path.isdir(path):
+        seq = 0
+        for root, dirs, files in os.walk(path):
+            dirs.sort()
+            for name in sorted(files):
+                if not name.endswith(DOCUMENT_SUFFIXES):
+                    continue
+                if skip(seq):
+                    yield seq, None
+                else:
+                    file_path = os.path.join(root, name)
+                    with open(file_path, encoding='utf-8', errors='replace') as f:
+                        yield seq, {'id': os.path.relpath(file_path, path), 'text': f.read()}
+                seq += 1
+        return
+
+    with open(path, encoding='utf-8') as f:
+        seq = 0
+        for line in f:
+            if not line.strip():
+                continue
+            if skip(seq):
+                yield seq, None
+            else:
+                try:
+                    data = json.loads(line)
+                    item = {**data, 'id': data.get(id_field, seq), 'text': data.get(text_field, '')}
+                except (json.JSONDecodeError, AttributeError) as e:
+                    item = {'id': seq, 'text': '', 'error': f'Invalid JSON line: {e}'}
+                yield seq, item
+            seq += 1
+
+
+class Progress:
+    """Completed sequence numbers as a low watermark plus the few done above it"""
+
+    def __init__(self, completed_through: int = 0, done_above=()):
+        self.completed_through = completed_through
+        self.done_above = set(done_above)
+
+    def is_done(self, seq: int) -> bool:
+        return seq < self.completed_through or seq in self.done_above
+
+    def mark(self, seq: int):
+        self.done_above.add(seq)
+        while self.completed_through in self.done_above:
+            self.done_above.remove(self.completed_through)
+            self.completed_through += 1
+
+
+class JsonlWriter:
+    def __init__(self, path: str, position: int = 0):
+        self.path = path
+        mode = 'r+' if position and os.path.exists(path) else 'w'
+        self._file = open(path, mode, encoding='utf-8')
+        # Drop rows written after the last checkpoint; they will be produced again
+        self._file.seek(position)
+        self._file.truncate()
+
+    def write(self, row: Dict[str, Any]):
+        self._file.write(json.dumps(row, ensure_ascii=False) + '\n')
+
+    def flush(self) -> int:
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        return self._file.tell()
+
+    def close(self):
+        self._file.close()
+
+
+class ParquetWriter:
+    """Writes rows as part files of a Parquet dataset directory (requires pyarrow)"""
+
+    def __init__(self, path: str, position: int = 0, batch_size: int = 500):
+        import pyarrow
+        import pyarrow.parquet
+
+        self._pa = pyarrow
+        self._pq = pyarrow.parquet
+        self.path = path
+        self.batch_size = batch_size
+        self.parts = position
+        self._rows: List[Dict[str, Any]] = []
+        os.makedirs(path, exist_ok=True)
+        # Drop parts written after the last checkpoint
+        for name in os.listdir(path):
+            if name.startswith('part-') and name.endswith('.parquet') and int(name[5:-8]) >= position:
+                os.remove(os.path.join(path, name))
+
+    def write(self, row: Dict[str, Any]):
+        self._rows.append({
+            'id': str(row['id']),
+            'success': row['success'],
+            'error': row.get('error'),
+            'word_count': row.get('word_count'),
+            'processing_time': row.get('processing_time'),
+            'results': json.dumps(row.get('results', {}), ensure_ascii=False)
+        })
+        if len(self._rows) >= self.batch_size:
+            self._write_part()
+
+    def flush(self) -> int:
+        if self._rows:
+            self._write_part()
+        return self.parts
+
+    def close(self):
+        self.flush()
+
+    def _write_part(self):
+        table = self._pa.Table.from_pylist(self._rows)
+        self._pq.write_table(table, os.path.join(self.path, f'part-{self.parts:05d}.parquet'))
+        self.parts += 1
+        self._rows = []
+
+
+def load_checkpoint(path: str, input_path: str, tasks: List[str]) -> Optional[Dict[str, Any]]:
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        checkpoint = json.load(f)
+    if checkpoint.get('input') != os.path.abspath(input_path) or checkpoint.get('tasks') != tasks:
+        raise ValueError(f'{path} belongs to a different run (input or tasks differ); use --fresh to start over')
+    return checkpoint
+
+
+def save_checkpoint(path: str, checkpoint: Dict[str, Any]):
+    temp_path = f'{path}.tmp'
+    with open(temp_path, 'w') as f:
+        json.dump(checkpoint, f)
+    os.replace(temp_path, path)
+
+
+_service = None
+
+
+def _init_worker(backend: str, workers: int, counter, pool: bool = True):
+    """Give the worker its share of the CPUs and the (possibly inherited) TextService"""
+    global _service
+    if pool:
+        # Ctrl-C is handled by the parent, which checkpoints and lets in-flight work finish
+        signal.signal(signal.SIGINT, signal.SIG_IGN)
+        # The documents are already spread over processes; analysis runs in each of them
+        os.environ['ANALYSIS_WORKERS'] = '0'
+    os.environ['TEXT_SERVICE_BACKEND'] = backend
+    with counter.get_lock():
+        index = counter.value
+        counter.value += 1
+    configure_threads(workers=workers, worker_index=index)
+
+    from app.services.registry import get_text_service
+    _service = get_text_service()
+
+
+def process_document(seq: int, item: Dict[str, Any], tasks: List[str]) -> Dict[str, Any]:
+    """Run tasks on one document and return its result row"""
+    start_time = time.time()
+    row = {'id': item['id'], 'seq': seq, 'success': True, 'results': {}}
+    if item.get('error'):
+        return {**row, 'success': False, 'error': item['error']}
+    if not item['text'].strip():
+        return {**row, 'success': False, 'error': 'Text is required'}
+
+    doc = Document(item['text'])
+    text_request = TextRequest.from_dict(item)
+    for task in tasks:
+        try:
+            result = TASKS[task](_service, doc, text_request, BULK)
+            result.pop('original_text', None)
+        except Exception as e:
+            result = {'success': False, 'error': f'{task} failed: {str(e)}'}
+            row['success'] = False
+        row['results'][task] = result
+    row['word_count'] = doc.word_count
+    row['processing_time'] = round(time.time() - start_time, 3)
+    return row
+
+
+def preload_models(backend: str, tasks: List[str]):
+    """Create the TextService and load the task models before the pool forks"""
+    os.environ['TEXT_SERVICE_BACKEND'] = backend
+    from app.services.registry import get_text_service
+
+    service = get_text_service()
+    model_manager = getattr(service, 'model_manager', None)
+    if model_manager is None:
+        return
+    for task in tasks:
+        for name in TASK_MODELS[task]:
+            if name in model_manager:
+                print(f"📦 Preloading {name}")
+                model_manager.get(name)
+
+
+class Throughput:
+    def __init__(self, report_every: float):
+        self.report_every = report_every
+        self.started_at = time.time()
+        self.last_report = self.started_at
+        self.documents = 0
+        self.words = 0
+        self.errors = 0
+
+    def add(self, row: Dict[str, Any]):
+        self.documents += 1
+        self.words += row.get('word_count') or 0
+        if not row['success']:
+            self.errors += 1
+
+    def maybe_report(self, in_flight: int):
+        now = time.time()
+        if now - self.last_report >= self.report_every:
+            self.last_report = now
+            print(f"📈 {self.summary()}, {in_flight} in flight")
+
+    def summary(self) -> str:
+        elapsed = max(time.time() - self.started_at, 1e-9)
+        return (f"{self.documents} documents in {elapsed:.1f}s ({self.documents / elapsed:.2f} docs/s, "
+                f"{self.words / elapsed:.0f} words/s), {self.errors} errors")
+
+
+def run(args) -> int:
+    tasks = [task.strip() for task in args.tasks.split(',') if task.strip()]
+    output_format = args.format or ('parquet' if args.output.endswith('.parquet') else 'jsonl')
+    checkpoint_path = args.checkpoint or f'{args.output}.checkpoint.json'
+
+    if args.fresh:
+        for path in (checkpoint_path, args.output):
+            if os.path.isdir(path):
+                shutil.rmtree(path)
+            elif os.path.exists(path):
+                os.remove(path)
+
+    checkpoint = load_checkpoint(checkpoint_path, args.input, tasks)
+    if checkpoint:
+        progress = Progress(checkpoint['completed_through'], checkpoint['done_above'])
+        position = checkpoint['position']
+        processed = checkpoint['processed']
+        print(f"🔁 Resuming: {processed} documents already processed")
+    else:
+        progress, position, processed = Progress(), 0, 0
+
+    if output_format == 'parquet':
+        writer = ParquetWriter(args.output, position, args.batch_size)
+    else:
+        writer = JsonlWriter(args.output, position)
+
+    def checkpoint_now(pending: List[int]):
+        nonlocal processed
+        position = writer.flush()
+        for seq in pending:
+            progress.mark(seq)
+        processed += len(pending)
+        pending.clear()
+        save_checkpoint(checkpoint_path, {
+            'version': CHECKPOINT_VERSION,
+            'input': os.path.abspath(args.input),
+            'tasks': tasks,
+            'format': output_format,
+            'position': position,
+            'completed_through': progress.completed_through,
+            'done_above': sorted(progress.done_above),
+            'processed': processed
+        })
+
+    workers = args.workers
+    fork = 'fork' in multiprocessing.get_all_start_methods()
+    if args.preload and (fork or workers == 0):
+        preload_models(args.backend, tasks)
+
+    counter = multiprocessing.Value('i', 0)
+    documents = iter_documents(args.input, args.text_field, args.id_field, skip=progress.is_done)
+    throughput = Throughput(args.report_every)
+    pending: List[int] = []
+    print(f"🚀 Processing {args.input} with {workers or 'no'} worker processes, tasks: {', '.join(tasks)}")
+
+    def handle(row: Dict[str, Any]):
+        writer.write(row)
+        pending.append(row['seq'])
+        throughput.add(row)
+        if len(pending) >= args.checkpoint_every:
+            checkpoint_now(pending)
+
+    try:
+        if workers == 0:
+            _init_worker(args.backend, 1, counter, pool=False)
+            for seq, item in documents:
+                if item is not None:
+                    handle(process_document(seq, item, tasks))
+                    throughput.maybe_report(0)
+        else:
+            context = multiprocessing.get_context('fork' if fork else 'spawn')
+            with ProcessPoolExecutor(max_workers=workers, mp_context=context, initializer=_init_worker,
+                                     initargs=(args.backend, workers, counter)) as executor:
+                in_flight = set()
+                for seq, item in documents:
+                    if item is None:
+                        continue
+                    # Bound the documents held in memory, whatever the corpus size
+                    while len(in_flight) >= args.max_in_flight:
+                        done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                        for future in done:
+                            handle(future.result())
+                        throughput.maybe_report(len(in_flight))
+                    in_flight.add(executor.submit(process_document, seq, item, tasks))
+                while in_flight:
+                    done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        handle(future.result())
+                    throughput.maybe_report(len(in_flight))
+    except KeyboardInterrupt:
+        checkpoint_now(pending)
+        writer.close()
+        print(f"⏸️ Interrupted after {throughput.summary()}; rerun the same command to resume")
+        return 130
+
+    checkpoint_now(pending)
+    writer.close()
+    print(f"✅ {throughput.summary()}")
+    print(f"📄 Results: {args.output} ({processed} documents in total)")
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--input', required=True, help='JSONL file or directory of .txt/.md files')
+    parser.add_argument('--output', required=True, help='results .jsonl file or .parquet dataset directory')
+    parser.add_argument('--format', choices=('jsonl', 'parquet'), help='output format (default: from --output)')
+    parser.add_argument('--tasks', default='summarize,analyze', help=f"comma-separated: {', '.join(TASKS)}")
+    parser.add_argument('--backend', default=os.getenv('TEXT_SERVICE_BACKEND', 'full'),
+                        help='TextService backend (full, lite, mock, remote)')
+    parser.add_argument('--workers', type=int, default=max(1, (os.cpu_count() or 2) // 2),
+                        help='worker processes; 0 processes in this process')
+    parser.add_argument('--max-in-flight', type=int, default=0,
+                        help='documents submitted but not yet written (default: 4 per worker)')
+    parser.add_argument('--no-preload', dest='preload', action='store_false',
+                        help='let each worker load its own models instead of sharing them')
+    parser.add_argument('--text-field', default='text', help='JSONL field holding the text')
+    parser.add_argument('--id-field', default='id', help='JSONL field holding the document id')
+    parser.add_argument('--checkpoint', help='checkpoint file (default: OUTPUT.checkpoint.json)')
+    parser.add_argument('--checkpoint-every', type=int, default=100, help='documents between checkpoints')
+    parser.add_argument('--batch-size', type=int, default=500, help='rows per Parquet part file')
+    parser.add_argument('--report-every', type=float, default=10.0, help='seconds between throughput reports')
+    parser.add_argument('--fresh', action='store_true', help='discard the checkpoint and output and start over')
+    args = parser.parse_args()
+
+    unknown = [task for task in args.tasks.split(',') if task.strip() and task.strip() not in TASKS]
+    if unknown:
+        parser.error(f"unknown task(s): {', '.join(unknown)}")
+    if args.workers < 0:
+        parser.error('--workers must be 0 or more')
+    args.max_in_flight = args.max_in_flight or max(1, args.workers) * 4
+    if (args.format == 'parquet' or args.output.endswith('.parquet')) and args.format != 'jsonl':
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError:
+            parser.error('Parquet output requires pyarrow (pip install pyarrow)')
+
+    try:
+        return run(args)
+    except ValueError as e:
+        print(f"❌ {e}")
+        return 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,139 @@
+from bisect import bisect_left
+from functools import cached_property
+from typing import Any, Dict, Iterator, List, Optional, Tuple, Union
+
+from app.services.chunker import (
+    CHUNK_WORDS, Span, StreamingChunker, normalize_text, pack_chunks, sentence_spans
+)
+
+
+class Document:
+    """Parsed text shared by every pipeline stage of a request.
+
+    Everything is computed lazily and cached: the normalized text, sentence
+    spans (offsets into the normalized text, not copied strings), word counts,
+    chunk spans and token ids with offsets per tokenizer. A Document built from
+    an ingestion StreamingChunker reuses the work already done while the body
+    was streaming, so the text is parsed exactly once per request.
+    """
+
+    def __init__(self, text: str, chunker: Optional[StreamingChunker] = None):
+        self.raw = text
+        self._chunker = chunker if chunker is not None and chunker.closed else None
+        self._chunk_spans: Dict[int, List[Span]] = {}
+        self._tokens: Dict[int, Dict[str, Any]] = {}
+
+    @classmethod
+    def from_chunker(cls, text: str, chunker: StreamingChunker) -> 'Document':
+        return cls(text, chunker)
+
+    def __len__(self) -> int:
+        return len(self.raw)
+
+    def __getstate__(self) -> Dict[str, Any]:
+        """Pickle the parsed text (e.g. for inference workers) without tokenizer caches"""
+        self.normalized, self.sentence_spans, self.sentence_word_counts
+        state = self.__dict__.copy()
+        state['_chunker'] = None
+        state['_tokens'] = {}
+        return state
+
+    @cached_property
+    def normalized(self) -> str:
+        if self._chunker is not None:
+            return self._chunker.text
+        return normalize_text(self.raw)
+
+    @cached_property
+    def sentence_spans(self) -> List[Span]:
+        if self._chunker is not None:
+            return self._chunker.sentences
+        return sentence_spans(self.normalized)
+
+    @cached_property
+    def sentence_word_counts(self) -> List[int]:
+        if self._chunker is not None:
+            return self._chunker.sentence_word_counts
+        text = self.normalized
+        return [len(text[start:end].split()) for start, end in self.sentence_spans]
+
+    @cached_property
+    def word_count(self) -> int:
+        """Words in the normalized text"""
+        return sum(self.sentence_word_counts)
+
+    @cached_property
+    def raw_word_count(self) -> int:
+        """Words in the text as submitted (used for analysis statistics)"""
+        return len(self.raw.split())
+
+    @property
+    def parsed(self) -> bool:
+        """Whether the sentence spans are already known"""
+        return self._chunker is not None or 'sentence_spans' in self.__dict__
+
+    @property
+    def sentence_count(self) -> int:
+        return len(self.sentence_spans)
+
+    def text_at(self, span: Span) -> str:
+        start, end = span
+        return self.normalized[start:end]
+
+    def iter_sentences(self, span: Optional[Span] = None) -> Iterator[str]:
+        """Yield sentence strings, optionally only those inside span"""
+        for start, end in self.sentence_spans:
+            if span is None or (start >= span[0] and end <= span[1]):
+                yield self.normalized[start:end]
+
+    def chunk_spans(self, max_words: int = CHUNK_WORDS) -> List[Span]:
+        """Sentence-aligned chunks of at most max_words words"""
+        if max_words not in self._chunk_spans:
+            if self._chunker is not None and self._chunker.max_words == max_words:
+                spans = self._chunker.chunk_spans
+            else:
+                spans = pack_chunks(self.sentence_spans, self.sentence_word_counts, max_words)
+            self._chunk_spans[max_words] = spans
+        return self._chunk_spans[max_words]
+
+    def chunks(self, max_words: int = CHUNK_WORDS) -> List[str]:
+        return [self.text_at(span) for span in self.chunk_spans(max_words)]
+
+    def token_ids(self, tokenizer) -> Tuple[List[int], Optional[List[Span]]]:
+        """Token ids (without special tokens) and character offsets for the
+        normalized text; offsets are None for tokenizers that can't provide them"""
+        key = id(tokenizer)
+        cached = self._tokens.get(key)
+        if cached is None or cached['tokenizer'] is not tokenizer:
+            if getattr(tokenizer, 'is_fast', False):
+                encoding = tokenizer(self.normalized, add_special_tokens=False,
+                                     return_offsets_mapping=True, verbose=False)
+                offsets = [tuple(o) for o in encoding['offset_mapping']]
+            else:
+                encoding = tokenizer(self.normalized, add_special_tokens=False, verbose=False)
+                offsets = None
+            cached = {
+                'tokenizer': tokenizer,
+                'ids': encoding['input_ids'],
+                'offsets': offsets,
+                'starts': [o[0] for o in offsets] if offsets is not None else None
+            }
+            self._tokens[key] = cached
+        return cached['ids'], cached['offsets']
+
+    def span_token_ids(self, tokenizer, span: Span) -> List[int]:
+        """Token ids covering span, sliced from the whole-document encoding"""
+        ids, offsets = self.token_ids(tokenizer)
+        if offsets is None:
+            return tokenizer(self.text_at(span), add_special_tokens=False, verbose=False)['input_ids']
+        starts = self._tokens[id(tokenizer)]['starts']
+        start, end = span
+        return ids[bisect_left(starts, start):bisect_left(starts, end)]
+
+    def token_count(self, tokenizer) -> int:
+        return len(self.token_ids(tokenizer)[0])
+
+
+def as_document(text: Union[str, Document]) -> Document:
+    """Accept either raw text or an existing Document"""
+    return text if isinstance(text, Document) else Document(text)
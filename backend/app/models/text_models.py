@@ -8,6 +8,10 @@ class TextRequest:
     max_length: Optional[int] = 150
     min_length: Optional[int] = 30
     variations: Optional[int] = 1
+    tier: Optional[str] = None
+    seed: Optional[int] = None
+    page: Optional[int] = 0
+    preset: Optional[str] = None
     
     @classmethod
     def from_dict(cls, data: Dict[str, Any]) -> 'TextRequest':
@@ -15,8 +19,22 @@ class TextRequest:
             text=data.get('text', ''),
             max_length=data.get('max_length', 150),
             min_length=data.get('min_length', 30),
-            variations=data.get('variations', 1)
+            variations=data.get('variations', 1),
+            tier=data.get('tier'),
+            seed=data.get('seed'),
+            page=data.get('page', 0),
+            preset=data.get('preset')
         )
+    
+    def paging_error(self) -> Optional[str]:
+        """Why seed/page are invalid, if they are"""
+        if self.seed is not None and (not isinstance(self.seed, int) or isinstance(self.seed, bool)):
+            return 'seed must be an integer'
+        if not isinstance(self.page, int) or isinstance(self.page, bool) or self.page < 0:
+            return 'page must be a non-negative integer'
+        if self.page and self.seed is None:
+            return 'page requires a seed'
+        return None
 
 @dataclass
 class TextResponse:
@@ -1,5 +1,13 @@
-from flask import Blueprint, jsonify
+from flask import Blueprint, jsonify, request
 import datetime
+from app.services.registry import backend_name, peek_text_service
+from app.services.thread_plan import current_plan
+from app.services.scheduler import get_scheduler, is_admin
+from app.services.analysis_pool import peek_analysis_pool
+from app.services.accounting import get_ledger
+from app.services.router import peek_router
+from app.services.decoding import DECODING_PRESETS, default_preset_name
+from app.services.live_analysis import peek_live_analysis
 
 health_bp = Blueprint('health', __name__)
 
@@ -13,16 +21,75 @@ def health_check():
         'timestamp': datetime.datetime.utcnow().isoformat(),
         'endpoints': {
             'summarize': '/api/summarize',
+            'summarize_multi': '/api/summarize/multi',
             'paraphrase': '/api/paraphrase',
-            'analyze': '/api/analyze'
+            'analyze': '/api/analyze',
+            'analyze_session': '/api/analyze/session',
+            'process': '/api/process'
         }
     }), 200
 
 @health_bp.route('/status', methods=['GET'])
 def status():
     """Service status endpoint"""
-    return jsonify({
+    text_service = peek_text_service()
+    
+    result = {
         'service': 'Rephrasely API',
         'status': 'running',
-        'uptime': 'online'
-    }), 200
\ No newline at end of file
+        'uptime': 'online',
+        'backend': backend_name(),
+        'threads': current_plan().to_dict(),
+        'scheduler': get_scheduler().status(),
+        'decoding': {
+            'default_preset': default_preset_name(),
+            'presets': {name: preset.to_dict() for name, preset in DECODING_PRESETS.items()}
+        }
+    }
+    
+    model_manager = getattr(text_service, 'model_manager', None)
+    if model_manager is not None:
+        result['models'] = model_manager.status()
+    
+    model_store = getattr(text_service, 'model_store', None)
+    if model_store is not None:
+        result['model_store'] = model_store.status()
+    
+    accelerator = getattr(text_service, 'accelerator', None)
+    if accelerator is not None:
+        result['execution'] = accelerator.status()
+    
+    encoder_cache = getattr(text_service, 'encoder_cache', None)
+    if encoder_cache is not None:
+        result['encoder_cache'] = encoder_cache.status()
+    
+    if hasattr(text_service, 'similarity_status'):
+        result['similarity_cache'] = text_service.similarity_status()
+    
+    if hasattr(text_service, 'simulation_status'):
+        result['simulation'] = text_service.simulation_status()
+    
+    analysis_pool = peek_analysis_pool()
+    if analysis_pool is not None:
+        result['analysis_pool'] = analysis_pool.status()
+    
+    router = peek_router()
+    if router is not None:
+        result['router'] = router.status()
+    
+    live_analysis = peek_live_analysis()
+    if live_analysis is not None:
+        result['live_analysis'] = live_analysis.status()
+    
+    if hasattr(text_service, 'worker_status'):
+        result['workers'] = text_service.worker_status()
+    
+    return jsonify(result), 200
+
+@health_bp.route('/usage', methods=['GET'])
+def usage():
+    """Resource usage per API key (hashed), heaviest CPU users first; admin keys only"""
+    if not is_admin(request.headers):
+        return jsonify({'error': 'Usage is only available to keys listed in ADMIN_API_KEYS'}), 403
+    limit = request.args.get('limit', 50, type=int)
+    return jsonify(get_ledger().status(limit=limit)), 200
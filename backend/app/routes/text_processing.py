@@ -1,19 +1,77 @@
-from flask import Blueprint, request, jsonify
-from app.services.text_service_mock import TextService
+from flask import Blueprint, current_app, g, request, jsonify
 from app.models.text_models import TextRequest, TextResponse
+from app.models.document import Document
+from app.services.ingestion import read_text_request, read_documents_request, IngestionError
+from app.services.registry import get_text_service
+from app.services.pipeline import TASKS, run_tasks
+from app.services.multi_document import summarize_documents
+from app.services.decoding import DecodingError
+from app.services.live_analysis import LiveAnalysisError, get_live_analysis
+from app.services.remote_service import WorkerAuthenticationError
+from app.services.router import RoutingError, get_router
+from app.services.scheduler import api_key, is_admin, request_priority
+from app.services import accounting
 import traceback
 
 text_bp = Blueprint('text_processing', __name__)
-text_service = TextService()
+
+def _truthy(value):
+    return (value or '').strip().lower() in ('1', 'true', 'yes')
+
+def _request_text(data):
+    """The body's text without surrounding whitespace, so every endpoint counts the same characters"""
+    return (data.get('text') or '').strip()
+
+@text_bp.before_request
+def start_accounting():
+    """Measure every request; profile it if an admin asks to (X-Profile) or sampled"""
+    g.usage, g.usage_token = accounting.start()
+    g.usage.tenant = accounting.key_id(api_key(request.headers))
+    profiler = accounting.get_profiler()
+    wanted = profiler.wanted(request.headers.get('X-Profile'), admin=is_admin(request.headers))
+    g.profiler = profiler.start() if wanted else None
+
+@text_bp.after_request
+def finish_accounting(response):
+    """Record usage per API key and add it to the response if X-Include-Usage is set"""
+    usage = g.pop('usage', None)
+    if usage is None:
+        return response
+    # Label by route, not path, so ids in the URL don't create a ledger entry each
+    rule = request.url_rule.rule if request.url_rule is not None else '/api/unmatched'
+    endpoint = '_'.join(part for part in rule.split('/api/', 1)[-1].split('/') if not part.startswith('<'))
+    profiler = g.pop('profiler', None)
+    if profiler is not None:
+        usage.profile = accounting.get_profiler().stop(profiler, endpoint)
+    accounting.finish(usage, g.pop('usage_token'))
+    accounting.get_ledger().add(accounting.key_id(api_key(request.headers)), endpoint, usage,
+                                failed=response.status_code >= 400)
+    
+    if _truthy(request.headers.get('X-Include-Usage')) and response.is_json:
+        body = response.get_json(silent=True)
+        if isinstance(body, dict):
+            body['usage'] = usage.to_dict()
+            response.set_data(current_app.json.dumps(body))
+    return response
+
+@text_bp.teardown_request
+def discard_accounting(error=None):
+    """Release the profiler and usage context if the response was never finished"""
+    profiler = g.pop('profiler', None)
+    if profiler is not None:
+        accounting.get_profiler().stop(profiler, 'aborted')
+    if 'usage' in g:
+        accounting.finish(g.pop('usage'), g.pop('usage_token'))
 
 @text_bp.route('/summarize', methods=['POST'])
 def summarize_text():
     """Summarize text endpoint"""
     try:
-        # Get request data
-        data = request.get_json()
-        if not data:
-            return jsonify({'error': 'No data provided'}), 400
+        # Stream the request body into the chunker
+        try:
+            data, chunker = read_text_request(request)
+        except IngestionError as e:
+            return jsonify({'error': str(e)}), e.status_code
         
         text_request = TextRequest.from_dict(data)
         
@@ -21,17 +79,20 @@ def summarize_text():
         if not text_request.text or not text_request.text.strip():
             return jsonify({'error': 'Text is required'}), 400
         
-        # Calculate approximate word count (average 5 characters per word)
-        estimated_words = len(text_request.text) / 5
-        if estimated_words > 15000:
-            return jsonify({'error': 'Text too long. Maximum 15,000 words (approximately 75,000 characters) allowed'}), 400
-        
-        # Process summarization
-        result = text_service.summarize(
-            text_request.text,
-            max_length=text_request.max_length,
-            min_length=text_request.min_length
-        )
+        # The router picks the tier from the input length and queue depth (unless
+        # one is pinned) and waits for a scheduler slot if that tier needs a model
+        try:
+            result = get_router().summarize(
+                get_text_service(),
+                Document.from_chunker(text_request.text, chunker),
+                max_length=text_request.max_length,
+                min_length=text_request.min_length,
+                priority=request_priority(request.headers),
+                tier=text_request.tier,
+                preset=text_request.preset
+            )
+        except (RoutingError, DecodingError) as e:
+            return jsonify({'error': str(e)}), 400
         
         response = TextResponse(
             success=True,
@@ -43,8 +104,10 @@ def summarize_text():
             compression_ratio=result['compression_ratio']
         )
         
-        return jsonify(response.to_dict()), 200
+        return jsonify({**response.to_dict(), 'routing': result['routing']}), 200
         
+    except WorkerAuthenticationError:
+        raise
     except Exception as e:
         print(f"Error in summarize_text: {str(e)}")
         print(traceback.format_exc())
@@ -53,14 +116,52 @@ def summarize_text():
             'error': f'Processing failed: {str(e)}'
         }), 500
 
+@text_bp.route('/summarize/multi', methods=['POST'])
+def summarize_multiple():
+    """Summarize a set of related documents into one summary"""
+    try:
+        try:
+            data, documents = read_documents_request(request)
+        except IngestionError as e:
+            return jsonify({'error': str(e)}), e.status_code
+        
+        text_request = TextRequest.from_dict(data)
+        
+        # Each summary is routed (and takes its own scheduler slot) inside summarize_documents
+        try:
+            result = summarize_documents(
+                get_text_service(),
+                documents,
+                max_length=text_request.max_length,
+                min_length=text_request.min_length,
+                priority=request_priority(request.headers),
+                tier=text_request.tier,
+                preset=text_request.preset
+            )
+        except (RoutingError, DecodingError) as e:
+            return jsonify({'error': str(e)}), 400
+        
+        return jsonify({'success': True, **result}), 200
+        
+    except WorkerAuthenticationError:
+        raise
+    except Exception as e:
+        print(f"Error in summarize_multiple: {str(e)}")
+        print(traceback.format_exc())
+        return jsonify({
+            'success': False,
+            'error': f'Processing failed: {str(e)}'
+        }), 500
+
 @text_bp.route('/paraphrase', methods=['POST'])
 def paraphrase_text():
     """Paraphrase text endpoint"""
     try:
-        # Get request data
-        data = request.get_json()
-        if not data:
-            return jsonify({'error': 'No data provided'}), 400
+        # Stream the request body into the chunker
+        try:
+            data, chunker = read_text_request(request)
+        except IngestionError as e:
+            return jsonify({'error': str(e)}), e.status_code
         
         text_request = TextRequest.from_dict(data)
         
@@ -68,16 +169,24 @@ def paraphrase_text():
         if not text_request.text or not text_request.text.strip():
             return jsonify({'error': 'Text is required'}), 400
         
-        # Calculate approximate word count (average 5 characters per word)
-        estimated_words = len(text_request.text) / 5
-        if estimated_words > 15000:
-            return jsonify({'error': 'Text too long. Maximum 15,000 words (approximately 75,000 characters) allowed'}), 400
+        paging_error = text_request.paging_error()
+        if paging_error:
+            return jsonify({'error': paging_error}), 400
         
-        # Process paraphrasing
-        result = text_service.paraphrase(
-            text_request.text,
-            num_return_sequences=text_request.variations or 1
-        )
+        # Queued shortest-predicted-first within the priority class; the prediction
+        # and ETA come back under 'routing'
+        try:
+            result = get_router().paraphrase(
+                get_text_service(),
+                Document.from_chunker(text_request.text, chunker),
+                num_return_sequences=text_request.variations or 1,
+                seed=text_request.seed,
+                page=text_request.page,
+                priority=request_priority(request.headers),
+                preset=text_request.preset
+            )
+        except DecodingError as e:
+            return jsonify({'error': str(e)}), 400
         
         response = TextResponse(
             success=True,
@@ -89,8 +198,13 @@ def paraphrase_text():
             variations=result.get('variations', [])
         )
         
-        return jsonify(response.to_dict()), 200
+        body = {**response.to_dict(), 'routing': result['routing']}
+        if text_request.seed is not None:
+            body.update({'seed': text_request.seed, 'page': text_request.page})
+        return jsonify(body), 200
         
+    except WorkerAuthenticationError:
+        raise
     except Exception as e:
         print(f"Error in paraphrase_text: {str(e)}")
         print(traceback.format_exc())
@@ -103,24 +217,37 @@ def paraphrase_text():
 def analyze_text():
     """Analyze text endpoint"""
     try:
-        # Get request data
-        data = request.get_json()
-        if not data:
-            return jsonify({'error': 'No data provided'}), 400
+        # Stream the request body into the chunker
+        try:
+            data, chunker = read_text_request(request)
+        except IngestionError as e:
+            return jsonify({'error': str(e)}), e.status_code
         
-        text = data.get('text', '').strip()
+        text = _request_text(data)
         if not text:
             return jsonify({'error': 'Text is required'}), 400
         
-        # Process analysis
-        result = text_service.analyze(text)
+        # VADER when the lexicon is confident, the sentiment model otherwise (unless a tier is pinned)
+        try:
+            result = get_router().analyze(
+                get_text_service(),
+                Document.from_chunker(text, chunker),
+                priority=request_priority(request.headers),
+                tier=data.get('tier')
+            )
+        except RoutingError as e:
+            return jsonify({'error': str(e)}), 400
+        routing = result.pop('routing')
         
         return jsonify({
             'success': True,
             'analysis': result,
+            'routing': routing,
             'text_length': len(text)
         }), 200
         
+    except WorkerAuthenticationError:
+        raise
     except Exception as e:
         print(f"Error in analyze_text: {str(e)}")
         print(traceback.format_exc())
@@ -129,10 +256,145 @@ def analyze_text():
             'error': f'Analysis failed: {str(e)}'
         }), 500
 
+@text_bp.route('/analyze/session', methods=['POST'])
+def create_analysis_session():
+    """Start a live analysis session for text that will be edited"""
+    try:
+        try:
+            data, _ = read_text_request(request)
+        except IngestionError as e:
+            return jsonify({'error': str(e)}), e.status_code
+        
+        text = data.get('text', '')
+        if not isinstance(text, str):
+            return jsonify({'error': 'Text must be a string'}), 400
+        
+        try:
+            session = get_live_analysis().create(text)
+        except LiveAnalysisError as e:
+            return jsonify({'error': str(e)}), e.status_code
+        
+        return jsonify({
+            'success': True,
+            'session_id': session.session_id,
+            'version': session.version,
+            'analysis': session.analysis()
+        }), 201
+        
+    except Exception as e:
+        print(f"Error in create_analysis_session: {str(e)}")
+        print(traceback.format_exc())
+        return jsonify({
+            'success': False,
+            'error': f'Analysis failed: {str(e)}'
+        }), 500
+
+@text_bp.route('/analyze/session/<session_id>/edits', methods=['POST'])
+def edit_analysis_session(session_id):
+    """Apply edits ({offset, length, text}) to a session; only touched paragraphs are re-analyzed"""
+    try:
+        data = request.get_json(silent=True) or {}
+        edits = data.get('edits')
+        if not isinstance(edits, list) or not edits:
+            return jsonify({'error': 'edits must be a non-empty list'}), 400
+        version = data.get('version')
+        if version is not None and (not isinstance(version, int) or isinstance(version, bool)):
+            return jsonify({'error': 'version must be an integer'}), 400
+        
+        try:
+            result = get_live_analysis().edit(session_id, edits, version)
+        except LiveAnalysisError as e:
+            return jsonify({'error': str(e)}), e.status_code
+        
+        return jsonify({'success': True, **result}), 200
+        
+    except Exception as e:
+        print(f"Error in edit_analysis_session: {str(e)}")
+        print(traceback.format_exc())
+        return jsonify({
+            'success': False,
+            'error': f'Analysis failed: {str(e)}'
+        }), 500
+
+@text_bp.route('/analyze/session/<session_id>', methods=['GET'])
+def get_analysis_session(session_id):
+    """Current analysis (and, with ?text=true, the text) of a session"""
+    try:
+        session = get_live_analysis().get(session_id)
+    except LiveAnalysisError as e:
+        return jsonify({'error': str(e)}), e.status_code
+    
+    with session.lock:
+        body = {
+            'success': True,
+            'session_id': session.session_id,
+            'version': session.version,
+            'analysis': session.analysis()
+        }
+        if _truthy(request.args.get('text')):
+            body['text'] = session.text
+    return jsonify(body), 200
+
+@text_bp.route('/analyze/session/<session_id>', methods=['DELETE'])
+def delete_analysis_session(session_id):
+    """End a live analysis session"""
+    if not get_live_analysis().delete(session_id):
+        return jsonify({'error': f"Unknown or expired session '{session_id}'"}), 404
+    return jsonify({'success': True}), 200
+
+@text_bp.route('/process', methods=['POST'])
+def process_text():
+    """Run several tasks (summarize, paraphrase, analyze) on one text in a single pass"""
+    try:
+        # Stream the request body into the chunker
+        try:
+            data, chunker = read_text_request(request)
+        except IngestionError as e:
+            return jsonify({'error': str(e)}), e.status_code
+        
+        text_request = TextRequest.from_dict(data)
+        # Stripped as /api/analyze does, so the analyze task reports the same counts
+        text_request.text = _request_text(data)
+        
+        # Validate input
+        if not text_request.text:
+            return jsonify({'error': 'Text is required'}), 400
+        
+        tasks = data.get('tasks') or ['summarize', 'analyze']
+        if not isinstance(tasks, list) or any(not isinstance(task, str) or task not in TASKS for task in tasks):
+            return jsonify({'error': f"tasks must be a list drawn from: {', '.join(TASKS)}"}), 400
+        tasks = list(dict.fromkeys(tasks))
+        
+        result = run_tasks(
+            get_text_service(),
+            Document.from_chunker(text_request.text, chunker),
+            tasks,
+            text_request,
+            priority=request_priority(request.headers)
+        )
+        
+        return jsonify(result), 200
+        
+    except WorkerAuthenticationError:
+        raise
+    except Exception as e:
+        print(f"Error in process_text: {str(e)}")
+        print(traceback.format_exc())
+        return jsonify({
+            'success': False,
+            'error': f'Processing failed: {str(e)}'
+        }), 500
+
 @text_bp.errorhandler(413)
 def file_too_large(error):
     return jsonify({'error': 'File too large'}), 413
 
+@text_bp.errorhandler(WorkerAuthenticationError)
+def worker_authentication_failed(error):
+    print(f"❌ {error}")
+    return jsonify({'success': False, 'error': 'Inference workers rejected this server; '
+                                               'INFERENCE_AUTHKEY does not match'}), 503
+
 @text_bp.errorhandler(400)
 def bad_request(error):
     return jsonify({'error': 'Bad request'}), 400
\ No newline at end of file
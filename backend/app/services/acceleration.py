@@ -0,0 +1,223 @@
+import os
+import threading
+import time
+from contextlib import nullcontext
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+EAGER = 'eager'
+COMPILED = 'compiled'
+EXECUTION_MODES = (EAGER, COMPILED)
+
+# Encoder input lengths are padded up to one of these, so each compiled
+# graph sees a handful of static shapes that are all traced during warm-up
+DEFAULT_BUCKETS = (64, 128, 256, 512, 1024)
+
+# Decoder steps generated per bucket during warm-up
+WARMUP_NEW_TOKENS = 4
+
+
+def execution_mode() -> str:
+    mode = os.getenv('EXECUTION_MODE', EAGER).lower()
+    if mode not in EXECUTION_MODES:
+        print(f"⚠️ Unknown EXECUTION_MODE '{mode}', using {EAGER}")
+        return EAGER
+    return mode
+
+
+def padding_buckets() -> List[int]:
+    spec = os.getenv('PAD_BUCKETS')
+    if not spec:
+        return list(DEFAULT_BUCKETS)
+    return sorted({int(part) for part in spec.split(',') if part.strip()})
+
+
+def bucket_length(length: int, buckets: List[int]) -> int:
+    """Smallest bucket that fits length; lengths beyond the last bucket are not padded"""
+    for bucket in buckets:
+        if length <= bucket:
+            return bucket
+    return length
+
+
+def cpu_supports_bf16() -> bool:
+    """True if the CPU has native bf16 instructions (AVX512-BF16 or AMX)"""
+    try:
+        with open('/proc/cpuinfo') as f:
+            flags = f.read()
+    except OSError:
+        return False
+    return 'avx512_bf16' in flags or 'amx_bf16' in flags
+
+
+class Accelerator:
+    """Optional optimized execution for the TextService models.
+
+    In eager mode (the default) every method is a no-op. In compiled mode
+    models are loaded with scaled-dot-product attention where the
+    architecture supports it, their encoder/decoder forwards are wrapped in
+    torch.compile, inputs are padded to fixed length buckets, and inference
+    runs under bf16 autocast on CPUs with native bf16 support. Compilation is
+    triggered by warm_up_* right after a model loads, one pass per bucket.
+    """
+
+    def __init__(self, mode: Optional[str] = None, buckets: Optional[List[int]] = None,
+                 bf16: Optional[bool] = None):
+        self.mode = mode or execution_mode()
+        self.buckets = buckets or padding_buckets()
+        if bf16 is None:
+            setting = os.getenv('EXECUTION_BF16', 'auto').lower()
+            bf16 = cpu_supports_bf16() if setting == 'auto' else setting == 'true'
+        self.bf16 = self.compiled and bf16
+        self._models: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def compiled(self) -> bool:
+        return self.mode == COMPILED
+
+    def load(self, factory: Callable[..., Any], *args, **kwargs) -> Any:
+        """Call a from_pretrained method or transformers.pipeline, asking for SDPA
+        attention in compiled mode and falling back to the default attention if
+        the architecture doesn't support it"""
+        if not self.compiled:
+            return factory(*args, **kwargs)
+        attention = {'attn_implementation': 'sdpa'}
+        if getattr(factory, '__name__', '') == 'pipeline':
+            attention = {'model_kwargs': {**kwargs.get('model_kwargs', {}), **attention}}
+        try:
+            return factory(*args, **{**kwargs, **attention})
+        except (ValueError, TypeError) as e:
+            print(f"⚠️ SDPA attention unavailable, using the default: {e}")
+            return factory(*args, **kwargs)
+
+    def prepare(self, name: str, model) -> Any:
+        """Wrap the model's forward passes in torch.compile (compiled lazily on first call)"""
+        if not self.compiled:
+            return model
+        import torch
+
+        if not hasattr(torch, 'compile'):
+            print("⚠️ torch.compile is not available in this torch version; running eagerly")
+            return model
+        if model.config.is_encoder_decoder:
+            # Encoder inputs are bucketed (static); the decoder grows a token per step
+            encoder = model.get_encoder()
+            encoder.forward = torch.compile(encoder.forward, dynamic=False)
+            decoder = model.get_decoder()
+            decoder.forward = torch.compile(decoder.forward, dynamic=True)
+        else:
+            model.forward = torch.compile(model.forward, dynamic=False)
+        with self._lock:
+            self._models[name] = {
+                'attention': getattr(model.config, '_attn_implementation', 'eager'),
+                'compiled': True,
+                'warmup_seconds': None,
+                'buckets': []
+            }
+        return model
+
+    def autocast(self):
+        """bf16 autocast for CPU inference when enabled, otherwise a no-op"""
+        if not self.bf16:
+            return nullcontext()
+        import torch
+        return torch.autocast(device_type='cpu', dtype=torch.bfloat16)
+
+    def input_tensors(self, input_ids: List[int], pad_token_id: int, device) -> Tuple[Any, Any]:
+        """Batch-of-one input and attention mask, right-padded to a bucket in compiled mode"""
+        import torch
+
+        length = len(input_ids)
+        padded = bucket_length(length, self.buckets) if self.compiled else length
+        ids = list(input_ids) + [pad_token_id] * (padded - length)
+        mask = [1] * length + [0] * (padded - length)
+        return torch.tensor([ids], device=device), torch.tensor([mask], device=device)
+
+    def classifier_kwargs(self, tokenizer, text: str) -> Dict[str, Any]:
+        """Pipeline tokenizer options that pad classifier inputs to a bucket"""
+        if not self.compiled:
+            return {}
+        length = len(tokenizer(text, truncation=True, verbose=False)['input_ids'])
+        return {'padding': 'max_length', 'truncation': True,
+                'max_length': bucket_length(length, self.buckets)}
+
+    def warm_up_generation(self, name: str, model, tokenizer, **generate_kwargs):
+        """Trace the compiled encoder for every bucket the model accepts, and the
+        decoder with the decoding settings requests will use"""
+        if name not in self._models:
+            return
+        import torch
+
+        # T5-style configs have no max_position_embeddings (relative positions)
+        limit = min(tokenizer.model_max_length,
+                    getattr(model.config, 'max_position_embeddings', tokenizer.model_max_length))
+        filler = tokenizer('warm up', add_special_tokens=False)['input_ids'] or [tokenizer.eos_token_id]
+        pad_token_id = tokenizer.pad_token_id if tokenizer.pad_token_id is not None else tokenizer.eos_token_id
+        start = time.time()
+        warmed = []
+        for bucket in self.buckets:
+            if bucket > limit:
+                break
+            ids = (filler * bucket)[:bucket]
+            input_ids, attention_mask = self.input_tensors(ids, pad_token_id, model.device)
+            try:
+                with torch.no_grad(), self.autocast():
+                    model.generate(input_ids, attention_mask=attention_mask, pad_token_id=pad_token_id,
+                                   **{**generate_kwargs, 'max_new_tokens': WARMUP_NEW_TOKENS, 'min_length': 0})
+            except Exception as e:
+                # The model still works; this bucket is compiled on first use instead
+                print(f"⚠️ Warm-up of {name} failed for bucket {bucket}: {e}")
+                continue
+            warmed.append(bucket)
+        self._finish_warmup(name, warmed, time.time() - start)
+
+    def warm_up_classifier(self, name: str, classifier):
+        if name not in self._models:
+            return
+        tokenizer = classifier.tokenizer
+        limit = min(tokenizer.model_max_length, classifier.model.config.max_position_embeddings - 2)
+        start = time.time()
+        warmed = []
+        for bucket in self.buckets:
+            if bucket > limit:
+                break
+            try:
+                with self.autocast():
+                    classifier('warm up', padding='max_length', truncation=True, max_length=bucket)
+            except Exception as e:
+                print(f"⚠️ Warm-up of {name} failed for bucket {bucket}: {e}")
+                continue
+            warmed.append(bucket)
+        self._finish_warmup(name, warmed, time.time() - start)
+
+    def status(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'mode': self.mode,
+                'bf16_autocast': self.bf16,
+                'buckets': self.buckets if self.compiled else [],
+                'models': {name: dict(info) for name, info in self._models.items()}
+            }
+
+    def _finish_warmup(self, name: str, buckets: List[int], seconds: float):
+        with self._lock:
+            self._models[name]['buckets'] = buckets
+            self._models[name]['warmup_seconds'] = round(seconds, 2)
+        print(f"🔥 Compiled {name} for buckets {buckets} in {seconds:.1f}s")
+
+
+def start_background_warmup():
+    """In compiled mode, load and compile the models in the background at startup
+    so that no request pays for compilation (EXECUTION_WARMUP=false disables)"""
+    if execution_mode() != COMPILED or os.getenv('EXECUTION_WARMUP', 'true').lower() != 'true':
+        return None
+
+    def warm_up():
+        from app.services.registry import get_text_service
+        service = get_text_service()
+        if hasattr(service, 'warmup'):
+            service.warmup()
+
+    thread = threading.Thread(target=warm_up, name='model-warmup', daemon=True)
+    thread.start()
+    return thread
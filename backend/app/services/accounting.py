@@ -0,0 +1,296 @@
+import hashlib
+import os
+import random
+import resource
+import sys
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from app.services.model_manager import _current_rss
+
+# Amounts that several threads (and worker processes) add to during one request
+COUNTERS = (
+    'thread_cpu_seconds', 'worker_cpu_seconds', 'queue_wait_seconds',
+    'tokens_in', 'tokens_out', 'chunks', 'model_calls'
+)
+
+_current: ContextVar[Optional['Usage']] = ContextVar('request_usage', default=None)
+
+
+def _peak_rss() -> int:
+    """Peak resident set size of this process in bytes"""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+class Usage:
+    """Resources used by one request.
+
+    thread_cpu_seconds is CPU time of the threads that worked on the request
+    (the request thread plus executor threads running its tasks);
+    worker_cpu_seconds is CPU time spent for it in analysis pool or inference
+    worker processes. process_cpu_seconds is the whole process's CPU time
+    while the request ran, so it includes concurrent requests. Memory can
+    only be measured per process: peak_memory_delta_mb is how far the request
+    raised the process's peak RSS, rss_delta_mb the change in RSS.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._started = time.perf_counter()
+        self._thread_start = time.thread_time()
+        self._process_start = time.process_time()
+        self._peak_start = _peak_rss()
+        self._rss_start = _current_rss()
+        for name in COUNTERS:
+            setattr(self, name, 0.0 if name.endswith('seconds') else 0)
+        self.wall_seconds = 0.0
+        self.process_cpu_seconds = 0.0
+        self.peak_memory_delta_mb = 0.0
+        self.rss_delta_mb = 0.0
+        self.profile: Optional[str] = None
+        # key_id of the caller, so per-tenant state (e.g. cached results) isn't shared across keys
+        self.tenant = 'anonymous'
+
+    def add(self, **amounts):
+        with self._lock:
+            for name, amount in amounts.items():
+                setattr(self, name, getattr(self, name) + amount)
+
+    def finish(self):
+        """Close the measurement; call from the thread that created the Usage"""
+        self.add(thread_cpu_seconds=time.thread_time() - self._thread_start)
+        self.wall_seconds = time.perf_counter() - self._started
+        self.process_cpu_seconds = time.process_time() - self._process_start
+        self.peak_memory_delta_mb = (_peak_rss() - self._peak_start) / (1024 * 1024)
+        self.rss_delta_mb = (_current_rss() - self._rss_start) / (1024 * 1024)
+
+    @property
+    def cpu_seconds(self) -> float:
+        return self.thread_cpu_seconds + self.worker_cpu_seconds
+
+    def to_dict(self) -> Dict[str, Any]:
+        result = {
+            'wall_seconds': round(self.wall_seconds, 4),
+            'cpu_seconds': round(self.cpu_seconds, 4),
+            'thread_cpu_seconds': round(self.thread_cpu_seconds, 4),
+            'worker_cpu_seconds': round(self.worker_cpu_seconds, 4),
+            'process_cpu_seconds': round(self.process_cpu_seconds, 4),
+            'queue_wait_seconds': round(self.queue_wait_seconds, 4),
+            'peak_memory_delta_mb': round(self.peak_memory_delta_mb, 1),
+            'rss_delta_mb': round(self.rss_delta_mb, 1),
+            'tokens_in': self.tokens_in,
+            'tokens_out': self.tokens_out,
+            'chunks': self.chunks,
+            'model_calls': self.model_calls
+        }
+        if self.profile:
+            result['profile'] = self.profile
+        return result
+
+
+def current() -> Optional[Usage]:
+    """Usage of the request being handled on this thread, if any"""
+    return _current.get()
+
+
+def tenant() -> str:
+    """key_id of the request being handled on this thread ('anonymous' outside a request)"""
+    usage = _current.get()
+    return usage.tenant if usage is not None else 'anonymous'
+
+
+def record(**amounts):
+    """Add to the current request's counters (no-op outside a request)"""
+    usage = _current.get()
+    if usage is not None:
+        usage.add(**amounts)
+
+
+def merge(amounts: Dict[str, Any]):
+    """Add counters reported by another process (e.g. an inference worker) to the current request"""
+    record(
+        worker_cpu_seconds=amounts.get('cpu_seconds', 0),
+        **{name: amounts.get(name, 0) for name in ('tokens_in', 'tokens_out', 'chunks', 'model_calls')}
+    )
+
+
+def bind(fn: Callable) -> Callable:
+    """fn wrapped to account its CPU time and counters to the calling request,
+    for work handed to executor threads"""
+    usage = _current.get()
+    if usage is None:
+        return fn
+
+    def run(*args, **kwargs):
+        token = _current.set(usage)
+        start = time.thread_time()
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            usage.add(thread_cpu_seconds=time.thread_time() - start)
+            _current.reset(token)
+    return run
+
+
+def start() -> Tuple[Usage, Any]:
+    usage = Usage()
+    return usage, _current.set(usage)
+
+
+def finish(usage: Usage, token) -> Usage:
+    usage.finish()
+    _current.reset(token)
+    return usage
+
+
+def key_id(api_key: Optional[str]) -> str:
+    """Stable, non-reversible label for an API key"""
+    if not api_key:
+        return 'anonymous'
+    return hashlib.sha256(api_key.encode()).hexdigest()[:12]
+
+
+class UsageLedger:
+    """Usage totals per API key (LRU-bounded to max_keys)"""
+
+    def __init__(self, max_keys: Optional[int] = None):
+        self.max_keys = max_keys or int(os.getenv('USAGE_MAX_KEYS', 1000))
+        self._keys: 'OrderedDict[str, Dict[str, Any]]' = OrderedDict()
+        self._lock = threading.Lock()
+
+    def add(self, key: str, endpoint: str, usage: Usage, failed: bool = False):
+        with self._lock:
+            totals = self._keys.get(key)
+            if totals is None:
+                totals = self._keys[key] = {
+                    'requests': 0, 'failed': 0, 'wall_seconds': 0.0, 'cpu_seconds': 0.0,
+                    'worker_cpu_seconds': 0.0, 'tokens_in': 0, 'tokens_out': 0, 'chunks': 0,
+                    'model_calls': 0, 'max_peak_memory_delta_mb': 0.0, 'endpoints': {}
+                }
+                while len(self._keys) > self.max_keys:
+                    self._keys.popitem(last=False)
+            self._keys.move_to_end(key)
+            totals['requests'] += 1
+            totals['failed'] += failed
+            totals['wall_seconds'] += usage.wall_seconds
+            totals['cpu_seconds'] += usage.cpu_seconds
+            totals['worker_cpu_seconds'] += usage.worker_cpu_seconds
+            for name in ('tokens_in', 'tokens_out', 'chunks', 'model_calls'):
+                totals[name] += getattr(usage, name)
+            totals['max_peak_memory_delta_mb'] = max(totals['max_peak_memory_delta_mb'], usage.peak_memory_delta_mb)
+            totals['endpoints'][endpoint] = totals['endpoints'].get(endpoint, 0) + 1
+
+    def status(self, limit: int = 50) -> Dict[str, Any]:
+        """Keys ordered by CPU time, heaviest first"""
+        with self._lock:
+            ranked = sorted(self._keys.items(), key=lambda item: item[1]['cpu_seconds'], reverse=True)
+            keys = {}
+            for key, totals in ranked[:limit]:
+                keys[key] = {
+                    **{name: round(value, 3) if isinstance(value, float) else value
+                       for name, value in totals.items() if name != 'endpoints'},
+                    'cpu_seconds_per_request': round(totals['cpu_seconds'] / totals['requests'], 4),
+                    'endpoints': dict(totals['endpoints'])
+                }
+            return {'tracked_keys': len(self._keys), 'keys': keys}
+
+
+class RequestProfiler:
+    """Statistical profile (pyinstrument, if installed) or cProfile of the
+    request thread, written to PROFILE_DIR.
+
+    X-Profile is honored for admin keys only, unless PROFILE_ALLOW_HEADER
+    opens it to every client. Only one request is profiled at a time; others
+    asking for a profile while one is running are not profiled. The oldest
+    files are removed beyond PROFILE_MAX_FILES.
+    """
+
+    def __init__(self, directory: Optional[str] = None, max_files: Optional[int] = None):
+        self.directory = directory or os.getenv('PROFILE_DIR', 'profiles')
+        self.max_files = max_files or int(os.getenv('PROFILE_MAX_FILES', 200))
+        self.sample_rate = float(os.getenv('PROFILE_SAMPLE_RATE', 0))
+        self.allow_header = os.getenv('PROFILE_ALLOW_HEADER', 'false').lower() == 'true'
+        self._busy = threading.Lock()
+
+    def wanted(self, header_value: Optional[str], admin: bool = False) -> bool:
+        if (admin or self.allow_header) and (header_value or '').strip().lower() in ('1', 'true', 'yes'):
+            return True
+        return self.sample_rate > 0 and random.random() < self.sample_rate
+
+    def start(self):
+        """A running profiler, or None if another request is being profiled"""
+        if not self._busy.acquire(blocking=False):
+            return None
+        try:
+            try:
+                from pyinstrument import Profiler
+                profiler = Profiler(interval=float(os.getenv('PROFILE_INTERVAL', 0.001)))
+            except ImportError:
+                import cProfile
+                profiler = cProfile.Profile()
+                profiler.enable()
+            else:
+                profiler.start()
+            return profiler
+        except Exception as e:
+            self._busy.release()
+            print(f"⚠️ Could not start profiler: {e}")
+            return None
+
+    def stop(self, profiler, name: str) -> Optional[str]:
+        """Stop profiler and write it to the profile directory; returns the file name"""
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            stem = f"{time.strftime('%Y%m%d-%H%M%S')}-{name}-{uuid.uuid4().hex[:8]}"
+            if hasattr(profiler, 'output_html'):
+                profiler.stop()
+                file_name = f'{stem}.html'
+                with open(os.path.join(self.directory, file_name), 'w') as f:
+                    f.write(profiler.output_html())
+            else:
+                profiler.disable()
+                file_name = f'{stem}.prof'
+                profiler.dump_stats(os.path.join(self.directory, file_name))
+            self._prune()
+            return file_name
+        except Exception as e:
+            print(f"⚠️ Could not write profile: {e}")
+            return None
+        finally:
+            self._busy.release()
+
+    def _prune(self):
+        files = sorted(
+            (entry for entry in os.scandir(self.directory) if entry.name.endswith(('.html', '.prof'))),
+            key=lambda entry: entry.stat().st_mtime
+        )
+        for entry in files[:max(0, len(files) - self.max_files)]:
+            os.remove(entry.path)
+
+
+_ledger = None
+_profiler = None
+_lock = threading.Lock()
+
+
+def get_ledger() -> UsageLedger:
+    global _ledger
+    if _ledger is None:
+        with _lock:
+            if _ledger is None:
+                _ledger = UsageLedger()
+    return _ledger
+
+
+def get_profiler() -> RequestProfiler:
+    global _profiler
+    if _profiler is None:
+        with _lock:
+            if _profiler is None:
+                _profiler = RequestProfiler()
+    return _profiler
@@ -0,0 +1,385 @@
+import multiprocessing
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Dict, Optional, Tuple, Union
+
+from app.models.document import Document, as_document
+from app.services import accounting
+
+
+def sentiment_label(score: float) -> str:
+    """Label for a score on VADER's compound scale, [-1, 1]"""
+    return 'POSITIVE' if score >= 0.05 else 'NEGATIVE' if score <= -0.05 else 'NEUTRAL'
+
+
+def signed_sentiment(label: str, probability: float) -> Tuple[float, str]:
+    """A classifier's (label, probability) on VADER's scale, so every tier reports
+    scores in [-1, 1] with POSITIVE, NEGATIVE or NEUTRAL labels"""
+    label = label.upper()
+    if label.startswith('POS'):
+        return probability, 'POSITIVE'
+    if label.startswith('NEG'):
+        return -probability, 'NEGATIVE'
+    return 0.0, 'NEUTRAL'
+
+
+def text_statistics(text: Union[str, Document], sentiment: bool = False,
+                    readability_fallback: Optional[float] = None) -> Dict[str, Any]:
+    """Counts, Flesch readability and (optionally) VADER sentiment for analyze"""
+    doc = as_document(text)
+    text = doc.raw
+    word_count = doc.raw_word_count
+    sentence_count = doc.sentence_count
+
+    try:
+        import textstat
+        readability_score = textstat.flesch_reading_ease(text)
+    except Exception:
+        if readability_fallback is None:
+            raise
+        readability_score = readability_fallback
+
+    result = {
+        'word_count': word_count,
+        'sentence_count': sentence_count,
+        'paragraph_count': len([p for p in text.split('\n\n') if p.strip()]),
+        'character_count': len(text),
+        'character_count_no_spaces': len(text.replace(' ', '')),
+        # Reading time (average 200 words per minute)
+        'reading_time_minutes': word_count / 200,
+        'readability_score': readability_score
+    }
+
+    if sentiment:
+        try:
+            from app.services import nltk_resources
+            score = nltk_resources.vader().polarity_scores(text)['compound']
+            label = sentiment_label(score)
+        except Exception as e:
+            print(f"Sentiment analysis error: {e}")
+            score, label = 0.0, 'NEUTRAL'
+        result['sentiment_score'] = score
+        result['sentiment_label'] = label
+    return result
+
+
+def extractive_summary(text: Union[str, Document], max_length: int) -> Dict[str, Any]:
+    """Leading sentences as a summary (the fallback when no model is available)"""
+    start_time = time.time()
+    doc = as_document(text)
+    original_word_count = doc.word_count
+
+    target_sentences = min(3, doc.sentence_count, max_length // 20)
+    summary = ' '.join(doc.text_at(span) for span in doc.sentence_spans[:target_sentences])
+
+    summary_word_count = len(summary.split())
+    return {
+        'summary': summary,
+        'processing_time': time.time() - start_time,
+        'original_word_count': original_word_count,
+        'summary_word_count': summary_word_count,
+        'compression_ratio': summary_word_count / original_word_count if original_word_count > 0 else 0
+    }
+
+
+def minhash_signature(text: Union[str, Document]):
+    """The near-duplicate cache's signature of the text"""
+    from app.services.similarity_cache import text_signature
+    return text_signature(text.raw if isinstance(text, Document) else text)
+
+
+# Work that may be sent to the pool
+JOBS: Dict[str, Callable[..., Any]] = {
+    'text_statistics': text_statistics,
+    'extractive_summary': extractive_summary,
+    'minhash_signature': minhash_signature,
+}
+
+
+def _attach(name: str):
+    from multiprocessing import shared_memory
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:
+        # Python < 3.13 registers the segment again, but with the resource tracker
+        # shared with the parent, which unregisters it when it unlinks
+        return shared_memory.SharedMemory(name=name)
+
+
+def _init_worker():
+    """Load the lexicons and modules once per worker instead of per job"""
+    os.environ['TOKENIZERS_PARALLELISM'] = 'false'
+    os.environ['OMP_NUM_THREADS'] = '1'
+    try:
+        import textstat  # noqa: F401
+        from app.services import nltk_resources
+        nltk_resources.vader()
+    except Exception as e:
+        print(f"⚠️ Analysis worker {os.getpid()} could not preload lexicons: {e}")
+
+
+def _run_job(job: str, payload, kwargs: Dict[str, Any]):
+    """Pool entry point: payload is the text, or (shared memory name, size) for large texts"""
+    start = time.perf_counter()
+    cpu_start = time.process_time()
+    if isinstance(payload, tuple):
+        name, size = payload
+        shm = _attach(name)
+        try:
+            text = bytes(shm.buf[:size]).decode('utf-8')
+        finally:
+            shm.close()
+    else:
+        text = payload
+    result = JOBS[job](text, **kwargs)
+    return result, time.perf_counter() - start, time.process_time() - cpu_start
+
+
+def _ping():
+    return None
+
+
+class _Stats:
+    def __init__(self):
+        self.inline = 0
+        self.offloaded = 0
+        self.shared_memory = 0
+        self.failures = 0
+        self.restarts = 0
+        self.in_flight = 0
+        self.waits = deque(maxlen=1000)
+        self.runs = deque(maxlen=1000)
+
+
+def _percentiles(values) -> Dict[str, float]:
+    values = sorted(values)
+    if not values:
+        return {'p50': 0.0, 'p95': 0.0}
+    return {
+        'p50': round(values[len(values) // 2] * 1000, 2),
+        'p95': round(values[min(len(values) - 1, int(len(values) * 0.95))] * 1000, 2)
+    }
+
+
+class _PoolFuture(Future):
+    """Future for a pooled job; if the pool broke under the job, result() runs
+    it inline in the thread that asks for it"""
+
+    def __init__(self, pool: 'AnalysisPool', job: str, text: str, kwargs: Dict[str, Any]):
+        super().__init__()
+        self._fallback = (pool, job, text, kwargs)
+
+    def result(self, timeout: Optional[float] = None) -> Any:
+        try:
+            return super().result(timeout)
+        except BrokenProcessPool:
+            pool, job, text, kwargs = self._fallback
+            return pool._call(job, text, kwargs)
+
+
+class AnalysisPool:
+    """Warm worker processes for CPU-bound, pure-Python analysis work.
+
+    Jobs on texts shorter than inline_chars run in the calling thread, where
+    the IPC round trip would cost more than the GIL time it saves. Larger
+    texts go to the pool; texts of shm_bytes or more are handed over through
+    shared memory instead of being pickled down the pipe (results are small
+    values and are always pickled). Workers are started with forkserver where
+    available, so they never inherit model memory or threads.
+    """
+
+    def __init__(self, workers: Optional[int] = None, inline_chars: Optional[int] = None,
+                 shm_bytes: Optional[int] = None, timeout: Optional[float] = None):
+        self.workers = workers if workers is not None else int(os.getenv('ANALYSIS_WORKERS', 2))
+        self.inline_chars = inline_chars if inline_chars is not None else int(os.getenv('ANALYSIS_INLINE_CHARS', 4000))
+        self.shm_bytes = shm_bytes if shm_bytes is not None else int(os.getenv('ANALYSIS_SHM_BYTES', 256 * 1024))
+        self.timeout = timeout if timeout is not None else float(os.getenv('ANALYSIS_TIMEOUT', 30))
+        self._executor = None
+        self._lock = threading.Lock()
+        self._stats = _Stats()
+
+    def submit(self, job: str, text: Union[str, Document], **kwargs) -> Future:
+        """Run job(text, **kwargs) inline or on the pool; returns a Future.
+
+        Inline jobs get the Document itself so nothing it has already parsed
+        is parsed again; pool workers get the raw text.
+        """
+        if self.workers <= 0 or len(text) < self.inline_chars:
+            return self._run_inline(job, text, kwargs)
+        if isinstance(text, Document):
+            text = text.raw
+
+        try:
+            executor = self._get_executor()
+        except Exception as e:
+            print(f"⚠️ Analysis pool unavailable, running inline: {e}")
+            return self._run_inline(job, text, kwargs)
+
+        shm = None
+        payload = text
+        submitted = time.perf_counter()
+        usage = accounting.current()
+        try:
+            encoded = text.encode('utf-8') if len(text) * 4 >= self.shm_bytes else None
+            if encoded is not None and len(encoded) >= self.shm_bytes:
+                from multiprocessing import shared_memory
+                shm = shared_memory.SharedMemory(create=True, size=len(encoded))
+                shm.buf[:len(encoded)] = encoded
+                payload = (shm.name, len(encoded))
+            inner = executor.submit(_run_job, job, payload, kwargs)
+        except BrokenProcessPool:
+            self._release(shm)
+            self._restart()
+            return self._run_inline(job, text, kwargs)
+        except BaseException:
+            self._release(shm)
+            raise
+        with self._lock:
+            self._stats.offloaded += 1
+            self._stats.in_flight += 1
+            if shm is not None:
+                self._stats.shared_memory += 1
+
+        outer = _PoolFuture(self, job, text, kwargs)
+
+        def done(future: Future):
+            self._release(shm)
+            with self._lock:
+                self._stats.in_flight -= 1
+            try:
+                result, run_seconds, cpu_seconds = future.result()
+            except BrokenProcessPool as e:
+                # The worker died (e.g. OOM-killed); _PoolFuture.result redoes the
+                # work in the caller's thread rather than in this callback
+                self._restart()
+                outer.set_exception(e)
+                return
+            except Exception as e:
+                with self._lock:
+                    self._stats.failures += 1
+                outer.set_exception(e)
+                return
+            if usage is not None:
+                usage.add(worker_cpu_seconds=cpu_seconds)
+            with self._lock:
+                self._stats.runs.append(run_seconds)
+                self._stats.waits.append(time.perf_counter() - submitted - run_seconds)
+            outer.set_result(result)
+
+        inner.add_done_callback(done)
+        return outer
+
+    def run(self, job: str, text: Union[str, Document], **kwargs) -> Any:
+        return self.submit(job, text, **kwargs).result(timeout=self.timeout)
+
+    def warm_up(self):
+        """Start every worker and load its lexicons ahead of the first job"""
+        if self.workers <= 0:
+            return
+        start = time.time()
+        try:
+            executor = self._get_executor()
+            for future in [executor.submit(_ping) for _ in range(self.workers)]:
+                future.result()
+            print(f"🔥 Analysis pool warm ({self.workers} workers) in {time.time() - start:.1f}s")
+        except Exception as e:
+            print(f"⚠️ Analysis pool warm-up failed: {e}")
+
+    def status(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = self._stats
+            return {
+                'workers': self.workers,
+                'started': self._executor is not None,
+                'inline_chars': self.inline_chars,
+                'shm_bytes': self.shm_bytes,
+                'inline': stats.inline,
+                'offloaded': stats.offloaded,
+                'shared_memory_transfers': stats.shared_memory,
+                'in_flight': stats.in_flight,
+                'failures': stats.failures,
+                'restarts': stats.restarts,
+                'queue_wait_ms': _percentiles(stats.waits),
+                'run_ms': _percentiles(stats.runs)
+            }
+
+    def shutdown(self):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True, cancel_futures=True)
+
+    def _run_inline(self, job: str, text: Union[str, Document], kwargs: Dict[str, Any]) -> Future:
+        future = Future()
+        try:
+            future.set_result(self._call(job, text, kwargs))
+        except Exception as e:
+            future.set_exception(e)
+        return future
+
+    def _call(self, job: str, text: Union[str, Document], kwargs: Dict[str, Any]) -> Any:
+        with self._lock:
+            self._stats.inline += 1
+        return JOBS[job](text, **kwargs)
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    methods = multiprocessing.get_all_start_methods()
+                    context = multiprocessing.get_context('forkserver' if 'forkserver' in methods else 'spawn')
+                    self._executor = ProcessPoolExecutor(max_workers=self.workers, mp_context=context,
+                                                         initializer=_init_worker)
+                    print(f"🧮 Started analysis pool with {self.workers} worker processes")
+        return self._executor
+
+    def _restart(self):
+        with self._lock:
+            executor, self._executor = self._executor, None
+            if executor is not None:
+                self._stats.restarts += 1
+        if executor is not None:
+            print("⚠️ Analysis pool broke; starting a new one")
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    @staticmethod
+    def _release(shm):
+        if shm is not None:
+            shm.close()
+            shm.unlink()
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_analysis_pool() -> AnalysisPool:
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = AnalysisPool()
+    return _pool
+
+
+def peek_analysis_pool() -> Optional[AnalysisPool]:
+    return _pool
+
+
+def start_pool_warmup():
+    """Start the analysis workers in the background at startup for the backends
+    that use them, so the first large request doesn't wait for them
+    (ANALYSIS_POOL_WARMUP=false disables)"""
+    from app.services.registry import backend_name
+    if backend_name() not in ('full', 'lite') or os.getenv('ANALYSIS_POOL_WARMUP', 'true').lower() != 'true':
+        return None
+    pool = get_analysis_pool()
+    if pool.workers <= 0:
+        return None
+    thread = threading.Thread(target=pool.warm_up, name='analysis-pool-warmup', daemon=True)
+    thread.start()
+    return thread
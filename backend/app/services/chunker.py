@@ -0,0 +1,220 @@
+import re
+from typing import Iterable, List, Tuple
+
+# Chunks are sized to stay well inside the summarization models' input window
+CHUNK_WORDS = 800
+
+_WHITESPACE = re.compile(r'\s+')
+_DISALLOWED = re.compile(r'[^\w\s\.\,\!\?\;\:\-\(\)\"\']+')
+_TRAILING_TOKEN = re.compile(r'\s+\S*\Z')
+# A terminator and any closing quotes/brackets (kept in the sentence), then the separating whitespace
+_SENTENCE_END = re.compile(r'[.!?](["\')\]]*)(\s+)')
+_TERMINATED = re.compile(r'[.!?]["\')\]]*\Z')
+_LAST_WORD = re.compile(r'\w+(?:\.\w+)*\Z')
+
+# Abbreviations (lowercase, without the final period) whose period never ends a sentence
+ABBREVIATIONS = frozenset({
+    'mr', 'mrs', 'ms', 'dr', 'prof', 'sr', 'jr', 'st', 'rev', 'gen', 'col', 'capt', 'lt', 'sgt', 'gov', 'sen',
+    'rep', 'hon', 'mt',
+    'jan', 'feb', 'mar', 'apr', 'jun', 'jul', 'aug', 'sep', 'sept', 'oct', 'nov', 'dec',
+    'e.g', 'i.e', 'vs', 'cf', 'approx', 'fig', 'vol', 'a.m', 'p.m', 'u.s', 'u.k', 'u.n',
+})
+
+Span = Tuple[int, int]
+
+
+def normalize_text(text: str) -> str:
+    """Clean and normalize text (collapse whitespace, drop special characters)"""
+    text = _WHITESPACE.sub(' ', text.strip())
+    return _DISALLOWED.sub('', text)
+
+
+def _abbreviated(text: str, period: int, start: int = 0) -> bool:
+    """Whether the terminator at period closes one of ABBREVIATIONS"""
+    if text[period] != '.':
+        return False
+    match = _LAST_WORD.search(text, start, period)
+    return match is not None and match.group().lower() in ABBREVIATIONS
+
+
+def ends_sentence(text: str) -> bool:
+    """Whether sentence_spans would split after text if whitespace followed it"""
+    match = _TERMINATED.search(text)
+    return match is not None and not _abbreviated(text, match.start())
+
+
+def sentence_spans(text: str) -> List[Span]:
+    """Split text into sentences, returned as (start, end) offsets into text.
+
+    A sentence ends at . ! or ? plus any closing quotes or brackets, when
+    whitespace follows; a period closing one of ABBREVIATIONS doesn't end one.
+    """
+    spans = []
+    start = len(text) - len(text.lstrip())
+    for match in _SENTENCE_END.finditer(text, start):
+        if _abbreviated(text, match.start(), start):
+            continue
+        end = match.start(2)
+        if end > start:
+            spans.append((start, end))
+        start = match.end()
+    end = len(text.rstrip())
+    if end > start:
+        spans.append((start, end))
+    return spans
+
+
+def pack_chunks(spans: List[Span], word_counts: List[int], max_words: int = CHUNK_WORDS) -> List[Span]:
+    """Group consecutive sentence spans into chunks of at most max_words words"""
+    chunks = []
+    chunk_start = None
+    chunk_end = 0
+    current_word_count = 0
+
+    for (start, end), sentence_words in zip(spans, word_counts):
+        if current_word_count + sentence_words > max_words and chunk_start is not None:
+            chunks.append((chunk_start, chunk_end))
+            chunk_start = start
+            current_word_count = sentence_words
+        else:
+            if chunk_start is None:
+                chunk_start = start
+            current_word_count += sentence_words
+        chunk_end = end
+
+    if chunk_start is not None:
+        chunks.append((chunk_start, chunk_end))
+
+    return chunks
+
+
+def chunk_text(text: str, max_words: int = CHUNK_WORDS) -> List[str]:
+    """Split already-normalized text into sentence-aligned chunks"""
+    spans = sentence_spans(text)
+    word_counts = [len(text[start:end].split()) for start, end in spans]
+    return [text[start:end] for start, end in pack_chunks(spans, word_counts, max_words)]
+
+
+class StreamingChunker:
+    """Normalizes, sentence-splits and packs text while it is still arriving.
+
+    Fragments can be fed in any size. Whitespace runs and sentences that
+    straddle fragment boundaries are held back until the next fragment (or
+    close()) settles them, so the result matches normalize_text/chunk_text on
+    the whole input.
+    """
+
+    def __init__(self, max_words: int = CHUNK_WORDS):
+        self.max_words = max_words
+        self.sentences: List[Span] = []
+        self.sentence_word_counts: List[int] = []
+        self.chunk_spans: List[Span] = []
+        self.word_count = 0
+        self.closed = False
+
+        self._parts: List[str] = []
+        self._length = 0
+        self._raw_pending = ''
+        self._started = False
+        self._tail = ''
+        self._tail_start = 0
+        self._chunk_start = None
+        self._chunk_end = 0
+        self._chunk_words = 0
+        self._text_cache = None
+
+    @property
+    def text(self) -> str:
+        """Normalized text seen so far"""
+        if self._text_cache is None:
+            self._text_cache = ''.join(self._parts)
+            self._parts = [self._text_cache] if self._text_cache else []
+        return self._text_cache
+
+    @property
+    def chunks(self) -> List[str]:
+        text = self.text
+        return [text[start:end] for start, end in self.chunk_spans]
+
+    def feed(self, fragment: str):
+        """Consume the next piece of raw text"""
+        if self.closed:
+            raise ValueError('Chunker is already closed')
+        if not fragment:
+            return
+
+        buffer = self._raw_pending + fragment
+        match = _TRAILING_TOKEN.search(buffer)
+        if match is None:
+            # No whitespace yet: the whole buffer may still be one token
+            self._raw_pending = buffer
+            return
+
+        self._raw_pending = buffer[match.start():]
+        self._emit(buffer[:match.start()])
+        self._split_sentences(final=False)
+
+    def close(self):
+        """Flush everything still held back; no more input is accepted"""
+        if self.closed:
+            return
+        self._emit(self._raw_pending.rstrip())
+        self._raw_pending = ''
+        self._split_sentences(final=True)
+        if self._chunk_start is not None:
+            self.chunk_spans.append((self._chunk_start, self._chunk_end))
+            self._chunk_start = None
+        self.closed = True
+
+    def _emit(self, raw: str):
+        if not self._started:
+            raw = raw.lstrip()
+            if not raw:
+                return
+            self._started = True
+        normalized = _DISALLOWED.sub('', _WHITESPACE.sub(' ', raw))
+        if normalized:
+            self._parts.append(normalized)
+            self._length += len(normalized)
+            self._tail += normalized
+            self._text_cache = None
+
+    def _split_sentences(self, final: bool):
+        if not self._tail:
+            return
+        spans = sentence_spans(self._tail)
+        # The last sentence may continue in the next fragment; keep the tail from its start
+        held = None if final or not spans else spans.pop()
+        for start, end in spans:
+            self._add_sentence(self._tail_start + start, self._tail_start + end,
+                               len(self._tail[start:end].split()))
+        if final:
+            self._tail_start = self._length
+            self._tail = ''
+        elif held is not None and held[0]:
+            self._tail_start += held[0]
+            self._tail = self._tail[held[0]:]
+
+    def _add_sentence(self, start: int, end: int, sentence_words: int):
+        self.sentences.append((start, end))
+        self.sentence_word_counts.append(sentence_words)
+        self.word_count += sentence_words
+
+        if self._chunk_words + sentence_words > self.max_words and self._chunk_start is not None:
+            self.chunk_spans.append((self._chunk_start, self._chunk_end))
+            self._chunk_start = start
+            self._chunk_words = sentence_words
+        else:
+            if self._chunk_start is None:
+                self._chunk_start = start
+            self._chunk_words += sentence_words
+        self._chunk_end = end
+
+
+def stream_chunks(fragments: Iterable[str], max_words: int = CHUNK_WORDS) -> StreamingChunker:
+    """Run a StreamingChunker over an iterable of fragments and close it"""
+    chunker = StreamingChunker(max_words)
+    for fragment in fragments:
+        chunker.feed(fragment)
+    chunker.close()
+    return chunker
@@ -0,0 +1,239 @@
+"""Latency cost curves per task and model tier.
+
+A curve predicts the service time of one call (queueing excluded) from the
+input size: base + per word + per chunk + per extra variation. Curves are
+fitted from measured runs, e.g. the router's decision log:
+
+    python -m app.services.cost_model fit --records router_decisions.jsonl --output cost_curves.json
+    COST_CURVES=cost_curves.json python run.py
+"""
+import argparse
+import json
+import math
+import os
+import sys
+import threading
+from typing import Any, Dict, List, Optional
+
+# Tiers of each task from cheapest to most expensive
+TIERS = {
+    'summarize': ('extractive', 'small', 'large'),
+    'analyze': ('vader', 'roberta'),
+    'paraphrase': ('large',),
+}
+
+# Rough placeholders so routing works before any curves are measured; they are
+# not measurements, and the online correction pulls them towards observed times
+DEFAULT_CURVES = {
+    'summarize': {
+        'extractive': {'base_seconds': 0.002, 'per_word_seconds': 0.000005},
+        'small': {'base_seconds': 0.3, 'per_word_seconds': 0.0015, 'per_chunk_seconds': 0.8},
+        'large': {'base_seconds': 0.6, 'per_word_seconds': 0.003, 'per_chunk_seconds': 1.8},
+    },
+    'analyze': {
+        'vader': {'base_seconds': 0.005, 'per_word_seconds': 0.00002},
+        'roberta': {'base_seconds': 0.1, 'per_word_seconds': 0.00002},
+    },
+    'paraphrase': {
+        'large': {'base_seconds': 0.4, 'per_word_seconds': 0.01, 'per_variation_seconds': 0.3},
+    },
+}
+
+
+class CostModel:
+    """Predicted service time per task, tier and input size.
+
+    Curves come from COST_CURVES (as written by `fit`) over rough defaults.
+    Each curve's predictions are scaled by a correction learned from observed
+    latencies (an exponential moving average of actual / predicted), so they
+    adapt to the machine they run on. Tiers a curve file doesn't know fall
+    back to the most expensive known tier of the task.
+    """
+
+    def __init__(self, path: Optional[str] = None, alpha: Optional[float] = None):
+        path = path or os.getenv('COST_CURVES')
+        self.alpha = alpha if alpha is not None else float(os.getenv('COST_MODEL_ALPHA', 0.1))
+        self.curves = json.loads(json.dumps(DEFAULT_CURVES))
+        self.source = None
+        if path:
+            with open(path) as f:
+                loaded = json.load(f)
+            for task, tiers in loaded.get('curves', loaded).items():
+                if isinstance(tiers, dict):
+                    for tier, params in tiers.items():
+                        self.curves.setdefault(task, {}).setdefault(tier, {}).update(params)
+            self.source = path
+        self._lock = threading.Lock()
+        self._stats: Dict[str, Dict[str, float]] = {}
+
+    def curve(self, task: str, tier: str) -> Dict[str, float]:
+        tiers = self.curves.get(task, {})
+        if tier in tiers:
+            return tiers[tier]
+        known = [t for t in TIERS.get(task, ()) if t in tiers] or list(tiers)
+        return tiers[known[-1]] if known else {}
+
+    def base_prediction(self, task: str, tier: str, words: int, chunks: int = 1, variations: int = 1) -> float:
+        params = self.curve(task, tier)
+        return (params.get('base_seconds', 0.0) + params.get('per_word_seconds', 0.0) * words
+                + params.get('per_chunk_seconds', 0.0) * chunks
+                + params.get('per_variation_seconds', 0.0) * (variations - 1))
+
+    def predict(self, task: str, tier: str, words: int, chunks: int = 1, variations: int = 1) -> float:
+        """Predicted service time in seconds"""
+        stats = self._stats.get(f'{task}:{tier}')
+        correction = stats['correction'] if stats else 1.0
+        return self.base_prediction(task, tier, words, chunks, variations) * correction
+
+    def observe(self, task: str, tier: str, words: int, actual_seconds: float, chunks: int = 1,
+                variations: int = 1) -> float:
+        """Learn from an observed service time; returns the prediction it is compared with"""
+        base = self.base_prediction(task, tier, words, chunks, variations)
+        with self._lock:
+            stats = self._stats.setdefault(f'{task}:{tier}', {
+                'observations': 0, 'correction': 1.0, 'abs_error_seconds': 0.0, 'abs_error_ratio': 0.0
+            })
+            predicted = base * stats['correction']
+            if base > 0 and actual_seconds > 0:
+                # Bounded, so one outlier (e.g. a model load) can't wreck the curve
+                ratio = min(max(actual_seconds / base, 0.01), 100.0)
+                # The first observation sets the scale; later ones move it gradually
+                alpha = 1.0 if stats['observations'] == 0 else self.alpha
+                stats['correction'] = math.exp((1 - alpha) * math.log(stats['correction']) + alpha * math.log(ratio))
+            error = abs(actual_seconds - predicted)
+            stats['abs_error_seconds'] += (error - stats['abs_error_seconds']) / (stats['observations'] + 1)
+            if actual_seconds > 0:
+                stats['abs_error_ratio'] += (error / actual_seconds - stats['abs_error_ratio']) / (stats['observations'] + 1)
+            stats['observations'] += 1
+        return predicted
+
+    def status(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'curves': self.source or 'defaults',
+                'accuracy': {
+                    key: {
+                        'observations': int(stats['observations']),
+                        'correction': round(stats['correction'], 3),
+                        'mean_abs_error_seconds': round(stats['abs_error_seconds'], 3),
+                        'mean_abs_error_pct': round(stats['abs_error_ratio'] * 100, 1)
+                    }
+                    for key, stats in self._stats.items()
+                }
+            }
+
+
+def _solve(matrix: List[List[float]], vector: List[float]) -> List[float]:
+    """Solve a small linear system by Gaussian elimination with partial pivoting"""
+    size = len(vector)
+    rows = [row[:] + [value] for row, value in zip(matrix, vector)]
+    for col in range(size):
+        pivot = max(range(col, size), key=lambda r: abs(rows[r][col]))
+        rows[col], rows[pivot] = rows[pivot], rows[col]
+        if abs(rows[col][col]) < 1e-12:
+            continue
+        for r in range(size):
+            if r != col:
+                factor = rows[r][col] / rows[col][col]
+                rows[r] = [a - factor * b for a, b in zip(rows[r], rows[col])]
+    return [rows[i][size] / rows[i][i] if abs(rows[i][i]) >= 1e-12 else 0.0 for i in range(size)]
+
+
+def fit_task(records: List[Dict[str, Any]]) -> Dict[str, float]:
+    """Least-squares fit of wall time on words, chunks and variations, plus the
+    noise, CPU share and working memory per 1k words of one task's records"""
+    names = ['words', 'chunks', 'variations']
+    # Features that never vary can't be told apart from the base time
+    names = [name for name in names if len({r.get(name, 1) for r in records}) > 1]
+    features = [[1.0] + [float(r.get(name, 1)) for name in names] for r in records]
+    targets = [float(r['wall_seconds']) for r in records]
+    width = len(features[0])
+    gram = [[sum(f[i] * f[j] for f in features) + (1e-9 if i == j else 0) for j in range(width)]
+            for i in range(width)]
+    moments = [sum(f[i] * t for f, t in zip(features, targets)) for i in range(width)]
+    coefficients = dict(zip(['base'] + names, _solve(gram, moments)))
+
+    params = {
+        'base_seconds': max(0.0, coefficients.get('base', 0.0)),
+        'per_word_seconds': max(0.0, coefficients.get('words', 0.0)),
+        'per_chunk_seconds': max(0.0, coefficients.get('chunks', 0.0)),
+        'per_variation_seconds': max(0.0, coefficients.get('variations', 0.0)),
+    }
+    # Variation counts are fitted as extra variations beyond the first
+    if 'variations' in coefficients:
+        params['base_seconds'] = max(0.0, params['base_seconds'] + coefficients['variations'])
+
+    residuals = []
+    for feature, target in zip(features, targets):
+        predicted = sum(c * x for c, x in zip(coefficients.values(), feature))
+        if predicted > 0 and target > 0:
+            residuals.append(math.log(target / predicted))
+    mean_residual = sum(residuals) / len(residuals) if residuals else 0.0
+    params['noise_sigma'] = math.sqrt(sum((r - mean_residual) ** 2 for r in residuals) / len(residuals)) \
+        if len(residuals) > 1 else 0.0
+
+    total_wall = sum(targets)
+    params['cpu_ratio'] = sum(float(r.get('cpu_seconds', 0)) for r in records) / total_wall if total_wall else 1.0
+    per_1k = [max(0.0, float(r.get('rss_delta_mb', 0))) / (r['words'] / 1000) for r in records if r.get('words')]
+    params['memory_mb_per_1k_words'] = sorted(per_1k)[len(per_1k) // 2] if per_1k else 0.0
+    tokens = [r['tokens_in'] / r['words'] for r in records if r.get('tokens_in') and r.get('words')]
+    params['tokens_per_word'] = sum(tokens) / len(tokens) if tokens else 1.3
+    return {name: round(value, 6) for name, value in params.items()}
+
+
+def fit_curves(records: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Curves per task and tier from records with task, tier, words, chunks,
+    variations and wall_seconds (or actual_seconds)"""
+    groups: Dict[tuple, List[Dict[str, Any]]] = {}
+    for record in records:
+        wall = record.get('wall_seconds', record.get('actual_seconds'))
+        if wall is None or not record.get('task') or not record.get('tier'):
+            continue
+        groups.setdefault((record['task'], record['tier']), []).append({**record, 'wall_seconds': wall})
+
+    curves: Dict[str, Dict[str, Any]] = {}
+    for (task, tier), rows in sorted(groups.items()):
+        params = fit_task(rows)
+        curves.setdefault(task, {})[tier] = {
+            name: params[name] for name in
+            ('base_seconds', 'per_word_seconds', 'per_chunk_seconds', 'per_variation_seconds', 'noise_sigma')
+        }
+        print(f"📐 {task}/{tier}: {len(rows)} records -> {curves[task][tier]}")
+    return {'records': len(records), 'curves': curves}
+
+
+_cost_model = None
+_cost_model_lock = threading.Lock()
+
+
+def get_cost_model() -> CostModel:
+    global _cost_model
+    if _cost_model is None:
+        with _cost_model_lock:
+            if _cost_model is None:
+                _cost_model = CostModel()
+    return _cost_model
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest='command', required=True)
+    fit_parser = commands.add_parser('fit', help='fit curves from JSONL records')
+    fit_parser.add_argument('--records', required=True)
+    fit_parser.add_argument('--output', required=True)
+    args = parser.parse_args()
+
+    with open(args.records) as f:
+        records = [json.loads(line) for line in f if line.strip()]
+    curves = fit_curves(records)
+    if not curves['curves']:
+        print("❌ No usable records (need task, tier, words and wall_seconds or actual_seconds)")
+        return 1
+    with open(args.output, 'w') as f:
+        json.dump(curves, f, indent=2)
+    print(f"✅ Wrote {args.output}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
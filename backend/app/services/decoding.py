@@ -0,0 +1,134 @@
+"""Decoding presets: named trade-offs between output quality and generation time.
+
+Each preset fixes the decoding strategy (greedy, sampling or beam search),
+repetition blocking and early stopping, and bounds the length of every
+generate() call in new tokens derived from the input's token count. A
+preset's token budget caps the decoder tokens one call may produce across
+all of its beams and returned sequences; requests that can't fit in it are
+rejected rather than left to run for as long as the model likes.
+"""
+import math
+import os
+from dataclasses import dataclass, field
+from typing import Any, Dict, Optional
+
+FAST = 'fast'
+BALANCED = 'balanced'
+QUALITY = 'quality'
+PRESETS = (FAST, BALANCED, QUALITY)
+
+# Shortest output worth generating; a budget leaving less than this per sequence is an error
+MIN_NEW_TOKENS = 16
+# Paraphrases may run a few tokens past their length ratio (punctuation, EOS)
+PARAPHRASE_SLACK_TOKENS = 8
+
+
+class DecodingError(ValueError):
+    """An unknown preset, or a request over its preset's token budget"""
+
+
+@dataclass(frozen=True)
+class DecodingPreset:
+    name: str
+    summary: Dict[str, Any]
+    paraphrase: Dict[str, Any]
+    # Paraphrase length bound: input tokens times this, plus PARAPHRASE_SLACK_TOKENS
+    paraphrase_length_ratio: float
+    # Longest output of any single sequence
+    max_new_tokens: int
+    # Decoder tokens per generate() call: new tokens x max(beams, sequences)
+    token_budget: int
+    # Latency relative to balanced, applied to the router's cost curves
+    cost_factor: float
+    description: str = field(default='', compare=False)
+
+    def summary_tokens(self, input_tokens: int, max_length: int, generate_kwargs: Dict[str, Any]) -> int:
+        """max_new_tokens for one summary call: the requested length, at most the
+        input's length, within the preset's cap and budget"""
+        wanted = min(max_length, max(MIN_NEW_TOKENS, input_tokens), self.max_new_tokens)
+        return self._within_budget(wanted, generate_kwargs.get('num_beams', 1), 1, 'summary')
+
+    def paraphrase_tokens(self, input_tokens: int, num_return_sequences: int,
+                          generate_kwargs: Dict[str, Any]) -> int:
+        """max_new_tokens for one paraphrase call of num_return_sequences sequences"""
+        wanted = min(math.ceil(input_tokens * self.paraphrase_length_ratio) + PARAPHRASE_SLACK_TOKENS,
+                     self.max_new_tokens)
+        return self._within_budget(wanted, generate_kwargs.get('num_beams', 1), num_return_sequences, 'paraphrase')
+
+    def paraphrase_kwargs(self, num_return_sequences: int) -> Dict[str, Any]:
+        """Generate options for num_return_sequences paraphrases (beam search
+        needs at least as many beams as returned sequences)"""
+        kwargs = dict(self.paraphrase)
+        if kwargs.get('num_beams', 1) > 1:
+            kwargs['num_beams'] = max(kwargs['num_beams'], num_return_sequences)
+        return kwargs
+
+    def _within_budget(self, wanted: int, num_beams: int, sequences: int, task: str) -> int:
+        width = max(num_beams, sequences)
+        allowed = min(wanted, self.token_budget // width)
+        if allowed < min(wanted, MIN_NEW_TOKENS):
+            hint = 'ask for fewer variations' + ('' if self.name == FAST else f" or use the '{FAST}' preset")
+            raise DecodingError(f"A {task} with {width} beams/sequences exceeds the '{self.name}' preset's "
+                                f"budget of {self.token_budget} tokens; {hint}")
+        return allowed
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'description': self.description,
+            'summary': self.summary,
+            'paraphrase': self.paraphrase,
+            'paraphrase_length_ratio': self.paraphrase_length_ratio,
+            'max_new_tokens': self.max_new_tokens,
+            'token_budget': self.token_budget,
+            'cost_factor': self.cost_factor
+        }
+
+
+DECODING_PRESETS = {
+    FAST: DecodingPreset(
+        name=FAST,
+        description='Greedy summaries, top-k sampled paraphrases, short outputs',
+        summary={'do_sample': False, 'num_beams': 1, 'no_repeat_ngram_size': 3},
+        paraphrase={'do_sample': True, 'num_beams': 1, 'top_k': 50, 'temperature': 0.7,
+                    'no_repeat_ngram_size': 3},
+        paraphrase_length_ratio=1.2,
+        max_new_tokens=int(os.getenv('FAST_MAX_NEW_TOKENS', 128)),
+        token_budget=int(os.getenv('FAST_TOKEN_BUDGET', 1024)),
+        cost_factor=0.5
+    ),
+    BALANCED: DecodingPreset(
+        name=BALANCED,
+        description='Two-beam summaries with early stopping, sampled paraphrases',
+        summary={'do_sample': False, 'num_beams': 2, 'early_stopping': True, 'no_repeat_ngram_size': 3},
+        paraphrase={'do_sample': True, 'num_beams': 1, 'temperature': 0.7, 'no_repeat_ngram_size': 3},
+        paraphrase_length_ratio=1.5,
+        max_new_tokens=int(os.getenv('BALANCED_MAX_NEW_TOKENS', 256)),
+        token_budget=int(os.getenv('BALANCED_TOKEN_BUDGET', 2048)),
+        cost_factor=1.0
+    ),
+    QUALITY: DecodingPreset(
+        name=QUALITY,
+        description='Four-beam summaries favouring longer outputs, beam-sampled paraphrases',
+        summary={'do_sample': False, 'num_beams': 4, 'early_stopping': True, 'no_repeat_ngram_size': 3,
+                 'length_penalty': 2.0},
+        paraphrase={'do_sample': True, 'num_beams': 4, 'temperature': 0.7, 'early_stopping': True,
+                    'no_repeat_ngram_size': 3},
+        paraphrase_length_ratio=2.0,
+        max_new_tokens=int(os.getenv('QUALITY_MAX_NEW_TOKENS', 512)),
+        token_budget=int(os.getenv('QUALITY_TOKEN_BUDGET', 4096)),
+        cost_factor=2.5
+    ),
+}
+
+
+def default_preset_name() -> str:
+    return os.getenv('DECODING_PRESET', BALANCED).lower()
+
+
+def get_preset(name: Optional[str] = None) -> DecodingPreset:
+    """The named preset, or DECODING_PRESET (balanced) when name is None"""
+    name = name or default_preset_name()
+    preset = DECODING_PRESETS.get(name)
+    if preset is None:
+        raise DecodingError(f"Unknown preset '{name}'; expected one of {', '.join(PRESETS)}")
+    return preset
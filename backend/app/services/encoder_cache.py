@@ -0,0 +1,160 @@
+import os
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, List, Optional
+
+# Sampling rounds one request may run to fill its page with unseen variations
+MAX_ROUNDS = int(os.getenv('PARAPHRASE_MAX_ROUNDS', 8))
+
+# torch's RNG is process-wide, so sampling (seeded or not) runs one call at a time:
+# an unseeded call drawing from it mid-way would change a seeded call's output
+_sampling_lock = threading.Lock()
+
+
+@contextmanager
+def sampling(seed: Optional[int] = None, device: str = 'cpu'):
+    """Run torch sampling under the RNG lock, with a fixed seed if one is given,
+    without disturbing other callers' RNG state"""
+    with _sampling_lock:
+        if seed is None:
+            yield
+            return
+        import torch
+        devices = [torch.cuda.current_device()] if device == 'cuda' else []
+        with torch.random.fork_rng(devices=devices):
+            torch.manual_seed(seed)
+            yield
+
+
+def round_seed(seed: int, round_index: int) -> int:
+    return (seed * 1000003 + round_index) % (2 ** 63)
+
+
+class VariationState:
+    """Distinct variations sampled so far per client seed, stream and page size, in the order they were found"""
+
+    def __init__(self):
+        self.variations: Dict[Any, List[str]] = {}
+        self.rounds: Dict[Any, int] = {}
+        self.lock = threading.Lock()
+
+    @property
+    def variation_bytes(self) -> int:
+        return sum(len(text) for texts in self.variations.values() for text in texts)
+
+
+def page_variations(state: VariationState, seed: int, page: int, per_page: int,
+                    sample: Callable[[int], List[str]], exclude: str = '', stream: Any = None) -> List[str]:
+    """Variations page of a seeded sequence, sampling more rounds as needed.
+
+    Round i is sampled with round_seed(seed, i) and duplicates are dropped,
+    so the sequence for a seed is the same every time it is rebuilt, and
+    pages never repeat a variation. Sequences sampled with different settings
+    (stream) or page sizes for the same input are kept apart, since each
+    round samples per_page variations.
+    """
+    needed = (page + 1) * per_page
+    key = (stream, seed, per_page)
+    with state.lock:
+        found = state.variations.setdefault(key, [])
+        for _ in range(MAX_ROUNDS):
+            if len(found) >= needed:
+                break
+            round_index = state.rounds.get(key, 0)
+            state.rounds[key] = round_index + 1
+            for text in sample(round_seed(seed, round_index)):
+                text = text.strip()
+                if text and text != exclude and text not in found:
+                    found.append(text)
+        return found[page * per_page:needed]
+
+
+class EncodedInput(VariationState):
+    """Token ids and encoder output for one input text"""
+
+    def __init__(self, input_tensor, attention_mask, hidden_state, tokens_in: int):
+        super().__init__()
+        self.input_tensor = input_tensor
+        self.attention_mask = attention_mask
+        self.hidden_state = hidden_state
+        self.tokens_in = tokens_in
+
+    def encoder_outputs(self):
+        """A fresh output object each call; generate() expands it in place for multiple sequences"""
+        from transformers.modeling_outputs import BaseModelOutput
+        return BaseModelOutput(last_hidden_state=self.hidden_state)
+
+    @property
+    def nbytes(self) -> int:
+        tensors = (self.input_tensor, self.attention_mask, self.hidden_state)
+        return sum(t.element_size() * t.nelement() for t in tensors if t is not None) + self.variation_bytes
+
+
+class EncoderCache:
+    """Encoder outputs of recent paraphrase inputs, LRU-bounded by their tensor bytes.
+
+    Keyed by model and normalized text, so a request for more variations of
+    the same text only pays for decoding.
+    """
+
+    def __init__(self, max_bytes: Optional[int] = None):
+        if max_bytes is None:
+            max_bytes = int(float(os.getenv('PARAPHRASE_ENCODER_CACHE_MB', 256)) * 1024 * 1024)
+        self.max_bytes = max_bytes
+        self._entries: 'OrderedDict[Any, EncodedInput]' = OrderedDict()
+        self._sizes: Dict[Any, int] = {}
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key) -> Optional[EncodedInput]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def put(self, key, entry: EncodedInput):
+        with self._lock:
+            if key in self._entries:
+                self._bytes -= self._sizes.pop(key)
+            self._entries[key] = entry
+            self._sizes[key] = entry.nbytes
+            self._bytes += self._sizes[key]
+            self._evict()
+
+    def refresh(self, key):
+        """Re-account an entry whose variations grew"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                size = entry.nbytes
+                self._bytes += size - self._sizes[key]
+                self._sizes[key] = size
+                self._evict()
+
+    def _evict(self):
+        # The newest entry stays even if it alone exceeds the budget
+        while self._bytes > self.max_bytes and len(self._entries) > 1:
+            key, _ = self._entries.popitem(last=False)
+            self._bytes -= self._sizes.pop(key)
+            self.evictions += 1
+
+    def status(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / lookups, 3) if lookups else 0.0,
+                'evictions': self.evictions
+            }
@@ -0,0 +1,227 @@
+"""Standalone inference worker process.
+
+A worker owns one TextService (and therefore the model memory) and serves
+summarize/paraphrase/analyze calls from API processes over a
+multiprocessing.connection socket. API processes use
+app.services.remote_service with INFERENCE_WORKERS pointing at the workers.
+
+    # one worker pinned to cores 0-3
+    python -m app.services.inference_worker --port 6001 --cpus 0-3 --backend full
+
+    # several local workers on one host for testing (ports 6001, 6002, ...)
+    python -m app.services.inference_worker --spawn 2 --cpus-per-worker 2 --backend mock
+
+Workers and API processes authenticate with the shared secret in
+INFERENCE_AUTHKEY; neither side starts without it.
+"""
+import argparse
+import os
+import subprocess
+import sys
+import threading
+import time
+import traceback
+from multiprocessing.connection import Listener
+from typing import Any, Dict, List, Optional
+
+from app.services import accounting
+from app.services.thread_plan import configure_threads, current_plan
+
+# Calls a client may make; anything else is rejected
+METHODS = ('summarize', 'paraphrase', 'analyze', 'status')
+PROTOCOL_VERSION = 1
+
+
+def authkey() -> bytes:
+    """The secret shared by workers and API processes; there is no default"""
+    key = os.getenv('INFERENCE_AUTHKEY', '')
+    if not key:
+        raise ValueError('INFERENCE_AUTHKEY is not set; workers and API processes must share a secret key')
+    return key.encode()
+
+
+def parse_cpus(spec: Optional[str]) -> Optional[List[int]]:
+    """Parse a core list such as '0-3,8,10-11'"""
+    if not spec:
+        return None
+    cpus = []
+    for part in spec.split(','):
+        part = part.strip()
+        if '-' in part:
+            first, last = part.split('-', 1)
+            cpus.extend(range(int(first), int(last) + 1))
+        elif part:
+            cpus.append(int(part))
+    return cpus
+
+
+def pin_to_cpus(cpus: Optional[List[int]]):
+    """Restrict this process to the given cores (Linux only)"""
+    if not cpus:
+        return
+    if not hasattr(os, 'sched_setaffinity'):
+        print("⚠️ CPU pinning is not supported on this platform")
+        return
+    os.sched_setaffinity(0, cpus)
+
+
+class InferenceWorker:
+    """Serves TextService calls to API processes over a socket"""
+
+    def __init__(self, host: str, port: int, backend: str, cpus: Optional[List[int]] = None,
+                 max_concurrency: int = 2):
+        self.host = host
+        self.port = port
+        self.backend = backend
+        self.cpus = cpus
+        self.started_at = time.time()
+        self.served = 0
+        self.failed = 0
+        self.in_flight = 0
+        self._slots = threading.BoundedSemaphore(max_concurrency)
+        self._stats_lock = threading.Lock()
+        self.max_concurrency = max_concurrency
+
+        os.environ['TEXT_SERVICE_BACKEND'] = backend
+        from app.services.registry import get_text_service
+        from app.services.acceleration import start_background_warmup
+        self.text_service = get_text_service()
+        start_background_warmup()
+
+    def serve_forever(self):
+        listener = Listener((self.host, self.port), authkey=authkey())
+        print(f"🚀 Inference worker {os.getpid()} ({self.backend}) listening on "
+              f"{self.host}:{self.port}, cpus={self.cpus or 'all'}")
+        while True:
+            try:
+                conn = listener.accept()
+            except Exception as e:
+                print(f"⚠️ Rejected connection: {e}")
+                continue
+            threading.Thread(target=self._handle_connection, args=(conn,), daemon=True).start()
+
+    def status(self) -> Dict[str, Any]:
+        result = {
+            'pid': os.getpid(),
+            'backend': self.backend,
+            'cpus': self.cpus,
+            'threads': current_plan().to_dict(),
+            'uptime_seconds': round(time.time() - self.started_at, 1),
+            'max_concurrency': self.max_concurrency,
+            'in_flight': self.in_flight,
+            'served': self.served,
+            'failed': self.failed
+        }
+        model_manager = getattr(self.text_service, 'model_manager', None)
+        if model_manager is not None:
+            result['models'] = model_manager.status()
+        accelerator = getattr(self.text_service, 'accelerator', None)
+        if accelerator is not None:
+            result['execution'] = accelerator.status()
+        return result
+
+    def _handle_connection(self, conn):
+        with conn:
+            while True:
+                try:
+                    message = conn.recv()
+                except (EOFError, OSError):
+                    return
+                conn.send(self._dispatch(message))
+
+    def _dispatch(self, message: Dict[str, Any]) -> Dict[str, Any]:
+        request_id = message.get('id')
+        method = message.get('method')
+        if message.get('version') != PROTOCOL_VERSION:
+            return {'id': request_id, 'ok': False, 'error': 'Unsupported protocol version'}
+        if method not in METHODS:
+            return {'id': request_id, 'ok': False, 'error': f'Unknown method: {method}'}
+        if method == 'status':
+            return {'id': request_id, 'ok': True, 'result': self.status()}
+
+        with self._slots:
+            with self._stats_lock:
+                self.in_flight += 1
+            # Resources used here are reported back so the API process can account them to its request
+            usage, token = accounting.start()
+            usage.tenant = message.get('tenant', 'anonymous')
+            try:
+                result = getattr(self.text_service, method)(*message.get('args', ()), **message.get('kwargs', {}))
+                with self._stats_lock:
+                    self.served += 1
+                reply = {'id': request_id, 'ok': True, 'result': result}
+            except Exception as e:
+                print(f"Error in worker {method}: {e}")
+                print(traceback.format_exc())
+                with self._stats_lock:
+                    self.failed += 1
+                reply = {'id': request_id, 'ok': False, 'error': str(e)}
+            finally:
+                with self._stats_lock:
+                    self.in_flight -= 1
+            reply['usage'] = accounting.finish(usage, token).to_dict()
+            return reply
+
+
+def spawn_local_workers(count: int, host: str, base_port: int, backend: str, cpus_per_worker: int,
+                        max_concurrency: int) -> int:
+    """Start count workers on consecutive ports, each pinned to its own cores"""
+    available = sorted(os.sched_getaffinity(0)) if hasattr(os, 'sched_getaffinity') else []
+    processes = []
+    addresses = []
+    for index in range(count):
+        port = base_port + index
+        command = [sys.executable, '-m', 'app.services.inference_worker',
+                   '--host', host, '--port', str(port), '--backend', backend,
+                   '--max-concurrency', str(max_concurrency)]
+        cores = available[index * cpus_per_worker:(index + 1) * cpus_per_worker] if cpus_per_worker else []
+        if cores:
+            command += ['--cpus', ','.join(str(core) for core in cores)]
+        processes.append(subprocess.Popen(command))
+        addresses.append(f'{host}:{port}')
+
+    print(f"✅ Started {count} workers; point API processes at them with:")
+    print(f"   TEXT_SERVICE_BACKEND=remote INFERENCE_WORKERS={','.join(addresses)}")
+    try:
+        for process in processes:
+            process.wait()
+    except KeyboardInterrupt:
+        for process in processes:
+            process.terminate()
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--host', default=os.getenv('INFERENCE_WORKER_HOST', '127.0.0.1'))
+    parser.add_argument('--port', type=int, default=int(os.getenv('INFERENCE_WORKER_PORT', 6001)))
+    parser.add_argument('--backend', default=os.getenv('INFERENCE_WORKER_BACKEND', 'full'),
+                        help='TextService backend the worker runs (full, lite, mock)')
+    parser.add_argument('--cpus', help="cores to pin this worker to, e.g. '0-3'")
+    parser.add_argument('--max-concurrency', type=int, default=2,
+                        help='calls executed at once; further calls queue in the worker')
+    parser.add_argument('--spawn', type=int, default=0,
+                        help='start this many local workers on consecutive ports instead')
+    parser.add_argument('--cpus-per-worker', type=int, default=0,
+                        help='with --spawn, pin each worker to this many cores')
+    args = parser.parse_args()
+
+    if args.backend == 'remote':
+        parser.error('a worker cannot use the remote backend')
+    if not os.getenv('INFERENCE_AUTHKEY'):
+        parser.error('set INFERENCE_AUTHKEY to a secret shared with the API processes')
+
+    if args.spawn:
+        return spawn_local_workers(args.spawn, args.host, args.port, args.backend,
+                                   args.cpus_per_worker, args.max_concurrency)
+
+    cpus = parse_cpus(args.cpus)
+    pin_to_cpus(cpus)
+    # One model process per core set: size torch threads to the pinned cores
+    configure_threads(workers=1)
+    InferenceWorker(args.host, args.port, args.backend, cpus, args.max_concurrency).serve_forever()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,302 @@
+import codecs
+import json
+import os
+import zlib
+from typing import Any, Dict, Iterator, List, Tuple
+
+from werkzeug.exceptions import RequestEntityTooLarge
+
+from app.services.chunker import StreamingChunker
+
+# Read the request body in blocks so limits are enforced before everything arrives
+BLOCK_SIZE = 64 * 1024
+
+# JSON escapes (\uXXXX) take up to 6 bytes per character, plus room for options
+JSON_BYTES_PER_CHAR = 6
+JSON_OVERHEAD_BYTES = 64 * 1024
+
+NDJSON_TYPES = ('application/x-ndjson', 'application/ndjson', 'application/jsonl')
+# Request options a text/plain query string or NDJSON record may carry, with their types
+OPTION_FIELDS = {
+    'max_length': int, 'min_length': int, 'variations': int, 'seed': int, 'page': int,
+    'tier': str, 'preset': str,
+}
+
+
+class IngestionError(ValueError):
+    """Request body could not be turned into text (maps to a 4xx response)"""
+    status_code = 400
+
+
+class PayloadTooLarge(IngestionError):
+    status_code = 413
+
+
+class UnsupportedMediaType(IngestionError):
+    status_code = 415
+
+
+def max_text_length() -> int:
+    return int(os.getenv('MAX_TEXT_LENGTH', 75000))
+
+
+def max_documents() -> int:
+    return int(os.getenv('MAX_DOCUMENTS', 50))
+
+
+def max_total_length() -> int:
+    """Combined characters accepted by the multi-document endpoints"""
+    return int(os.getenv('MAX_TOTAL_TEXT_LENGTH', 500000))
+
+
+def _too_long(max_chars: int) -> PayloadTooLarge:
+    return PayloadTooLarge(
+        f'Text too long. Maximum {max_chars:,} characters (approximately {max_chars // 5:,} words) allowed'
+    )
+
+
+def _body_blocks(req) -> Iterator[bytes]:
+    """Yield the (decompressed) request body block by block"""
+    encoding = req.headers.get('Content-Encoding', 'identity').strip().lower()
+    if encoding in ('gzip', 'x-gzip'):
+        decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+    elif encoding in ('', 'identity'):
+        decompressor = None
+    else:
+        raise UnsupportedMediaType(f'Unsupported Content-Encoding: {encoding}')
+
+    try:
+        while True:
+            block = req.stream.read(BLOCK_SIZE)
+            if not block:
+                break
+            if decompressor is None:
+                yield block
+                continue
+            # Bound each inflate step so a compression bomb never expands in one go
+            data = decompressor.decompress(block, BLOCK_SIZE)
+            while data:
+                yield data
+                data = decompressor.decompress(decompressor.unconsumed_tail, BLOCK_SIZE)
+        if decompressor is not None:
+            tail = decompressor.flush()
+            if tail:
+                yield tail
+            if not decompressor.eof:
+                raise IngestionError('Truncated gzip body')
+    except zlib.error as e:
+        raise IngestionError(f'Invalid gzip body: {e}')
+    except RequestEntityTooLarge:
+        raise PayloadTooLarge('File too large')
+
+
+def _parse_options(values) -> Dict[str, Any]:
+    options = {}
+    for field, kind in OPTION_FIELDS.items():
+        value = values.get(field)
+        if value is None:
+            continue
+        if kind is str:
+            if not isinstance(value, str):
+                raise IngestionError(f'{field} must be a string')
+            options[field] = value
+            continue
+        try:
+            options[field] = int(value)
+        except (TypeError, ValueError):
+            raise IngestionError(f'{field} must be an integer')
+    return options
+
+
+def _read_json(req, chunker: StreamingChunker, max_chars: int) -> Dict[str, Any]:
+    """Buffer the body (size-capped while it arrives) and chunk its text field.
+
+    The text is fed only once the whole object is parsed; plain text and
+    NDJSON bodies are the formats chunked as they stream in.
+    """
+    max_bytes = max_chars * JSON_BYTES_PER_CHAR + JSON_OVERHEAD_BYTES
+    body = bytearray()
+    for block in _body_blocks(req):
+        body.extend(block)
+        if len(body) > max_bytes:
+            raise _too_long(max_chars)
+
+    if not body:
+        raise IngestionError('No data provided')
+    try:
+        data = json.loads(body)
+    except ValueError:
+        raise IngestionError('Invalid JSON body')
+    if not isinstance(data, dict):
+        raise IngestionError('JSON body must be an object')
+
+    text = data.get('text', '')
+    if not isinstance(text, str):
+        raise IngestionError('text must be a string')
+    if len(text) > max_chars:
+        raise _too_long(max_chars)
+
+    chunker.feed(text)
+    return data
+
+
+def _read_plain(req, chunker: StreamingChunker, max_chars: int) -> Dict[str, Any]:
+    charset = req.mimetype_params.get('charset', 'utf-8')
+    try:
+        decoder = codecs.getincrementaldecoder(charset)(errors='replace')
+    except LookupError:
+        raise IngestionError(f'Unknown charset: {charset}')
+
+    pieces = []
+    length = 0
+    for block in _body_blocks(req):
+        piece = decoder.decode(block)
+        length += len(piece)
+        if length > max_chars:
+            raise _too_long(max_chars)
+        pieces.append(piece)
+        chunker.feed(piece)
+
+    piece = decoder.decode(b'', final=True)
+    pieces.append(piece)
+    chunker.feed(piece)
+
+    data = _parse_options(req.args)
+    data['text'] = ''.join(pieces)
+    return data
+
+
+def _read_ndjson(req, chunker: StreamingChunker, max_chars: int) -> Dict[str, Any]:
+    """Each line is either a JSON string or an object with a text field;
+    texts are joined as paragraphs and any option fields are merged"""
+    data = _parse_options(req.args)
+    pieces = []
+    length = 0
+    pending = b''
+
+    def handle_line(line: bytes):
+        nonlocal length
+        if not line.strip():
+            return
+        try:
+            record = json.loads(line)
+        except ValueError:
+            raise IngestionError('Invalid NDJSON line')
+        if isinstance(record, dict):
+            data.update(_parse_options(record))
+            text = record.get('text', '')
+        else:
+            text = record
+        if not isinstance(text, str):
+            raise IngestionError('text must be a string')
+        if not text:
+            return
+
+        if pieces:
+            text = '\n\n' + text
+        length += len(text)
+        if length > max_chars:
+            raise _too_long(max_chars)
+        pieces.append(text)
+        chunker.feed(text)
+
+    for block in _body_blocks(req):
+        pending += block
+        if len(pending) > max_chars * JSON_BYTES_PER_CHAR + JSON_OVERHEAD_BYTES:
+            raise _too_long(max_chars)
+        *lines, pending = pending.split(b'\n')
+        for line in lines:
+            handle_line(line)
+    handle_line(pending)
+
+    data['text'] = ''.join(pieces)
+    return data
+
+
+def read_text_request(req, max_chars: int = None) -> Tuple[Dict[str, Any], StreamingChunker]:
+    """Stream a text request body into a StreamingChunker.
+
+    Accepts application/json (the original format), text/plain and NDJSON,
+    each optionally gzip-encoded. Returns the request fields (including the
+    raw text) and the closed chunker holding the normalized text, sentence
+    spans and chunk spans.
+    """
+    max_chars = max_chars or max_text_length()
+    chunker = StreamingChunker()
+    mimetype = req.mimetype
+
+    if mimetype == 'text/plain':
+        data = _read_plain(req, chunker, max_chars)
+    elif mimetype in NDJSON_TYPES:
+        data = _read_ndjson(req, chunker, max_chars)
+    elif mimetype == 'application/json' or mimetype.endswith('+json'):
+        data = _read_json(req, chunker, max_chars)
+    else:
+        raise UnsupportedMediaType(f'Unsupported Content-Type: {mimetype or "none"}')
+
+    chunker.close()
+    return data, chunker
+
+
+
+def _document(record, index: int, max_chars: int) -> Tuple[str, str]:
+    if isinstance(record, dict):
+        doc_id, text = record.get('id', index), record.get('text', '')
+    else:
+        doc_id, text = index, record
+    if not isinstance(text, str):
+        raise IngestionError(f'Document {doc_id}: text must be a string')
+    if len(text) > max_chars:
+        raise PayloadTooLarge(f'Document {doc_id} is too long. Maximum {max_chars:,} characters per document')
+    return str(doc_id), text
+
+
+def read_documents_request(req, max_docs: int = None, max_chars: int = None,
+                           max_total: int = None) -> Tuple[Dict[str, Any], List[Tuple[str, str]]]:
+    """Read a multi-document request body.
+
+    JSON bodies carry {"documents": [...], options}; NDJSON bodies have one
+    document per line. A document is a string or an object with id and text.
+    Returns the options and the (id, text) pairs; empty documents are dropped.
+    """
+    max_docs = max_docs or max_documents()
+    max_chars = max_chars or max_text_length()
+    max_total = max_total or max_total_length()
+    mimetype = req.mimetype
+
+    body = bytearray()
+    for block in _body_blocks(req):
+        body.extend(block)
+        if len(body) > max_total * JSON_BYTES_PER_CHAR + JSON_OVERHEAD_BYTES:
+            raise PayloadTooLarge(f'Documents too long. Maximum {max_total:,} characters in total')
+    if not body:
+        raise IngestionError('No data provided')
+
+    if mimetype in NDJSON_TYPES:
+        data = _parse_options(req.args)
+        try:
+            records = [json.loads(line) for line in body.split(b'\n') if line.strip()]
+        except ValueError:
+            raise IngestionError('Invalid NDJSON line')
+    elif mimetype == 'application/json' or mimetype.endswith('+json'):
+        try:
+            data = json.loads(body)
+        except ValueError:
+            raise IngestionError('Invalid JSON body')
+        if not isinstance(data, dict):
+            raise IngestionError('JSON body must be an object')
+        records = data.pop('documents', None)
+        if not isinstance(records, list):
+            raise IngestionError('documents must be a list')
+    else:
+        raise UnsupportedMediaType(f'Unsupported Content-Type: {mimetype or "none"}')
+
+    documents = [_document(record, index, max_chars) for index, record in enumerate(records)]
+    documents = [(doc_id, text) for doc_id, text in documents if text.strip()]
+    if not documents:
+        raise IngestionError('At least one non-empty document is required')
+    if len(documents) > max_docs:
+        raise IngestionError(f'Too many documents. Maximum {max_docs} allowed')
+    if sum(len(text) for _, text in documents) > max_total:
+        raise PayloadTooLarge(f'Documents too long. Maximum {max_total:,} characters in total')
+    return data, documents
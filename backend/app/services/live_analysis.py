@@ -0,0 +1,324 @@
+"""Incremental analysis for live editing.
+
+A session holds the text as paragraphs (split on blank lines, as the
+paragraph count of /api/analyze is) with cached statistics per paragraph:
+words, sentences, characters, syllables and the VADER valence. An edit
+replaces a character range; only the paragraphs it touches are analyzed
+again, and the totals are adjusted by the difference, so the cost of an
+update depends on the size of the edit rather than the document.
+
+Counts match /api/analyze on the same text: a paragraph without final
+punctuation runs on into the next one's first sentence there, so such
+paragraphs are tracked and subtracted, and character counts leave out the
+leading and trailing whitespace /api/analyze strips. Readability and
+sentiment are approximations: readability is the Flesch reading ease of
+the summed counts, and sentiment sums the paragraphs' VADER valences and
+normalizes the sum the way VADER normalizes one text.
+"""
+import math
+import os
+import threading
+import time
+import uuid
+from bisect import bisect_right
+from collections import OrderedDict, deque
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.models.text_models import TextAnalysis
+from app.services.analysis_pool import sentiment_label
+from app.services.chunker import ends_sentence, normalize_text, sentence_spans
+
+PARAGRAPH_BREAK = '\n\n'
+# VADER's normalization constant: compound = valence / sqrt(valence^2 + alpha)
+VADER_ALPHA = 15
+
+
+class LiveAnalysisError(ValueError):
+    """An edit that doesn't apply to the session's text"""
+
+    def __init__(self, message: str, status_code: int = 400):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+class _Paragraph:
+    __slots__ = ('text', 'words', 'sentences', 'open_end', 'characters', 'characters_no_spaces', 'syllables',
+                 'valence')
+
+    def __init__(self, text: str, analyzer: 'LiveAnalysis'):
+        self.text = text
+        self.words = len(text.split())
+        normalized = normalize_text(text) if self.words else ''
+        self.sentences = len(sentence_spans(normalized)) if normalized else 0
+        # The last sentence continues into the next paragraph's first
+        self.open_end = 1 if self.sentences and not ends_sentence(normalized) else 0
+        self.characters = len(text)
+        self.characters_no_spaces = len(text.replace(' ', ''))
+        self.syllables = analyzer.syllables(text) if self.words else 0
+        self.valence = analyzer.valence(text) if self.words else 0.0
+
+
+_COUNTERS = ('words', 'sentences', 'open_end', 'characters', 'characters_no_spaces', 'syllables', 'valence')
+
+
+class LiveSession:
+    """One document being edited, with running totals over its paragraphs"""
+
+    def __init__(self, session_id: str, text: str, analyzer: 'LiveAnalysis'):
+        self.session_id = session_id
+        self.analyzer = analyzer
+        self.version = 0
+        self.lock = threading.Lock()
+        self.last_used = time.time()
+        self.paragraphs = [_Paragraph(part, analyzer) for part in text.split(PARAGRAPH_BREAK)]
+        self._starts = []
+        self._reindex(0)
+        self.totals = {name: sum(getattr(p, name) for p in self.paragraphs) for name in _COUNTERS}
+        self.nonempty = sum(1 for p in self.paragraphs if p.words or p.text.strip())
+
+    @property
+    def length(self) -> int:
+        last = self.paragraphs[-1]
+        return self._starts[-1] + last.characters
+
+    @property
+    def text(self) -> str:
+        return PARAGRAPH_BREAK.join(p.text for p in self.paragraphs)
+
+    def check(self, edits: List[Tuple[int, int, str]]):
+        """Raise if any edit would fail, so a batch applies entirely or not at all"""
+        total = self.length
+        for offset, length, replacement in edits:
+            if offset < 0 or length < 0 or offset + length > total:
+                raise LiveAnalysisError(f"Edit [{offset}, {offset + length}) is outside the text (length {total})")
+            total += len(replacement) - length
+            if total > self.analyzer.max_chars:
+                raise LiveAnalysisError(f"Text too long. Maximum {self.analyzer.max_chars} characters allowed")
+
+    def apply(self, offset: int, length: int, replacement: str) -> int:
+        """Replace length characters at offset (checked beforehand); returns the paragraphs analyzed again"""
+        # The paragraphs from the one holding the edit's start to the one holding its end;
+        # an end inside a paragraph break takes in the paragraph after it
+        first = bisect_right(self._starts, offset) - 1
+        last = bisect_right(self._starts, offset + length) - 1
+        if offset + length > self._starts[last] + self.paragraphs[last].characters:
+            last += 1
+        start = self._starts[first]
+        region = PARAGRAPH_BREAK.join(p.text for p in self.paragraphs[first:last + 1])
+        region = region[:offset - start] + replacement + region[offset + length - start:]
+
+        new = [_Paragraph(part, self.analyzer) for part in region.split(PARAGRAPH_BREAK)]
+        for paragraph, sign in [(p, -1) for p in self.paragraphs[first:last + 1]] + [(p, 1) for p in new]:
+            for name in _COUNTERS:
+                self.totals[name] += sign * getattr(paragraph, name)
+            self.nonempty += sign * (1 if paragraph.words or paragraph.text.strip() else 0)
+        self.paragraphs[first:last + 1] = new
+        self._reindex(first)
+        return len(new)
+
+    def _reindex(self, first: int):
+        """Character offsets of the paragraphs from index first on"""
+        del self._starts[first:]
+        position = self._starts[first - 1] + self.paragraphs[first - 1].characters + len(PARAGRAPH_BREAK) \
+            if first else 0
+        for paragraph in self.paragraphs[first:]:
+            self._starts.append(position)
+            position += paragraph.characters + len(PARAGRAPH_BREAK)
+
+    def _edges(self) -> str:
+        """The leading and trailing whitespace /api/analyze strips (all of a blank text)"""
+        leading = []
+        for paragraph in self.paragraphs:
+            content = paragraph.text.lstrip()
+            leading.append(paragraph.text[:len(paragraph.text) - len(content)])
+            if content:
+                break
+        else:
+            return self.text
+        trailing = []
+        for paragraph in reversed(self.paragraphs):
+            content = paragraph.text.rstrip()
+            trailing.append(paragraph.text[len(content):])
+            if content:
+                break
+        return PARAGRAPH_BREAK.join(leading) + PARAGRAPH_BREAK.join(trailing)
+
+    def analysis(self) -> Dict[str, Any]:
+        """The /api/analyze fields, from the running totals"""
+        totals = self.totals
+        breaks = len(PARAGRAPH_BREAK) * (len(self.paragraphs) - 1)
+        edges = self._edges()
+        words = totals['words']
+        # Every open paragraph but the last one with sentences merges into its successor
+        last = next((p for p in reversed(self.paragraphs) if p.sentences), None)
+        sentences = totals['sentences'] - totals['open_end'] + (last.open_end if last else 0)
+        if self.analyzer.readability_available and words and sentences:
+            readability = 206.835 - 1.015 * (words / sentences) - 84.6 * (totals['syllables'] / words)
+        else:
+            readability = self.analyzer.readability_fallback
+        valence = totals['valence']
+        score = valence / math.sqrt(valence * valence + VADER_ALPHA) if valence else 0.0
+        return TextAnalysis(
+            word_count=words,
+            sentence_count=sentences,
+            paragraph_count=self.nonempty,
+            character_count=totals['characters'] + breaks - len(edges),
+            character_count_no_spaces=totals['characters_no_spaces'] + breaks - len(edges.replace(' ', '')),
+            reading_time_minutes=words / 200,
+            readability_score=readability,
+            sentiment_score=score,
+            sentiment_label=sentiment_label(score)
+        ).to_dict()
+
+
+class LiveAnalysis:
+    """Live analysis sessions, LRU-bounded and expired when idle"""
+
+    def __init__(self, max_sessions: Optional[int] = None, ttl_seconds: Optional[float] = None,
+                 max_chars: Optional[int] = None):
+        self.max_sessions = max_sessions or int(os.getenv('LIVE_ANALYSIS_MAX_SESSIONS', 1000))
+        self.ttl_seconds = ttl_seconds if ttl_seconds is not None else \
+            float(os.getenv('LIVE_ANALYSIS_TTL_SECONDS', 900))
+        self.max_chars = max_chars or int(os.getenv('LIVE_ANALYSIS_MAX_CHARS', 75000))
+        self.readability_fallback = 50.0
+        self._sessions: 'OrderedDict[str, LiveSession]' = OrderedDict()
+        self._lock = threading.Lock()
+        self._textstat = None
+        self._vader = None
+        self._load_analyzers()
+        self.created = 0
+        self.expired = 0
+        self.edits = 0
+        self._update_seconds = deque(maxlen=1000)
+
+    def _load_analyzers(self):
+        try:
+            import textstat
+            self._textstat = textstat
+        except ImportError:
+            print("⚠️ textstat is not installed; live readability uses the fallback score")
+        try:
+            from app.services import nltk_resources
+            self._vader = nltk_resources.vader()
+        except Exception as e:
+            print(f"⚠️ VADER unavailable for live analysis ({e}); sentiment is neutral")
+
+    @property
+    def readability_available(self) -> bool:
+        return self._textstat is not None
+
+    def syllables(self, text: str) -> int:
+        return self._textstat.syllable_count(text) if self._textstat is not None else 0
+
+    def valence(self, text: str) -> float:
+        """The summed VADER valence behind the text's compound score"""
+        if self._vader is None:
+            return 0.0
+        compound = max(-0.9999, min(0.9999, self._vader.polarity_scores(text)['compound']))
+        return compound * math.sqrt(VADER_ALPHA / (1 - compound * compound))
+
+    def create(self, text: str) -> LiveSession:
+        if len(text) > self.max_chars:
+            raise LiveAnalysisError(f"Text too long. Maximum {self.max_chars} characters allowed")
+        session = LiveSession(uuid.uuid4().hex, text, self)
+        with self._lock:
+            self._expire()
+            self._sessions[session.session_id] = session
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+                self.expired += 1
+            self.created += 1
+        return session
+
+    def get(self, session_id: str) -> LiveSession:
+        with self._lock:
+            self._expire()
+            session = self._sessions.get(session_id)
+            if session is None:
+                raise LiveAnalysisError(f"Unknown or expired session '{session_id}'", 404)
+            self._sessions.move_to_end(session_id)
+            session.last_used = time.time()
+            return session
+
+    def edit(self, session_id: str, edits: List[Dict[str, Any]], version: Optional[int] = None) -> Dict[str, Any]:
+        """Apply edits in order (each against the text left by the previous one)"""
+        session = self.get(session_id)
+        start = time.perf_counter()
+        with session.lock:
+            if version is not None and version != session.version:
+                raise LiveAnalysisError(f"Session is at version {session.version}, not {version}; "
+                                        f"fetch its text again or start a new session", 409)
+            parsed = [_parse_edit(edit) for edit in edits]
+            session.check(parsed)
+            reanalyzed = sum(session.apply(*edit) for edit in parsed)
+            session.version += 1
+            result = {'session_id': session.session_id, 'version': session.version,
+                      'analysis': session.analysis(), 'paragraphs_reanalyzed': reanalyzed}
+        elapsed = time.perf_counter() - start
+        with self._lock:
+            self.edits += len(edits)
+            self._update_seconds.append(elapsed)
+        return {**result, 'processing_time': round(elapsed, 4)}
+
+    def delete(self, session_id: str) -> bool:
+        with self._lock:
+            return self._sessions.pop(session_id, None) is not None
+
+    def _expire(self):
+        if self.ttl_seconds <= 0:
+            return
+        cutoff = time.time() - self.ttl_seconds
+        while self._sessions:
+            session_id, session = next(iter(self._sessions.items()))
+            if session.last_used >= cutoff:
+                break
+            del self._sessions[session_id]
+            self.expired += 1
+
+    def status(self) -> Dict[str, Any]:
+        with self._lock:
+            self._expire()
+            updates = sorted(self._update_seconds)
+            return {
+                'sessions': len(self._sessions),
+                'max_sessions': self.max_sessions,
+                'ttl_seconds': self.ttl_seconds,
+                'created': self.created,
+                'expired': self.expired,
+                'edits': self.edits,
+                'update_ms': {
+                    'mean': round(sum(updates) / len(updates) * 1000, 3) if updates else 0.0,
+                    'p95': round(updates[min(len(updates) - 1, int(len(updates) * 0.95))] * 1000, 3)
+                    if updates else 0.0
+                }
+            }
+
+
+def _parse_edit(edit: Any):
+    """(offset, length, replacement) from {"offset", "length", "text"}"""
+    if not isinstance(edit, dict):
+        raise LiveAnalysisError('Each edit must be an object with offset, length and text')
+    offset, length, replacement = edit.get('offset'), edit.get('length', 0), edit.get('text', '')
+    for name, value in (('offset', offset), ('length', length)):
+        if not isinstance(value, int) or isinstance(value, bool):
+            raise LiveAnalysisError(f'Edit {name} must be an integer')
+    if not isinstance(replacement, str):
+        raise LiveAnalysisError('Edit text must be a string')
+    return offset, length, replacement
+
+
+_live = None
+_live_lock = threading.Lock()
+
+
+def get_live_analysis() -> LiveAnalysis:
+    global _live
+    if _live is None:
+        with _live_lock:
+            if _live is None:
+                _live = LiveAnalysis()
+    return _live
+
+
+def peek_live_analysis() -> Optional[LiveAnalysis]:
+    return _live
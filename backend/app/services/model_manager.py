@@ -0,0 +1,264 @@
+import gc
+import os
+import sys
+import threading
+import time
+from collections import Counter, deque
+from typing import Any, Callable, Dict, Optional
+
+_PAGE_SIZE = os.sysconf('SC_PAGE_SIZE') if hasattr(os, 'sysconf') else 4096
+
+
+def _current_rss() -> int:
+    """Resident set size of this process in bytes (0 where /proc is unavailable)"""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * _PAGE_SIZE
+    except (OSError, ValueError, IndexError):
+        return 0
+
+
+def _torch_module(model: Any):
+    """Find the torch module behind a pipeline or a {'model', 'tokenizer'} dict"""
+    if isinstance(model, dict):
+        return model.get('model')
+    return getattr(model, 'model', model)
+
+
+def estimate_model_size(model: Any) -> int:
+    """Bytes held by a model's parameters and buffers, 0 if it is not a torch module"""
+    module = _torch_module(model)
+    try:
+        tensors = list(module.parameters()) + list(module.buffers())
+    except (AttributeError, TypeError):
+        return 0
+    return sum(t.numel() * t.element_size() for t in tensors)
+
+
+class _Entry:
+    def __init__(self, name: str, loader: Callable[[], Any]):
+        self.name = name
+        self.loader = loader
+        self.model = None
+        self.size_bytes = 0
+        self.known_size_bytes = 0
+        self.last_used = 0.0
+        self.loaded_at = 0.0
+        self.load_seconds = 0.0
+        self.loads = 0
+        self.evictions = 0
+        self.hits = 0
+        self.lock = threading.Lock()
+
+
+class ModelManager:
+    """Loads models on demand and keeps their total resident size under a budget.
+
+    Every model is registered with a loader. get() loads it on first use and
+    records its size and last use; whenever the budget is exceeded the least
+    recently used models are evicted, and models idle for longer than
+    idle_seconds are evicted by a background sweep. Evicted models are simply
+    reloaded by the next get(). A request that still holds an evicted model
+    keeps it alive until it finishes.
+    """
+
+    def __init__(self, budget_mb: Optional[float] = None, idle_seconds: Optional[float] = None,
+                 prefetch: Optional[bool] = None):
+        if budget_mb is None:
+            budget_mb = float(os.getenv('MODEL_MEMORY_BUDGET_MB', 0))
+        if idle_seconds is None:
+            idle_seconds = float(os.getenv('MODEL_IDLE_SECONDS', 900))
+        if prefetch is None:
+            prefetch = os.getenv('MODEL_PREFETCH', 'false').lower() == 'true'
+
+        # A budget of 0 means unlimited; idle eviction still applies
+        self.budget_bytes = int(budget_mb * 1024 * 1024)
+        self.idle_seconds = idle_seconds
+        self.prefetch_enabled = prefetch
+        self.prefetch_share = float(os.getenv('MODEL_PREFETCH_SHARE', 0.2))
+
+        self._entries: Dict[str, _Entry] = {}
+        self._lock = threading.RLock()
+        self._recent = deque(maxlen=int(os.getenv('MODEL_PREFETCH_WINDOW', 50)))
+        self._prefetching = set()
+        self._sweeper = None
+
+    def register(self, name: str, loader: Callable[[], Any]):
+        """Register a loader; the model is not loaded until first requested"""
+        with self._lock:
+            self._entries[name] = _Entry(name, loader)
+
+    def get(self, name: str) -> Any:
+        """Return the named model, loading it (and evicting others) if needed"""
+        entry = self._entries[name]
+        with self._lock:
+            self._recent.append(name)
+
+        model = self._ensure_loaded(entry)
+        entry.hits += 1
+
+        if self.prefetch_enabled:
+            self._schedule_prefetch()
+        return model
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._entries
+
+    def is_loaded(self, name: str) -> bool:
+        entry = self._entries.get(name)
+        return entry is not None and entry.model is not None
+
+    @property
+    def resident_bytes(self) -> int:
+        return sum(e.size_bytes for e in self._entries.values() if e.model is not None)
+
+    def evict(self, name: str) -> bool:
+        """Drop a loaded model; returns False if it was not loaded"""
+        with self._lock:
+            entry = self._entries.get(name)
+            if entry is None or entry.model is None:
+                return False
+            print(f"♻️ Evicting model '{name}' ({entry.size_bytes / 1024 / 1024:.0f} MB)")
+            entry.model = None
+            entry.size_bytes = 0
+            entry.evictions += 1
+        self._release_memory()
+        return True
+
+    def evict_idle(self) -> int:
+        """Evict every model unused for longer than idle_seconds"""
+        if self.idle_seconds <= 0:
+            return 0
+        cutoff = time.time() - self.idle_seconds
+        idle = [e.name for e in self._entries.values()
+                if e.model is not None and e.last_used < cutoff]
+        return sum(1 for name in idle if self.evict(name))
+
+    def status(self) -> Dict[str, Any]:
+        now = time.time()
+        models = {}
+        for entry in self._entries.values():
+            models[entry.name] = {
+                'loaded': entry.model is not None,
+                'size_mb': round(entry.size_bytes / 1024 / 1024, 1),
+                'idle_seconds': round(now - entry.last_used, 1) if entry.model is not None else None,
+                'load_seconds': round(entry.load_seconds, 2),
+                'loads': entry.loads,
+                'evictions': entry.evictions,
+                'hits': entry.hits
+            }
+        return {
+            'budget_mb': round(self.budget_bytes / 1024 / 1024, 1) if self.budget_bytes else None,
+            'resident_mb': round(self.resident_bytes / 1024 / 1024, 1),
+            'idle_eviction_seconds': self.idle_seconds,
+            'prefetch': self.prefetch_enabled,
+            'recent_mix': dict(Counter(self._recent)),
+            'models': models
+        }
+
+    def _ensure_loaded(self, entry: _Entry) -> Any:
+        model = entry.model
+        if model is not None:
+            entry.last_used = time.time()
+            return model
+
+        # Per-model lock: concurrent requests wait for one load instead of racing
+        with entry.lock:
+            if entry.model is None:
+                self._load(entry)
+            entry.last_used = time.time()
+            return entry.model
+
+    def _load(self, entry: _Entry):
+        rss_before = _current_rss()
+        start_time = time.time()
+        model = entry.loader()
+        if model is None:
+            raise RuntimeError(f"Loader for model '{entry.name}' returned nothing")
+
+        size = estimate_model_size(model) or max(0, _current_rss() - rss_before)
+        with self._lock:
+            entry.model = model
+            entry.size_bytes = size
+            entry.known_size_bytes = size
+            entry.loaded_at = time.time()
+            entry.load_seconds = entry.loaded_at - start_time
+            entry.loads += 1
+            entry.last_used = entry.loaded_at
+            self._enforce_budget(keep=entry.name)
+        self._start_sweeper()
+
+    def _enforce_budget(self, keep: str):
+        if not self.budget_bytes:
+            return
+        loaded = sorted(
+            (e for e in self._entries.values() if e.model is not None and e.name != keep),
+            key=lambda e: e.last_used
+        )
+        for entry in loaded:
+            if self.resident_bytes <= self.budget_bytes:
+                break
+            self.evict(entry.name)
+        if self.resident_bytes > self.budget_bytes:
+            print(f"⚠️ Model '{keep}' alone exceeds the memory budget of "
+                  f"{self.budget_bytes / 1024 / 1024:.0f} MB")
+
+    def _schedule_prefetch(self):
+        """Load models that are a large share of recent requests but currently evicted"""
+        with self._lock:
+            if not self._recent:
+                return
+            counts = Counter(self._recent)
+            total = len(self._recent)
+            free_bytes = self.budget_bytes - self.resident_bytes if self.budget_bytes else None
+            candidates = []
+            for name, count in counts.most_common():
+                entry = self._entries[name]
+                if count / total < self.prefetch_share:
+                    break
+                if entry.model is not None or name in self._prefetching:
+                    continue
+                # Prefetching never evicts: only use memory that is free under the budget
+                if free_bytes is not None:
+                    if entry.known_size_bytes > free_bytes:
+                        continue
+                    free_bytes -= entry.known_size_bytes
+                candidates.append(name)
+            self._prefetching.update(candidates)
+
+        for name in candidates:
+            threading.Thread(target=self._prefetch, args=(name,), daemon=True).start()
+
+    def _prefetch(self, name: str):
+        try:
+            print(f"📦 Prefetching model '{name}'")
+            self._ensure_loaded(self._entries[name])
+        except Exception as e:
+            print(f"⚠️ Prefetch of model '{name}' failed: {e}")
+        finally:
+            with self._lock:
+                self._prefetching.discard(name)
+
+    def _start_sweeper(self):
+        if self._sweeper is not None or self.idle_seconds <= 0:
+            return
+        with self._lock:
+            if self._sweeper is not None:
+                return
+            self._sweeper = threading.Thread(target=self._sweep, daemon=True)
+            self._sweeper.start()
+
+    def _sweep(self):
+        interval = max(1.0, min(60.0, self.idle_seconds / 4))
+        while True:
+            time.sleep(interval)
+            try:
+                self.evict_idle()
+            except Exception as e:
+                print(f"⚠️ Idle model sweep failed: {e}")
+
+    def _release_memory(self):
+        gc.collect()
+        torch = sys.modules.get('torch')
+        if torch is not None and torch.cuda.is_available():
+            torch.cuda.empty_cache()
@@ -0,0 +1,301 @@
+"""Offline model store.
+
+Models are packaged once at build time instead of being resolved from the
+Hugging Face hub on first use:
+
+    python -m app.services.model_store pack                  # the full backend's models
+    python -m app.services.model_store pack --backend lite
+    python -m app.services.model_store pack --model facebook/bart-large-cnn@<revision>
+    python -m app.services.model_store verify                # recheck every checksum
+
+Packing resolves each model's revision to a commit hash, converts its weights
+to safetensors and records a sha256 per file in MODEL_STORE_DIR/manifest.json.
+Once a manifest exists the services load only from the store (hub access is
+switched off; MODEL_STORE_OFFLINE=false allows the hub for models the store
+doesn't have). safetensors files are memory-mapped, so weights are paged in
+from the file instead of being unpickled and copied.
+"""
+import argparse
+import datetime
+import hashlib
+import json
+import os
+import shutil
+import sys
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+DEFAULT_STORE_DIR = os.path.join(BACKEND_DIR, 'model_store')
+MANIFEST = 'manifest.json'
+MANIFEST_VERSION = 1
+
+# Packaged weights are always safetensors; pickle checkpoints are never copied
+WEIGHT_SUFFIX = '.safetensors'
+
+
+class ModelStoreError(RuntimeError):
+    """A model is missing from the store or fails verification"""
+
+
+def store_dir() -> str:
+    return os.getenv('MODEL_STORE_DIR', DEFAULT_STORE_DIR)
+
+
+def _sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _directory_name(repo: str) -> str:
+    return repo.replace('/', '--')
+
+
+class ModelStore:
+    """Read side of the store: resolves hub names to packaged directories.
+
+    Files are checked against the manifest the first time a model is
+    resolved: every sha256 by default (MODEL_STORE_VERIFY=full), sizes only
+    with MODEL_STORE_VERIFY=size, not at all with off.
+    """
+
+    def __init__(self, directory: Optional[str] = None, verify: Optional[str] = None,
+                 offline: Optional[bool] = None):
+        self.directory = directory or store_dir()
+        self.verify_mode = (verify or os.getenv('MODEL_STORE_VERIFY', 'full')).lower()
+        self.manifest = self._read_manifest()
+        if offline is None:
+            setting = os.getenv('MODEL_STORE_OFFLINE', 'auto').lower()
+            offline = self.manifest is not None if setting == 'auto' else setting == 'true'
+        self.offline = offline
+        self._verified = set()
+        self._lock = threading.Lock()
+        if self.offline:
+            # Read by huggingface_hub/transformers at import, which happens after this on first model use
+            os.environ['HF_HUB_OFFLINE'] = '1'
+            os.environ['TRANSFORMERS_OFFLINE'] = '1'
+
+    def _read_manifest(self) -> Optional[Dict[str, Any]]:
+        path = os.path.join(self.directory, MANIFEST)
+        if not os.path.exists(path):
+            return None
+        with open(path) as f:
+            manifest = json.load(f)
+        if manifest.get('version') != MANIFEST_VERSION:
+            raise ModelStoreError(f"Unsupported model store manifest version in {path}")
+        return manifest
+
+    @property
+    def models(self) -> Dict[str, Dict[str, Any]]:
+        return (self.manifest or {}).get('models', {})
+
+    def resolve(self, repo: str) -> Tuple[str, Dict[str, Any]]:
+        """(name or path, from_pretrained kwargs) to load repo with.
+
+        Packaged models load from their local directory with memory-mapped
+        safetensors; others come from the hub unless the store is offline.
+        """
+        entry = self.models.get(repo)
+        if entry is None:
+            if self.offline:
+                raise ModelStoreError(f"{repo} is not in the model store at {self.directory}; "
+                                      f"run 'python -m app.services.model_store pack --model {repo}'")
+            return repo, {}
+
+        if self.verify_mode != 'off' and repo not in self._verified:
+            with self._lock:
+                if repo not in self._verified:
+                    problems = self.verify(repo, full=self.verify_mode == 'full')
+                    if problems:
+                        raise ModelStoreError(f"Model store entry for {repo} failed verification: "
+                                              + '; '.join(problems))
+                    self._verified.add(repo)
+        print(f"📦 Loading {repo}@{entry['revision'][:12]} from the model store")
+        return os.path.join(self.directory, entry['path']), {
+            'local_files_only': True,
+            'use_safetensors': True,
+            # Parameters are assigned from the memory-mapped tensors instead of
+            # being initialized and then overwritten
+            'low_cpu_mem_usage': True,
+        }
+
+    def verify(self, repo: Optional[str] = None, full: bool = True) -> List[str]:
+        """Mismatches between the files on disk and the manifest (empty if intact)"""
+        problems = []
+        for name, entry in self.models.items():
+            if repo is not None and name != repo:
+                continue
+            for relative, expected in entry['files'].items():
+                path = os.path.join(self.directory, entry['path'], relative)
+                if not os.path.exists(path):
+                    problems.append(f"{name}: {relative} is missing")
+                elif os.path.getsize(path) != expected['bytes']:
+                    problems.append(f"{name}: {relative} has {os.path.getsize(path)} bytes, "
+                                    f"expected {expected['bytes']}")
+                elif full and _sha256(path) != expected['sha256']:
+                    problems.append(f"{name}: {relative} checksum mismatch")
+        return problems
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            'directory': self.directory,
+            'offline': self.offline,
+            'verify': self.verify_mode,
+            'packed_at': (self.manifest or {}).get('packed_at'),
+            'models': {
+                repo: {
+                    'revision': entry['revision'],
+                    'bytes': sum(f['bytes'] for f in entry['files'].values()),
+                    'verified': repo in self._verified
+                }
+                for repo, entry in self.models.items()
+            }
+        }
+
+
+def _model_class(config):
+    import transformers
+    if getattr(config, 'is_encoder_decoder', False):
+        return transformers.AutoModelForSeq2SeqLM
+    return transformers.AutoModelForSequenceClassification
+
+
+def pack_model(repo: str, revision: Optional[str], directory: str) -> Dict[str, Any]:
+    """Download repo at revision, save it as safetensors under directory and
+    return its manifest entry"""
+    from huggingface_hub import HfApi
+    from transformers import AutoConfig, AutoTokenizer
+
+    # Branch or tag names move; the commit hash they point to now doesn't
+    commit = HfApi().model_info(repo, revision=revision).sha
+    print(f"📥 Packing {repo}@{commit[:12]}...")
+
+    target = os.path.join(directory, _directory_name(repo))
+    staging = target + '.partial'
+    shutil.rmtree(staging, ignore_errors=True)
+
+    config = AutoConfig.from_pretrained(repo, revision=commit)
+    model = _model_class(config).from_pretrained(repo, revision=commit, low_cpu_mem_usage=True)
+    tokenizer = AutoTokenizer.from_pretrained(repo, revision=commit)
+    model.save_pretrained(staging, safe_serialization=True)
+    tokenizer.save_pretrained(staging)
+    del model
+
+    files = {}
+    for root, _, names in os.walk(staging):
+        for name in sorted(names):
+            path = os.path.join(root, name)
+            files[os.path.relpath(path, staging)] = {'bytes': os.path.getsize(path), 'sha256': _sha256(path)}
+    if not any(relative.endswith(WEIGHT_SUFFIX) for relative in files):
+        raise ModelStoreError(f"{repo} produced no safetensors weights")
+
+    shutil.rmtree(target, ignore_errors=True)
+    os.replace(staging, target)
+    size_mb = sum(f['bytes'] for f in files.values()) / (1024 * 1024)
+    print(f"✅ {repo}: {len(files)} files, {size_mb:.0f} MB")
+    return {
+        'path': _directory_name(repo),
+        'revision': commit,
+        'requested_revision': revision or 'main',
+        'architecture': (config.architectures or [type(config).__name__])[0],
+        'files': files
+    }
+
+
+def pack(repos: List[Tuple[str, Optional[str]]], directory: Optional[str] = None) -> Dict[str, Any]:
+    """Package repos (with optional revisions) into the store and update its manifest"""
+    import torch
+    import transformers
+
+    directory = directory or store_dir()
+    os.makedirs(directory, exist_ok=True)
+    manifest_path = os.path.join(directory, MANIFEST)
+    manifest = {'version': MANIFEST_VERSION, 'models': {}}
+    if os.path.exists(manifest_path):
+        with open(manifest_path) as f:
+            manifest = json.load(f)
+
+    for repo, revision in repos:
+        manifest['models'][repo] = pack_model(repo, revision, directory)
+        # Written after each model so an interrupted run keeps what it finished
+        manifest.update({
+            'packed_at': datetime.datetime.utcnow().isoformat(),
+            'transformers': transformers.__version__,
+            'torch': torch.__version__
+        })
+        with open(manifest_path + '.tmp', 'w') as f:
+            json.dump(manifest, f, indent=2, sort_keys=True)
+        os.replace(manifest_path + '.tmp', manifest_path)
+    return manifest
+
+
+def backend_repos(backend: str) -> List[str]:
+    """Hub names of the models a backend loads"""
+    if backend == 'lite':
+        from app.services.text_service_lite import TextService
+    else:
+        from app.services.text_service import TextService
+    return list(dict.fromkeys(TextService().model_repos))
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_model_store() -> ModelStore:
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = ModelStore()
+    return _store
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--dir', default=None, help=f'store directory (default: MODEL_STORE_DIR or {DEFAULT_STORE_DIR})')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    pack_parser = commands.add_parser('pack', help='download, convert and checksum models')
+    pack_parser.add_argument('--backend', choices=('full', 'lite'), default='full',
+                             help='package the models this backend loads (ignored with --model)')
+    pack_parser.add_argument('--model', action='append', default=[],
+                             help='hub name, optionally @revision (branch, tag or commit); repeatable')
+
+    verify_parser = commands.add_parser('verify', help='check every file against the manifest')
+    verify_parser.add_argument('--sizes-only', action='store_true', help='skip the sha256 checksums')
+
+    args = parser.parse_args()
+    directory = args.dir or store_dir()
+
+    if args.command == 'pack':
+        if args.model:
+            repos = [tuple(spec.split('@', 1)) if '@' in spec else (spec, None) for spec in args.model]
+        else:
+            repos = [(repo, None) for repo in backend_repos(args.backend)]
+        try:
+            pack(repos, directory)
+        except Exception as e:
+            print(f"❌ Packing failed: {e}")
+            return 1
+        print(f"✅ Model store written to {directory}")
+        return 0
+
+    store = ModelStore(directory, offline=False)
+    if store.manifest is None:
+        print(f"❌ No manifest in {directory}")
+        return 1
+    problems = store.verify(full=not args.sizes_only)
+    for problem in problems:
+        print(f"❌ {problem}")
+    if problems:
+        return 1
+    print(f"✅ {len(store.models)} models verified")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
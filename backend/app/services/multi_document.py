@@ -0,0 +1,178 @@
+import os
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.models.document import Document
+from app.services import accounting
+from app.services.chunker import CHUNK_WORDS
+from app.services.decoding import get_preset
+from app.services.router import LOCAL_TIERS, get_router
+from app.services.scheduler import INTERACTIVE
+from app.services.similarity_cache import MinHasher, SimilarityIndex
+
+# Sentences are compared on word pairs; they are short, so 4-word shingles would be too coarse
+SENTENCE_SHINGLE_WORDS = 2
+# Sentences shorter than this are only dropped when repeated exactly
+MIN_FUZZY_SENTENCE_WORDS = 5
+# Texts this short are used as their own summary instead of calling the model
+MIN_SUMMARY_WORDS = 60
+
+_WORD = re.compile(r'\w+')
+
+# Bounded pool for the per-document and per-group model calls; the scheduler
+# still decides how many of them run at once
+_executor = ThreadPoolExecutor(
+    max_workers=int(os.getenv('MULTI_MAX_WORKERS', 3)),
+    thread_name_prefix='multi-summarize'
+)
+
+
+class SentenceDeduplicator:
+    """Remembers sentences seen so far and flags exact and near-duplicate repeats"""
+
+    def __init__(self, threshold: float = None):
+        if threshold is None:
+            threshold = float(os.getenv('MULTI_DEDUP_THRESHOLD', 0.8))
+        self.hasher = MinHasher(shingle_words=SENTENCE_SHINGLE_WORDS)
+        self.index = SimilarityIndex(max_entries=1_000_000, threshold=threshold)
+        self._exact = set()
+
+    def is_duplicate(self, sentence: str) -> bool:
+        words = _WORD.findall(sentence.lower())
+        key = ' '.join(words)
+        if not key or key in self._exact:
+            return True
+        self._exact.add(key)
+        if len(words) < MIN_FUZZY_SENTENCE_WORDS:
+            return False
+        signature = self.hasher.signature(key)
+        if self.index.get(signature, 'sentence') is not None:
+            return True
+        self.index.put(signature, 'sentence', True)
+        return False
+
+
+def deduplicate(texts: List[str], threshold: float = None) -> List[Tuple[str, int]]:
+    """Each text reduced to the sentences not already seen in it or in an earlier
+    text, with the number of sentences removed"""
+    deduplicator = SentenceDeduplicator(threshold)
+    reduced = []
+    for text in texts:
+        kept = []
+        removed = 0
+        for sentence in Document(text).iter_sentences():
+            if deduplicator.is_duplicate(sentence):
+                removed += 1
+            else:
+                kept.append(sentence)
+        reduced.append((' '.join(kept), removed))
+    return reduced
+
+
+def _summarize(service, text: str, max_length: int, min_length: int, priority: str,
+               tier: Optional[str], preset: Optional[str]) -> Tuple[str, bool]:
+    """Summary of text and whether the model was called"""
+    if len(text.split()) <= MIN_SUMMARY_WORDS:
+        return text, False
+    # The router picks the tier, queues model calls shortest-predicted-first and learns from their latency
+    result = get_router().summarize(service, Document(text), max_length=max_length, min_length=min_length,
+                                    priority=priority, tier=tier, preset=preset)
+    return result['summary'], result['routing']['tier'] != LOCAL_TIERS['summarize']
+
+
+def _group(texts: List[str], budget: int) -> List[List[str]]:
+    """Consecutive texts packed into groups of at most budget words, at least two per group"""
+    groups = []
+    current, words = [], 0
+    for text in texts:
+        count = len(text.split())
+        if len(current) >= 2 and words + count > budget:
+            groups.append(current)
+            current, words = [], 0
+        current.append(text)
+        words += count
+    if current:
+        if len(current) == 1 and groups:
+            groups[-1].extend(current)
+        else:
+            groups.append(current)
+    return groups
+
+
+def summarize_documents(service, documents: List[Tuple[str, str]], max_length: int = 150,
+                        min_length: int = 30, priority: str = INTERACTIVE, tier: Optional[str] = None,
+                        preset: Optional[str] = None) -> Dict[str, Any]:
+    """One summary for a set of related documents.
+
+    Sentences repeated across documents (exactly or nearly) are removed
+    before any model call, so the work grows with the unique content rather
+    than the raw input. Each document is then summarized in parallel (map),
+    and the document summaries are merged hierarchically: grouped into
+    chunks of at most CHUNK_WORDS words, summarized again, until one summary
+    remains (reduce). Every summary goes through the router, with the
+    request's tier (if pinned) and decoding preset.
+    """
+    start_time = time.time()
+    # An unknown preset fails here, before any work is done
+    preset = get_preset(preset).name
+    texts = [text for _, text in documents]
+    reduced = deduplicate(texts)
+
+    word_counts = [Document(text).word_count for text in texts]
+    unique_word_counts = [len(text.split()) for text, _ in reduced]
+
+    # Map: documents with unique content are summarized side by side
+    mapped = {}
+    jobs = [(index, text) for index, (text, _) in enumerate(reduced) if text]
+    summarize = accounting.bind(_summarize)
+    futures = [(index, _executor.submit(summarize, service, text, max_length, min_length, priority,
+                                                tier, preset))
+               for index, text in jobs]
+    model_calls = 0
+    for index, future in futures:
+        mapped[index], called = future.result()
+        model_calls += called
+
+    # Reduce: merge the document summaries level by level
+    summaries = [mapped[index] for index in sorted(mapped)]
+    levels = 0
+    while len(summaries) > 1:
+        levels += 1
+        summaries = [text for text, _ in deduplicate(summaries) if text]
+        groups = _group(summaries, max(CHUNK_WORDS, 2 * max_length))
+        futures = [_executor.submit(summarize, service, ' '.join(group), max_length, min_length, priority,
+                                    tier, preset)
+                   for group in groups]
+        summaries = []
+        for future in futures:
+            summary, called = future.result()
+            summaries.append(summary)
+            model_calls += called
+    summary = summaries[0] if summaries else ''
+
+    results = []
+    for index, (doc_id, _) in enumerate(documents):
+        results.append({
+            'id': doc_id,
+            'word_count': word_counts[index],
+            'unique_word_count': unique_word_counts[index],
+            'duplicate_sentences': reduced[index][1],
+            'summary': mapped.get(index)
+        })
+
+    total_words = sum(word_counts)
+    summary_word_count = len(summary.split())
+    return {
+        'summary': summary,
+        'documents': results,
+        'processing_time': round(time.time() - start_time, 3),
+        'word_count_original': total_words,
+        'word_count_unique': sum(unique_word_counts),
+        'word_count_processed': summary_word_count,
+        'compression_ratio': round(summary_word_count / total_words, 2) if total_words else 0,
+        'duplicate_sentences': sum(removed for _, removed in reduced),
+        'model_calls': model_calls,
+        'merge_levels': levels
+    }
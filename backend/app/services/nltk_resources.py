@@ -0,0 +1,91 @@
+"""Offline NLTK resource bootstrap.
+
+NLTK data (punkt, vader_lexicon) is read from a local directory bundled with
+the service instead of being downloaded at startup. Populate it once at build
+time with:
+
+    python -m app.services.nltk_resources
+
+Downloads at runtime only happen when NLTK_ALLOW_DOWNLOAD=true.
+"""
+import os
+import threading
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+DEFAULT_DATA_DIR = os.path.join(BACKEND_DIR, 'nltk_data')
+
+RESOURCES = {
+    'punkt': 'tokenizers/punkt',
+    'vader_lexicon': 'sentiment/vader_lexicon.zip',
+}
+
+_lock = threading.Lock()
+_ready = False
+_vader = None
+
+
+def data_dir() -> str:
+    return os.getenv('NLTK_DATA_DIR', DEFAULT_DATA_DIR)
+
+
+def ensure_nltk_data():
+    """Point NLTK at the bundled data directory; download only if explicitly allowed"""
+    global _ready
+    if _ready:
+        return
+    with _lock:
+        if _ready:
+            return
+        import nltk
+
+        local_dir = data_dir()
+        if local_dir not in nltk.data.path:
+            nltk.data.path.insert(0, local_dir)
+
+        allow_download = os.getenv('NLTK_ALLOW_DOWNLOAD', 'false').lower() == 'true'
+        for name, path in RESOURCES.items():
+            try:
+                nltk.data.find(path)
+            except LookupError:
+                if allow_download:
+                    print(f"📥 Downloading NLTK {name} to {local_dir}...")
+                    nltk.download(name, download_dir=local_dir, quiet=True)
+                else:
+                    print(f"⚠️ NLTK resource '{name}' not found in {local_dir}; "
+                          f"run 'python -m app.services.nltk_resources' to bundle it")
+        _ready = True
+
+
+def sent_tokenize(text: str):
+    """nltk.sent_tokenize using the bundled punkt data"""
+    ensure_nltk_data()
+    import nltk
+    return nltk.sent_tokenize(text)
+
+
+def vader():
+    """Shared VADER analyzer; the lexicon is parsed once per process"""
+    global _vader
+    if _vader is None:
+        ensure_nltk_data()
+        from nltk.sentiment import SentimentIntensityAnalyzer
+        _vader = SentimentIntensityAnalyzer()
+    return _vader
+
+
+def download_all(target_dir: str = None):
+    """Download every resource the service needs into target_dir"""
+    import nltk
+
+    target_dir = target_dir or data_dir()
+    os.makedirs(target_dir, exist_ok=True)
+    for name in RESOURCES:
+        print(f"📥 Downloading NLTK {name} to {target_dir}...")
+        if not nltk.download(name, download_dir=target_dir, quiet=True):
+            raise SystemExit(f"❌ Failed to download NLTK resource '{name}'")
+    print("✅ NLTK data bundled")
+
+
+if __name__ == '__main__':
+    import sys
+    download_all(sys.argv[1] if len(sys.argv) > 1 else None)
@@ -0,0 +1,118 @@
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List
+
+from app.models.document import Document
+from app.models.text_models import TextRequest, TextResponse
+from app.services import accounting
+from app.services.cost_model import TIERS
+from app.services.router import DEFAULT_TIER, get_router
+from app.services.scheduler import INTERACTIVE
+
+# Bounded pool shared by all /api/process requests; model calls release the GIL
+_executor = ThreadPoolExecutor(
+    max_workers=int(os.getenv('PROCESS_MAX_WORKERS', 3)),
+    thread_name_prefix='process-task'
+)
+
+
+def _pinned_tier(task: str, text_request: TextRequest):
+    """The requested tier if it names one of task's tiers (one tier field serves several tasks)"""
+    tier = text_request.tier
+    return tier if tier in TIERS[task] or tier == DEFAULT_TIER else None
+
+
+def _summarize(service, doc: Document, text_request: TextRequest, priority: str) -> Dict[str, Any]:
+    # The router takes a scheduler slot only if the tier it picks needs a model
+    result = get_router().summarize(service, doc, max_length=text_request.max_length,
+                                    min_length=text_request.min_length, priority=priority,
+                                    tier=_pinned_tier('summarize', text_request), preset=text_request.preset)
+    response = TextResponse(
+        success=True,
+        original_text=doc.raw,
+        processed_text=result['summary'],
+        processing_time=result['processing_time'],
+        word_count_original=result['original_word_count'],
+        word_count_processed=result['summary_word_count'],
+        compression_ratio=result['compression_ratio']
+    ).to_dict()
+    return {**response, 'routing': result['routing']}
+
+
+def _paraphrase(service, doc: Document, text_request: TextRequest, priority: str) -> Dict[str, Any]:
+    paging_error = text_request.paging_error()
+    if paging_error:
+        raise ValueError(paging_error)
+    result = get_router().paraphrase(service, doc, num_return_sequences=text_request.variations or 1,
+                                     seed=text_request.seed, page=text_request.page, priority=priority,
+                                     preset=text_request.preset)
+    response = TextResponse(
+        success=True,
+        original_text=doc.raw,
+        processed_text=result['paraphrase'],
+        processing_time=result['processing_time'],
+        word_count_original=result['original_word_count'],
+        word_count_processed=result['paraphrase_word_count'],
+        variations=result.get('variations', [])
+    ).to_dict()
+    return {**response, 'routing': result['routing']}
+
+
+def _analyze(service, doc: Document, text_request: TextRequest, priority: str) -> Dict[str, Any]:
+    analysis = get_router().analyze(service, doc, priority=priority, tier=_pinned_tier('analyze', text_request))
+    routing = analysis.pop('routing')
+    return {'success': True, 'analysis': analysis, 'routing': routing}
+
+
+TASKS: Dict[str, Callable[..., Dict[str, Any]]] = {
+    'summarize': _summarize,
+    'paraphrase': _paraphrase,
+    'analyze': _analyze,
+}
+
+
+def _timed(task: str, service, doc: Document, text_request: TextRequest, priority: str):
+    start_time = time.time()
+    try:
+        # Each task takes its own scheduler slot, so tasks of one request can run side by side
+        result = TASKS[task](service, doc, text_request, priority)
+    except Exception as e:
+        print(f"Error in {task} task: {e}")
+        result = {'success': False, 'error': f'{task} failed: {str(e)}'}
+    result.pop('original_text', None)
+    return result, time.time() - start_time
+
+
+def run_tasks(service, doc: Document, tasks: List[str], text_request: TextRequest,
+              priority: str = INTERACTIVE) -> Dict[str, Any]:
+    """Run several tasks on one parsed Document.
+
+    Preprocessing (normalization, sentence spans, word counts) is done once up
+    front; the model calls then run concurrently on the shared executor, so
+    the total latency is close to that of the slowest task.
+    """
+    start_time = time.time()
+
+    # Parse once before fanning out so the tasks never race to do it
+    doc.sentence_word_counts
+
+    futures = {task: _executor.submit(accounting.bind(_timed), task, service, doc, text_request, priority)
+               for task in tasks}
+
+    results = {}
+    timings = {}
+    for task, future in futures.items():
+        results[task], timings[task] = future.result()
+    processing_time = time.time() - start_time
+
+    return {
+        'success': all(result.get('success') for result in results.values()),
+        'tasks': tasks,
+        'results': results,
+        'timings': {task: round(seconds, 3) for task, seconds in timings.items()},
+        'processing_time': round(processing_time, 3),
+        'sequential_time': round(sum(timings.values()), 3),
+        'word_count_original': doc.word_count,
+        'text_length': len(doc.raw)
+    }
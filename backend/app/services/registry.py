@@ -0,0 +1,48 @@
+import importlib
+import os
+import threading
+
+# TEXT_SERVICE_BACKEND -> module providing a TextService class
+BACKENDS = {
+    'full': 'app.services.text_service',
+    'lite': 'app.services.text_service_lite',
+    'mock': 'app.services.text_service_mock',
+    'sim': 'app.services.text_service_sim',
+    'remote': 'app.services.remote_service',
+}
+
+_lock = threading.Lock()
+_text_service = None
+
+
+def backend_name() -> str:
+    return os.getenv('TEXT_SERVICE_BACKEND', 'mock').lower()
+
+
+def get_text_service():
+    """Shared TextService for this process, created on first request.
+
+    The backend module is imported here rather than at app import time so
+    process start never pays for it.
+    """
+    global _text_service
+    if _text_service is None:
+        with _lock:
+            if _text_service is None:
+                name = backend_name()
+                if name not in BACKENDS:
+                    raise ValueError(f"Unknown TEXT_SERVICE_BACKEND '{name}'; "
+                                     f"expected one of {', '.join(BACKENDS)}")
+                module = importlib.import_module(BACKENDS[name])
+                service = module.TextService()
+                
+                from app.services.similarity_cache import CachedTextService, similarity_cache_enabled
+                if similarity_cache_enabled():
+                    service = CachedTextService(service)
+                _text_service = service
+    return _text_service
+
+
+def peek_text_service():
+    """The TextService if one has been created, without creating it"""
+    return _text_service
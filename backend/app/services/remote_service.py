@@ -0,0 +1,181 @@
+import itertools
+import json
+import os
+import threading
+import time
+from multiprocessing import AuthenticationError
+from multiprocessing.connection import Client
+from typing import Any, Dict, List, Optional, Union
+
+from app.models.document import Document
+from app.services import accounting
+from app.services.inference_worker import PROTOCOL_VERSION, authkey
+
+# Seconds a worker that failed to answer is skipped before being retried
+RETRY_AFTER_SECONDS = 5.0
+
+
+def configured_workers() -> List[str]:
+    """Worker addresses from INFERENCE_WORKERS ('host:port,...') or a JSON list in
+    INFERENCE_WORKERS_FILE, so the same config can span several nodes"""
+    path = os.getenv('INFERENCE_WORKERS_FILE')
+    if path:
+        with open(path) as f:
+            return [str(address) for address in json.load(f)]
+    return [address.strip() for address in os.getenv('INFERENCE_WORKERS', '').split(',') if address.strip()]
+
+
+class WorkerUnavailable(Exception):
+    pass
+
+
+class WorkerAuthenticationError(Exception):
+    """A worker and this process don't share the same INFERENCE_AUTHKEY"""
+
+
+class _Worker:
+    def __init__(self, address: str, key: bytes):
+        host, port = address.rsplit(':', 1)
+        self.address = address
+        self.key = key
+        self.endpoint = (host, int(port))
+        self.outstanding = 0
+        self.served = 0
+        self.failures = 0
+        self.down_until = 0.0
+        self._idle = []
+        self._lock = threading.Lock()
+
+    @property
+    def available(self) -> bool:
+        return time.time() >= self.down_until
+
+    def call(self, message: Dict[str, Any]) -> Dict[str, Any]:
+        """Send one request over a pooled connection and wait for the reply"""
+        with self._lock:
+            conn = self._idle.pop() if self._idle else None
+            self.outstanding += 1
+        try:
+            if conn is None:
+                conn = Client(self.endpoint, authkey=self.key)
+            conn.send(message)
+            reply = conn.recv()
+        except AuthenticationError as e:
+            # A configuration error, not a failure another worker would fix
+            raise WorkerAuthenticationError(f'Inference worker {self.address} rejected the connection ({e}); '
+                                            f'check that INFERENCE_AUTHKEY matches on both sides')
+        except (OSError, EOFError) as e:
+            if conn is not None:
+                conn.close()
+            with self._lock:
+                self.failures += 1
+                self.down_until = time.time() + RETRY_AFTER_SECONDS
+            raise WorkerUnavailable(f'{self.address}: {e}')
+        finally:
+            with self._lock:
+                self.outstanding -= 1
+
+        with self._lock:
+            self._idle.append(conn)
+            self.served += 1
+        return reply
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            'address': self.address,
+            'available': self.available,
+            'outstanding': self.outstanding,
+            'served': self.served,
+            'failures': self.failures
+        }
+
+
+class WorkerPool:
+    """Routes calls to the inference worker with the fewest outstanding requests"""
+
+    def __init__(self, addresses: List[str]):
+        if not addresses:
+            raise ValueError('No inference workers configured; set INFERENCE_WORKERS=host:port,...')
+        key = authkey()
+        self.workers = [_Worker(address, key) for address in addresses]
+        self._ids = itertools.count(1)
+        self._turn = itertools.count()
+        self._lock = threading.Lock()
+
+    def call(self, method: str, *args, **kwargs) -> Any:
+        message = {
+            'version': PROTOCOL_VERSION,
+            'id': next(self._ids),
+            'method': method,
+            'args': args,
+            'kwargs': kwargs,
+            'tenant': accounting.tenant()
+        }
+        tried = set()
+        while len(tried) < len(self.workers):
+            worker = self._pick(tried)
+            tried.add(worker.address)
+            try:
+                reply = worker.call(message)
+            except WorkerUnavailable as e:
+                print(f"⚠️ Inference worker unavailable, retrying elsewhere: {e}")
+                continue
+            accounting.merge(reply.get('usage', {}))
+            if not reply.get('ok'):
+                raise Exception(reply.get('error', 'Inference worker error'))
+            return reply['result']
+        raise Exception('No inference worker available')
+
+    def status(self) -> List[Dict[str, Any]]:
+        return [worker.status() for worker in self.workers]
+
+    def _pick(self, tried) -> _Worker:
+        with self._lock:
+            candidates = [w for w in self.workers if w.address not in tried]
+            # Prefer healthy workers, but try a down one rather than fail outright
+            healthy = [w for w in candidates if w.available] or candidates
+            # Rotate the starting point so ties are spread round-robin
+            offset = next(self._turn) % len(healthy)
+            healthy = healthy[offset:] + healthy[:offset]
+            return min(healthy, key=lambda w: w.outstanding)
+
+
+class TextService:
+    """TextService interface backed by a pool of inference worker processes.
+
+    The API process holds no models; it forwards each call (with the already
+    parsed Document) to a worker from INFERENCE_WORKERS.
+    """
+
+    def __init__(self, addresses: List[str] = None):
+        self.worker_pool = WorkerPool(addresses or configured_workers())
+        print(f"🔧 Using {len(self.worker_pool.workers)} remote inference worker(s)")
+
+    def summarize(self, text: Union[str, Document], max_length: int = 150, min_length: int = 30,
+                  preset: Optional[str] = None) -> Dict[str, Any]:
+        return self.worker_pool.call('summarize', text, max_length=max_length, min_length=min_length,
+                                     preset=preset)
+
+    def paraphrase(self, text: Union[str, Document], num_return_sequences: int = 1,
+                   seed: Optional[int] = None, page: int = 0, preset: Optional[str] = None) -> Dict[str, Any]:
+        return self.worker_pool.call('paraphrase', text, num_return_sequences=num_return_sequences,
+                                     seed=seed, page=page, preset=preset)
+
+    def analyze(self, text: Union[str, Document]) -> Dict[str, Any]:
+        return self.worker_pool.call('analyze', text)
+
+    def worker_status(self) -> List[Dict[str, Any]]:
+        """Pool view plus each reachable worker's own status"""
+        result = []
+        for worker in self.worker_pool.workers:
+            entry = worker.status()
+            if worker.available:
+                try:
+                    reply = worker.call({'version': PROTOCOL_VERSION, 'id': 0, 'method': 'status'})
+                    entry['worker'] = reply.get('result')
+                except WorkerUnavailable:
+                    entry['available'] = False
+                except WorkerAuthenticationError as e:
+                    entry['error'] = str(e)
+            result.append(entry)
+        return result
@@ -0,0 +1,306 @@
+import datetime
+import json
+import os
+import threading
+import time
+from collections import Counter, deque
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from app.models.document import Document
+from app.models.text_models import TextAnalysis
+from app.services.analysis_pool import get_analysis_pool
+from app.services.chunker import CHUNK_WORDS
+from app.services.cost_model import TIERS, CostModel, get_cost_model
+from app.services.decoding import get_preset
+from app.services.scheduler import BULK, INTERACTIVE, get_scheduler
+
+# Tiers the router runs itself, without a model or a scheduler slot
+LOCAL_TIERS = {'summarize': 'extractive', 'analyze': 'vader'}
+# Tier name used for backends that don't declare their model tiers
+DEFAULT_TIER = 'default'
+# Word count above which backends summarize chunk by chunk, unless they say otherwise
+LONG_TEXT_WORDS = 1000
+
+
+class RoutingError(ValueError):
+    """A pinned tier the task or backend doesn't offer"""
+
+
+class Decision:
+    __slots__ = ('task', 'tier', 'reason', 'words', 'chunks', 'variations', 'preset', 'cost_factor', 'decided_at',
+                 'predicted_seconds', 'predicted_wait_seconds', 'actual_seconds', 'wait_seconds', 'escalated_from')
+
+    def __init__(self, task: str, tier: str, reason: str, words: int, chunks: int,
+                 predicted_seconds: float, predicted_wait_seconds: float = 0.0, variations: int = 1,
+                 preset: Optional[str] = None, cost_factor: float = 1.0):
+        self.task = task
+        self.tier = tier
+        self.reason = reason
+        self.words = words
+        self.chunks = chunks
+        self.variations = variations
+        self.preset = preset
+        self.cost_factor = cost_factor
+        self.decided_at = time.time()
+        self.predicted_seconds = predicted_seconds
+        self.predicted_wait_seconds = predicted_wait_seconds
+        self.actual_seconds = 0.0
+        self.wait_seconds = 0.0
+        self.escalated_from = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        result = {
+            'task': self.task,
+            'tier': self.tier,
+            'reason': self.reason,
+            'words': self.words,
+            'chunks': self.chunks,
+            'predicted_seconds': round(self.predicted_seconds, 3),
+            'predicted_wait_seconds': round(self.predicted_wait_seconds, 3),
+            'estimated_completion': datetime.datetime.fromtimestamp(
+                self.estimated_completion, datetime.timezone.utc).isoformat(timespec='seconds'),
+            'actual_seconds': round(self.actual_seconds, 3),
+            'wait_seconds': round(self.wait_seconds, 3)
+        }
+        if self.variations > 1:
+            result['variations'] = self.variations
+        if self.preset:
+            result['preset'] = self.preset
+        if self.escalated_from:
+            result['escalated_from'] = self.escalated_from
+        return result
+
+    @property
+    def estimated_completion(self) -> float:
+        """Predicted finish time (epoch seconds) when the decision was made"""
+        return self.decided_at + self.predicted_wait_seconds + self.predicted_seconds
+
+
+def curve_tier(task: str, tier: str) -> str:
+    """Tier whose cost curve applies; an undeclared backend model counts as the most capable tier"""
+    return TIERS[task][-1] if tier == DEFAULT_TIER else tier
+
+
+def model_tiers(service, task: str) -> Tuple[str, ...]:
+    """Model tiers the backend serves for task, cheapest first"""
+    declared = getattr(service, 'model_tiers', None)
+    if declared is None:
+        return (DEFAULT_TIER,) if task in TIERS else ()
+    return tuple(declared.get(task, ()))
+
+
+class ModelRouter:
+    """Picks the model tier for each summarize and analyze request.
+
+    Summaries of inputs up to extractive_words are the leading sentences
+    (no model); inputs up to small_words go to the small model and longer
+    ones to the large, chunked model. Sentiment uses VADER when the lexicon
+    is confident (|compound| >= vader_confidence) and the model otherwise;
+    an escalated analysis keeps the VADER statistics and takes only the
+    model's sentiment, which backends report on VADER's [-1, 1] scale.
+    When requests are queued for the model and the predicted wait plus the
+    chosen tier's predicted time would exceed the priority class's latency
+    budget, the next cheaper tier is used instead. Clients can pin a tier. Each decision is logged with its
+    predicted and actual latency, and the actual latency trains the cost
+    model. Predictions for model tiers are scaled by the request's decoding
+    preset.
+    """
+
+    def __init__(self, cost_model: Optional[CostModel] = None):
+        self.cost_model = cost_model or get_cost_model()
+        self.extractive_words = int(os.getenv('ROUTER_EXTRACTIVE_WORDS', 60))
+        self.small_words = int(os.getenv('ROUTER_SMALL_WORDS', 400))
+        self.vader_confidence = float(os.getenv('ROUTER_VADER_CONFIDENCE', 0.5))
+        self.budgets = {
+            INTERACTIVE: float(os.getenv('ROUTER_LATENCY_BUDGET_SECONDS', 15)),
+            # 0 = no budget: bulk work waits for the model it would get anyway
+            BULK: float(os.getenv('ROUTER_BULK_LATENCY_BUDGET_SECONDS', 0)),
+        }
+        self.log_path = os.getenv('ROUTER_LOG')
+        self.verbose = os.getenv('ROUTER_VERBOSE', 'false').lower() == 'true'
+        self._lock = threading.Lock()
+        self._counts = Counter()
+        self._recent = deque(maxlen=200)
+
+    def tiers(self, service, task: str) -> List[str]:
+        """Tiers available for task with this backend, cheapest first"""
+        available = list(model_tiers(service, task))
+        local = LOCAL_TIERS.get(task)
+        if local and local not in available:
+            available.insert(0, local)
+        return available
+
+    def summarize(self, service, doc: Document, max_length: int = 150, min_length: int = 30,
+                  priority: str = INTERACTIVE, tier: Optional[str] = None,
+                  preset: Optional[str] = None) -> Dict[str, Any]:
+        """Summary from the routed tier, with the decision under 'routing'"""
+        # Backends summarize texts over long_text_words chunk by chunk
+        long_text = doc.word_count > getattr(service, 'long_text_words', LONG_TEXT_WORDS)
+        chunks = len(doc.chunk_spans(getattr(service, 'chunk_words', CHUNK_WORDS))) if long_text else 1
+        preset = get_preset(preset).name
+        decision = self._decide(service, 'summarize', doc.word_count, chunks, priority, tier, preset=preset)
+
+        if decision.tier == 'extractive':
+            result = self._run(decision, priority,
+                               lambda: get_analysis_pool().run('extractive_summary', doc, max_length=max_length),
+                               model=False)
+        else:
+            kwargs = self._tier_kwargs(service, 'summarize', decision.tier)
+            result = self._run(decision, priority,
+                               lambda: service.summarize(doc, max_length=max_length, min_length=min_length,
+                                                         preset=preset, **kwargs))
+        return {**result, 'routing': decision.to_dict()}
+
+    def analyze(self, service, doc: Document, priority: str = INTERACTIVE,
+                tier: Optional[str] = None) -> Dict[str, Any]:
+        """Analysis from the routed tier, with the decision under 'routing'"""
+        decision = self._decide(service, 'analyze', doc.raw_word_count, 1, priority, tier)
+
+        if decision.tier == 'vader':
+            analysis = self._run(decision, priority, lambda: self._vader_analysis(doc), model=False)
+            models = [t for t in self.tiers(service, 'analyze') if t != 'vader']
+            # Unpinned and not confident: escalate to the model
+            if (tier is None and models and decision.reason != 'queue depth'
+                    and abs(analysis['sentiment']['score']) < self.vader_confidence):
+                escalated = self._decision(service, 'analyze', models[-1], 'low lexicon confidence',
+                                           doc.raw_word_count, 1, priority)
+                escalated.escalated_from = 'vader'
+                decision = escalated
+                kwargs = self._tier_kwargs(service, 'analyze', decision.tier)
+                # The statistics stand; only the sentiment comes from the model
+                sentiment = self._run(decision, priority, lambda: self._model_sentiment(service, doc, kwargs))
+                analysis['sentiment'] = {'score': round(sentiment['score'], 3), 'label': sentiment['label']}
+        else:
+            kwargs = self._tier_kwargs(service, 'analyze', decision.tier)
+            analysis = self._run(decision, priority, lambda: service.analyze(doc, **kwargs))
+        return {**analysis, 'routing': decision.to_dict()}
+
+    def paraphrase(self, service, doc: Document, num_return_sequences: int = 1, seed: Optional[int] = None,
+                   page: int = 0, priority: str = INTERACTIVE, preset: Optional[str] = None) -> Dict[str, Any]:
+        """Paraphrases with the decision (one tier, but predicted and timed) under 'routing'"""
+        preset = get_preset(preset).name
+        decision = self._decide(service, 'paraphrase', doc.word_count, 1, priority, None, num_return_sequences,
+                                preset=preset)
+        result = self._run(decision, priority, lambda: service.paraphrase(
+            doc, num_return_sequences=num_return_sequences, seed=seed, page=page, preset=preset))
+        return {**result, 'routing': decision.to_dict()}
+
+    def status(self) -> Dict[str, Any]:
+        with self._lock:
+            recent = list(self._recent)
+        return {
+            'decisions': {key: count for key, count in sorted(self._counts.items())},
+            'recent': recent[-10:],
+            'cost_model': self.cost_model.status()
+        }
+
+    def _decide(self, service, task: str, words: int, chunks: int, priority: str,
+                pinned: Optional[str], variations: int = 1, preset: Optional[str] = None) -> Decision:
+        available = self.tiers(service, task)
+        if pinned:
+            if pinned not in available and DEFAULT_TIER in available and curve_tier(task, DEFAULT_TIER) == pinned:
+                pinned = DEFAULT_TIER
+            if pinned not in available:
+                raise RoutingError(f"Tier '{pinned}' is not available for {task}; "
+                                   f"expected one of {', '.join(available)}")
+            return self._decision(service, task, pinned, 'pinned', words, chunks, priority, variations, preset)
+
+        if len(available) == 1:
+            return self._decision(service, task, available[0], 'only tier', words, chunks, priority, variations,
+                                  preset)
+        if task == 'summarize':
+            wanted = 'extractive' if words <= self.extractive_words else 'small' if words <= self.small_words else 'large'
+        else:
+            wanted = 'vader'
+        # The closest tier this backend has, preferring the next more capable one
+        order = TIERS[task]
+        rank = order.index(wanted)
+        choice = next((t for t in available if order.index(curve_tier(task, t)) >= rank), available[-1])
+        decision = self._decision(service, task, choice, 'input length', words, chunks, priority, preset=preset)
+
+        # Only queueing triggers a downgrade; a slow tier on an idle server is still the right one
+        budget = self.budgets.get(priority, 0)
+        index = available.index(choice)
+        while (budget and index > 0 and decision.predicted_wait_seconds > 0
+               and decision.predicted_wait_seconds + decision.predicted_seconds > budget):
+            index -= 1
+            decision = self._decision(service, task, available[index], 'queue depth', words, chunks, priority,
+                                      preset=preset)
+        return decision
+
+    def _decision(self, service, task: str, tier: str, reason: str, words: int, chunks: int,
+                  priority: str, variations: int = 1, preset: Optional[str] = None) -> Decision:
+        local = tier == LOCAL_TIERS.get(task)
+        # Curves are for the default decoding settings; other presets scale them
+        preset = None if local else preset
+        cost_factor = get_preset(preset).cost_factor if preset else 1.0
+        predicted = self.cost_model.predict(task, curve_tier(task, tier), words, chunks, variations) * cost_factor
+        # Local tiers don't queue for a model slot
+        wait = 0.0 if local else get_scheduler().estimate_wait(priority, predicted)
+        return Decision(task, tier, reason, words, chunks, predicted, wait, variations, preset, cost_factor)
+
+    def _run(self, decision: Decision, priority: str, call: Callable[[], Dict[str, Any]],
+             model: bool = True) -> Dict[str, Any]:
+        start = time.perf_counter()
+        if model:
+            # The prediction is the call's rank under shortest-job-first scheduling
+            with get_scheduler().slot(priority, cost=decision.predicted_seconds):
+                began = time.perf_counter()
+                result = call()
+        else:
+            began = start
+            result = call()
+        decision.actual_seconds = time.perf_counter() - began
+        decision.wait_seconds = began - start
+        self._record(decision)
+        return result
+
+    def _record(self, decision: Decision):
+        self.cost_model.observe(decision.task, curve_tier(decision.task, decision.tier), decision.words,
+                                decision.actual_seconds / decision.cost_factor, decision.chunks, decision.variations)
+        entry = decision.to_dict()
+        with self._lock:
+            self._counts[f'{decision.task}:{decision.tier}'] += 1
+            self._recent.append(entry)
+            if self.log_path:
+                with open(self.log_path, 'a') as f:
+                    f.write(json.dumps({'time': time.time(), **entry}) + '\n')
+        if self.verbose:
+            print(f"🧭 {decision.task} {decision.words} words -> {decision.tier} ({decision.reason}): "
+                  f"predicted {decision.predicted_seconds:.2f}s +{decision.predicted_wait_seconds:.2f}s wait, "
+                  f"actual {decision.actual_seconds:.2f}s +{decision.wait_seconds:.2f}s wait")
+
+    @staticmethod
+    def _tier_kwargs(service, task: str, tier: str) -> Dict[str, Any]:
+        # Backends with a single model tier take no tier argument
+        return {'tier': tier} if len(model_tiers(service, task)) > 1 else {}
+
+    @staticmethod
+    def _model_sentiment(service, doc: Document, kwargs: Dict[str, Any]) -> Dict[str, Any]:
+        """Sentiment alone from backends that offer it, else from a full analysis"""
+        sentiment = getattr(service, 'sentiment', None)
+        if sentiment is None:
+            return service.analyze(doc, **kwargs)['sentiment']
+        return sentiment(doc, **kwargs)
+
+    @staticmethod
+    def _vader_analysis(doc: Document) -> Dict[str, Any]:
+        statistics = get_analysis_pool().run('text_statistics', doc, sentiment=True, readability_fallback=50.0)
+        return TextAnalysis(**statistics).to_dict()
+
+
+_router = None
+_router_lock = threading.Lock()
+
+
+def get_router() -> ModelRouter:
+    global _router
+    if _router is None:
+        with _router_lock:
+            if _router is None:
+                _router = ModelRouter()
+    return _router
+
+
+def peek_router() -> Optional[ModelRouter]:
+    return _router
@@ -0,0 +1,258 @@
+import itertools
+import math
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Any, Dict, Mapping, Optional
+
+from app.services import accounting
+
+INTERACTIVE = 'interactive'
+BULK = 'bulk'
+PRIORITY_CLASSES = (INTERACTIVE, BULK)
+
+SJF = 'sjf'
+FIFO = 'fifo'
+POLICIES = (SJF, FIFO)
+
+# Predicted service time ranges that queue waits are reported for
+COST_BUCKETS = ('under_1s', '1s_to_10s', 'over_10s')
+
+
+def _cost_bucket(cost: float) -> str:
+    return COST_BUCKETS[0] if cost < 1 else COST_BUCKETS[1] if cost < 10 else COST_BUCKETS[2]
+
+
+def api_key(headers: Mapping[str, str]) -> Optional[str]:
+    """Client API key from X-API-Key or an 'Authorization: Bearer' header"""
+    key = headers.get('X-API-Key')
+    if not key:
+        authorization = headers.get('Authorization', '')
+        if authorization.lower().startswith('bearer '):
+            key = authorization[7:].strip()
+    return key or None
+
+
+def request_priority(headers: Mapping[str, str]) -> str:
+    """Priority class from the X-Priority header, else from the API key
+    (keys listed in BULK_API_KEYS are bulk), else interactive"""
+    priority = headers.get('X-Priority', '').strip().lower()
+    if priority in PRIORITY_CLASSES:
+        return priority
+    bulk_keys = {k.strip() for k in os.getenv('BULK_API_KEYS', '').split(',') if k.strip()}
+    if api_key(headers) in bulk_keys:
+        return BULK
+    return INTERACTIVE
+
+
+def is_admin(headers: Mapping[str, str]) -> bool:
+    """Whether the API key is listed in ADMIN_API_KEYS (may profile requests and read /usage)"""
+    admin_keys = {k.strip() for k in os.getenv('ADMIN_API_KEYS', '').split(',') if k.strip()}
+    return api_key(headers) in admin_keys
+
+
+class _Waiter:
+    __slots__ = ('priority', 'enqueued_at', 'sequence', 'cost', 'started_at')
+
+    def __init__(self, priority: str, sequence: int, cost: float):
+        self.priority = priority
+        self.enqueued_at = time.time()
+        self.sequence = sequence
+        self.cost = cost
+        self.started_at = None
+
+
+def _wait_summary(waits) -> Dict[str, float]:
+    waits = sorted(waits)
+    def percentile(p):
+        return round(waits[min(len(waits) - 1, int(len(waits) * p))], 3) if waits else 0.0
+    return {
+        'mean': round(sum(waits) / len(waits), 3) if waits else 0.0,
+        'p50': percentile(0.5),
+        'p95': percentile(0.95),
+        'max': round(waits[-1], 3) if waits else 0.0
+    }
+
+
+class _ClassStats:
+    def __init__(self):
+        self.admitted = 0
+        self.running = 0
+        self.queued = 0
+        self.aged = 0
+        self.waits = deque(maxlen=1000)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'admitted': self.admitted,
+            'running': self.running,
+            'queued': self.queued,
+            'aged_admissions': self.aged,
+            'wait_seconds': _wait_summary(self.waits)
+        }
+
+
+class RequestScheduler:
+    """Admission control in front of the model calls.
+
+    At most `capacity` model calls run at once. Interactive work is admitted
+    first; bulk work may only occupy `bulk_share` of the capacity (at least
+    one slot). A bulk call that has waited longer than `aging_seconds`
+    competes with interactive work, so it cannot starve.
+
+    Within a tier, the `sjf` policy admits the call with the shortest
+    predicted service time first. Each second spent waiting counts as
+    `sjf_aging_rate` seconds less work, so long calls are not postponed
+    forever. The `fifo` policy admits by arrival.
+    """
+
+    def __init__(self, capacity: Optional[int] = None, bulk_share: Optional[float] = None,
+                 aging_seconds: Optional[float] = None, policy: Optional[str] = None,
+                 sjf_aging_rate: Optional[float] = None):
+        self.capacity = capacity or int(os.getenv('MODEL_CONCURRENCY', 2))
+        share = bulk_share if bulk_share is not None else float(os.getenv('BULK_SHARE', 0.25))
+        self.bulk_slots = max(1, math.floor(self.capacity * share))
+        self.aging_seconds = aging_seconds if aging_seconds is not None else float(os.getenv('BULK_AGING_SECONDS', 30))
+        self.policy = (policy or os.getenv('SCHEDULER_POLICY', SJF)).lower()
+        if self.policy not in POLICIES:
+            raise ValueError(f"SCHEDULER_POLICY must be one of {', '.join(POLICIES)}")
+        self.sjf_aging_rate = sjf_aging_rate if sjf_aging_rate is not None else float(os.getenv('SJF_AGING_RATE', 0.5))
+
+        self._cond = threading.Condition()
+        self._waiting = []
+        self._running_calls = set()
+        self._sequence = itertools.count()
+        self._stats = {priority: _ClassStats() for priority in PRIORITY_CLASSES}
+        self._recent_costs = deque(maxlen=200)
+        self._reordered = 0
+        self._cost_waits = {bucket: deque(maxlen=1000) for bucket in COST_BUCKETS}
+
+    @contextmanager
+    def slot(self, priority: str = INTERACTIVE, cost: Optional[float] = None):
+        """Hold one unit of model capacity for the duration of the block;
+        cost is the call's predicted service time in seconds, if known"""
+        waiter = self.acquire(priority, cost)
+        accounting.record(queue_wait_seconds=waiter.started_at - waiter.enqueued_at)
+        try:
+            yield
+        finally:
+            self.release(waiter)
+
+    def acquire(self, priority: str = INTERACTIVE, cost: Optional[float] = None) -> _Waiter:
+        """Block until admitted; returns the admission to pass to release()"""
+        if priority not in PRIORITY_CLASSES:
+            priority = INTERACTIVE
+        stats = self._stats[priority]
+        with self._cond:
+            if cost is None:
+                # Unknown calls are ranked as a typical one
+                cost = sum(self._recent_costs) / len(self._recent_costs) if self._recent_costs else 0.0
+            else:
+                self._recent_costs.append(cost)
+            waiter = _Waiter(priority, next(self._sequence), cost)
+            self._waiting.append(waiter)
+            stats.queued += 1
+            while self._next_waiter() is not waiter:
+                # Wake up periodically so aged work is re-ranked
+                self._cond.wait(timeout=min(1.0, self.aging_seconds or 1.0))
+            self._waiting.remove(waiter)
+            waiter.started_at = time.time()
+            self._running_calls.add(waiter)
+            stats.queued -= 1
+            stats.running += 1
+            stats.admitted += 1
+            wait = waiter.started_at - waiter.enqueued_at
+            stats.waits.append(wait)
+            self._cost_waits[_cost_bucket(cost)].append(wait)
+            if any(other.sequence < waiter.sequence for other in self._waiting):
+                self._reordered += 1
+            if priority == BULK and self._is_aged(waiter):
+                stats.aged += 1
+            # Another waiter may be admissible too (e.g. interactive behind a capped bulk)
+            self._cond.notify_all()
+        return waiter
+
+    def release(self, waiter: _Waiter):
+        with self._cond:
+            self._running_calls.discard(waiter)
+            self._stats[waiter.priority].running -= 1
+            self._cond.notify_all()
+
+    def estimate_wait(self, priority: str = INTERACTIVE, cost: float = 0.0) -> float:
+        """Predicted queueing time of a call arriving now: the predicted work
+        ranked ahead of it plus what is left of the running calls, spread over
+        the capacity"""
+        if priority not in PRIORITY_CLASSES:
+            priority = INTERACTIVE
+        with self._cond:
+            probe = _Waiter(priority, math.inf, cost)
+            ahead = [w for w in self._waiting if self._rank(w) < self._rank(probe)]
+            if not ahead and self.running < self.capacity:
+                return 0.0
+            now = time.time()
+            remaining = sum(max(0.0, w.cost - (now - w.started_at)) for w in self._running_calls)
+            return (remaining + sum(w.cost for w in ahead)) / self.capacity
+
+    @property
+    def running(self) -> int:
+        return sum(stats.running for stats in self._stats.values())
+
+    @property
+    def queued(self) -> int:
+        return len(self._waiting)
+
+    def status(self) -> Dict[str, Any]:
+        with self._cond:
+            return {
+                'capacity': self.capacity,
+                'policy': self.policy,
+                'sjf_aging_rate': self.sjf_aging_rate,
+                'bulk_slots': self.bulk_slots,
+                'bulk_aging_seconds': self.aging_seconds,
+                'running': self.running,
+                'queued': self.queued,
+                # Admissions that overtook an earlier arrival
+                'reordered_admissions': self._reordered,
+                'wait_seconds_by_predicted_cost': {
+                    bucket: {'admitted': len(waits), **_wait_summary(waits)}
+                    for bucket, waits in self._cost_waits.items()
+                },
+                'classes': {priority: stats.to_dict() for priority, stats in self._stats.items()}
+            }
+
+    def _is_aged(self, waiter: _Waiter) -> bool:
+        return self.aging_seconds > 0 and time.time() - waiter.enqueued_at >= self.aging_seconds
+
+    def _rank(self, waiter: _Waiter):
+        # Interactive and aged bulk share the top tier; other bulk follows
+        urgent = waiter.priority == INTERACTIVE or self._is_aged(waiter)
+        if self.policy == FIFO:
+            return (0 if urgent else 1, waiter.sequence)
+        waited = time.time() - waiter.enqueued_at
+        return (0 if urgent else 1, waiter.cost - self.sjf_aging_rate * waited, waiter.sequence)
+
+    def _next_waiter(self) -> Optional[_Waiter]:
+        """The waiter to admit now, or None if nothing may start"""
+        if self.running >= self.capacity:
+            return None
+        bulk_full = self._stats[BULK].running >= self.bulk_slots
+        for waiter in sorted(self._waiting, key=self._rank):
+            if waiter.priority == BULK and bulk_full:
+                continue
+            return waiter
+        return None
+
+
+_scheduler = None
+_scheduler_lock = threading.Lock()
+
+
+def get_scheduler() -> RequestScheduler:
+    global _scheduler
+    if _scheduler is None:
+        with _scheduler_lock:
+            if _scheduler is None:
+                _scheduler = RequestScheduler()
+    return _scheduler
@@ -0,0 +1,302 @@
+import itertools
+import os
+import random
+import re
+import threading
+import time
+import zlib
+from array import array
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+from app.models.document import Document, as_document
+from app.services import accounting
+from app.services.decoding import get_preset
+
+SHINGLE_WORDS = 4
+NUM_PERMUTATIONS = 64
+# 8 bands of 8 rows: texts with Jaccard similarity >= 0.85 become candidates with
+# probability > 0.9, unrelated texts practically never
+LSH_BANDS = 8
+
+_MERSENNE_PRIME = (1 << 61) - 1
+# Tracking parameters and fragments are dropped from URLs before hashing
+_URL_NOISE = re.compile(r'(https?://[^\s?#]+)[?#]\S*')
+_WORD = re.compile(r'\w+')
+
+
+def similarity_cache_enabled() -> bool:
+    return os.getenv('SIMILARITY_CACHE', 'false').lower() == 'true'
+
+
+def shingles(text: str, size: int = SHINGLE_WORDS) -> set:
+    """Distinct word n-grams of the text, ignoring case, punctuation, whitespace and URL query strings"""
+    words = _WORD.findall(_URL_NOISE.sub(r'\1', text).lower())
+    if len(words) <= size:
+        return {' '.join(words)} if words else set()
+    return {' '.join(words[i:i + size]) for i in range(len(words) - size + 1)}
+
+
+class MinHasher:
+    """MinHash signatures over word shingles; the share of equal positions in two
+    signatures estimates the Jaccard similarity of the shingle sets"""
+
+    def __init__(self, num_permutations: int = NUM_PERMUTATIONS, seed: int = 1,
+                 shingle_words: int = SHINGLE_WORDS):
+        self.shingle_words = shingle_words
+        rng = random.Random(seed)
+        self._permutations = [
+            (rng.randrange(1, _MERSENNE_PRIME), rng.randrange(0, _MERSENNE_PRIME))
+            for _ in range(num_permutations)
+        ]
+
+    def signature(self, text: str) -> array:
+        """Minimum of each permutation, kept to its low 32 bits (ample for similarity estimates)"""
+        hashes = [zlib.crc32(feature.encode()) for feature in shingles(text, self.shingle_words)] or [0]
+        return array('I', [
+            min([(a * x + b) % _MERSENNE_PRIME for x in hashes]) & 0xFFFFFFFF for a, b in self._permutations
+        ])
+
+
+_default_hasher = None
+
+
+def text_signature(text: str) -> array:
+    """Signature from the default MinHasher; its permutations are seeded, so
+    every process (including analysis pool workers) computes the same one"""
+    global _default_hasher
+    if _default_hasher is None:
+        _default_hasher = MinHasher()
+    return _default_hasher.signature(text)
+
+
+def signature_similarity(first: array, second: array) -> float:
+    return sum(x == y for x, y in zip(first, second)) / len(first)
+
+
+class SimilarityIndex:
+    """Bounded LRU index of MinHash signatures with LSH banding.
+
+    Each signature is split into bands; entries sharing any whole band with
+    a query are candidates, and candidates are then compared on the full
+    signature. A lookup therefore costs a few dict lookups however many
+    entries are stored. Each entry holds values per namespace (e.g. task and
+    options). Buckets hold a bare entry id until they collide, to keep the
+    per-entry overhead low at millions of entries.
+    """
+
+    def __init__(self, max_entries: int, threshold: float, bands: int = LSH_BANDS):
+        self.max_entries = max_entries
+        self.threshold = threshold
+        self.bands = bands
+        self._buckets: Dict[int, Union[int, List[int]]] = {}
+        self._entries: 'OrderedDict[int, Tuple[array, Dict[str, Any]]]' = OrderedDict()
+        self._ids = itertools.count()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.near_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, signature: array, namespace: str) -> Optional[Tuple[Any, float]]:
+        """The stored value of the most similar entry above the threshold, and its similarity"""
+        with self._lock:
+            for similarity, entry_id in self._candidates(signature):
+                values = self._entries[entry_id][1]
+                if namespace in values:
+                    self._entries.move_to_end(entry_id)
+                    self.hits += 1
+                    if similarity < 1:
+                        self.near_hits += 1
+                    return values[namespace], similarity
+            self.misses += 1
+            return None
+
+    def put(self, signature: array, namespace: str, value: Any):
+        with self._lock:
+            candidates = self._candidates(signature)
+            if candidates and candidates[0][0] == 1:
+                entry_id = candidates[0][1]
+            else:
+                entry_id = next(self._ids)
+                self._entries[entry_id] = (signature, {})
+                for key in self._band_keys(signature):
+                    self._bucket_add(key, entry_id)
+                while len(self._entries) > self.max_entries:
+                    self._evict_oldest()
+            self._entries[entry_id][1][namespace] = value
+            self._entries.move_to_end(entry_id)
+
+    def status(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            'entries': len(self._entries),
+            'max_entries': self.max_entries,
+            'hits': self.hits,
+            'near_duplicate_hits': self.near_hits,
+            'misses': self.misses,
+            'hit_rate': round(self.hits / lookups, 3) if lookups else 0.0,
+            'evictions': self.evictions
+        }
+
+    def _band_keys(self, signature: array) -> List[int]:
+        rows = len(signature) // self.bands
+        return [hash((band, signature[band * rows:(band + 1) * rows].tobytes())) for band in range(self.bands)]
+
+    def _candidates(self, signature: array) -> List[Tuple[float, int]]:
+        """(similarity, entry id) of entries at or above the threshold, most similar first"""
+        seen = set()
+        found = []
+        for key in self._band_keys(signature):
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                continue
+            for entry_id in (bucket if isinstance(bucket, list) else (bucket,)):
+                if entry_id in seen:
+                    continue
+                seen.add(entry_id)
+                similarity = signature_similarity(signature, self._entries[entry_id][0])
+                if similarity >= self.threshold:
+                    found.append((similarity, entry_id))
+        found.sort(reverse=True)
+        return found
+
+    def _bucket_add(self, key: int, entry_id: int):
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            self._buckets[key] = entry_id
+        elif isinstance(bucket, list):
+            bucket.append(entry_id)
+        else:
+            self._buckets[key] = [bucket, entry_id]
+
+    def _evict_oldest(self):
+        entry_id, (signature, _) = self._entries.popitem(last=False)
+        for key in self._band_keys(signature):
+            bucket = self._buckets[key]
+            if isinstance(bucket, list):
+                bucket.remove(entry_id)
+                if len(bucket) == 1:
+                    self._buckets[key] = bucket[0]
+            else:
+                del self._buckets[key]
+        self.evictions += 1
+
+
+class SimilarityCache:
+    """Results of previously processed texts, found again for near-duplicate texts.
+
+    Texts are compared by the Jaccard similarity of their word shingles, so
+    differences in whitespace, punctuation, case or URL tracking parameters
+    don't matter and small edits still match. threshold is the minimum
+    (estimated) similarity for a stored result to be reused.
+    """
+
+    def __init__(self, max_entries: Optional[int] = None, threshold: Optional[float] = None):
+        if max_entries is None:
+            max_entries = int(os.getenv('SIMILARITY_CACHE_SIZE', 10000))
+        if threshold is None:
+            threshold = float(os.getenv('SIMILARITY_THRESHOLD', 0.85))
+        self.threshold = threshold
+        self.index = SimilarityIndex(max_entries, threshold)
+
+    def signature(self, text: str) -> array:
+        """Pure-Python hashing takes a sizeable fraction of a second for a long
+        text, so those are signed on the analysis pool rather than holding the
+        GIL on the request thread"""
+        from app.services.analysis_pool import get_analysis_pool
+        return get_analysis_pool().run('minhash_signature', text)
+
+    def lookup(self, signature: array, namespace: str) -> Optional[Tuple[Any, float]]:
+        """(stored value, similarity) for a near-duplicate, or None"""
+        return self.index.get(signature, namespace)
+
+    def store(self, signature: array, namespace: str, value: Any):
+        self.index.put(signature, namespace, value)
+
+    def status(self) -> Dict[str, Any]:
+        return {'threshold': self.threshold, **self.index.status()}
+
+
+def _refresh_analysis(analysis: Dict[str, Any], doc: Document) -> Dict[str, Any]:
+    """Stored analysis with the cheap counts recomputed for this exact text"""
+    text = doc.raw
+    word_count = doc.raw_word_count
+    return {
+        **analysis,
+        'word_count': word_count,
+        'sentence_count': doc.sentence_count,
+        'paragraph_count': len([p for p in text.split('\n\n') if p.strip()]),
+        'character_count': len(text),
+        'character_count_no_spaces': len(text.replace(' ', '')),
+        'reading_time_minutes': round(word_count / 200, 1)
+    }
+
+
+class CachedTextService:
+    """Wraps a TextService so summaries and analyses of near-duplicate texts are reused.
+
+    Hits are approximate: a reused result belongs to a text that is only
+    similar, so results are kept per API key and never served to another.
+    Paraphrasing samples new text on every call and is never cached. Every
+    other attribute is delegated to the wrapped service.
+    """
+
+    def __init__(self, service, cache: Optional[SimilarityCache] = None):
+        self.service = service
+        self.similarity_cache = cache or SimilarityCache()
+
+    def __getattr__(self, name: str):
+        return getattr(self.service, name)
+
+    def summarize(self, text: Union[str, Document], max_length: int = 150, min_length: int = 30,
+                  tier: Optional[str] = None, preset: Optional[str] = None) -> Dict[str, Any]:
+        start_time = time.time()
+        doc = as_document(text)
+        namespace = f'{accounting.tenant()}:summarize:{tier or "default"}:{get_preset(preset).name}:' \
+                    f'{max_length}:{min_length}'
+        signature = self.similarity_cache.signature(doc.normalized)
+        found = self.similarity_cache.lookup(signature, namespace)
+        if found is not None:
+            result, similarity = found
+            original_word_count = doc.word_count
+            return {
+                **result,
+                'processing_time': time.time() - start_time,
+                'original_word_count': original_word_count,
+                'compression_ratio': result['summary_word_count'] / original_word_count if original_word_count else 0,
+                'cache': {'similarity': round(similarity, 3)}
+            }
+        # Only backends with several summarization tiers take a tier
+        tier_kwargs = {'tier': tier} if tier else {}
+        result = self.service.summarize(doc, max_length=max_length, min_length=min_length, preset=preset,
+                                        **tier_kwargs)
+        self.similarity_cache.store(signature, namespace, result)
+        return result
+
+    def paraphrase(self, text: Union[str, Document], num_return_sequences: int = 1,
+                   seed: Optional[int] = None, page: int = 0, preset: Optional[str] = None) -> Dict[str, Any]:
+        return self.service.paraphrase(text, num_return_sequences=num_return_sequences, seed=seed, page=page,
+                                       preset=preset)
+
+    def analyze(self, text: Union[str, Document]) -> Dict[str, Any]:
+        doc = as_document(text)
+        namespace = f'{accounting.tenant()}:analyze'
+        signature = self.similarity_cache.signature(doc.normalized)
+        found = self.similarity_cache.lookup(signature, namespace)
+        if found is not None:
+            analysis, similarity = found
+            return {**_refresh_analysis(analysis, doc), 'cache': {'similarity': round(similarity, 3)}}
+        analysis = self.service.analyze(doc)
+        self.similarity_cache.store(signature, namespace, analysis)
+        return analysis
+
+    def similarity_status(self) -> Dict[str, Any]:
+        result = {'documents': self.similarity_cache.status()}
+        chunk_cache = getattr(self.service, 'chunk_cache', None)
+        if chunk_cache is not None:
+            result['chunks'] = chunk_cache.status()
+        return result
@@ -1,134 +1,224 @@
 import time
-import re
 import os
-from typing import Dict, List, Any
-from transformers import pipeline, AutoTokenizer, AutoModelForSeq2SeqLM
-import torch
-import nltk
-import textstat
+from typing import Dict, List, Any, Optional, Tuple, Union
 from app.models.text_models import TextAnalysis
+from app.models.document import Document, as_document
+from app.services import accounting
+from app.services.acceleration import Accelerator
+from app.services.analysis_pool import get_analysis_pool, signed_sentiment
+from app.services.chunker import CHUNK_WORDS, normalize_text
+from app.services.decoding import DecodingError, DecodingPreset, get_preset
+from app.services.encoder_cache import EncodedInput, EncoderCache, VariationState, page_variations, sampling
+from app.services.model_manager import ModelManager
+from app.services.model_store import get_model_store
+from app.services.similarity_cache import SimilarityCache, similarity_cache_enabled
+from app.services.thread_plan import apply_torch_threads
 
 class TextService:
     """Service class for text processing operations"""
     
-    def __init__(self):
-        self.device = "cuda" if torch.cuda.is_available() else "cpu"
-        print(f"🔧 Using device: {self.device}")
+    # Model tiers the router can pick from, cheapest first
+    model_tiers = {'summarize': ('small', 'large'), 'analyze': ('roberta',), 'paraphrase': ('large',)}
+    
+    def __init__(self, summarization_model: Optional[str] = None, paraphrase_model: Optional[str] = None,
+                 chunk_words: int = CHUNK_WORDS, long_text_words: int = 1000,
+                 summary_generate_kwargs: Optional[Dict[str, Any]] = None,
+                 paraphrase_generate_kwargs: Optional[Dict[str, Any]] = None):
+        # torch, transformers and NLTK data are imported on first use, not at startup
+        self._device = None
         
-        # Initialize models lazily
-        self._summarizer = None
-        self._paraphraser = None
-        self._sentiment_analyzer = None
+        # Model and decoding choices (overridable so configurations can be evaluated)
+        self.summarization_model = summarization_model or os.getenv('SUMMARIZATION_MODEL', 'facebook/bart-large-cnn')
+        self.small_summarization_model = os.getenv('SMALL_SUMMARIZATION_MODEL', 'sshleifer/distilbart-cnn-6-6')
+        self.paraphrase_model = paraphrase_model or os.getenv('PARAPHRASE_MODEL', 'tuner007/pegasus_paraphrase')
+        self.sentiment_model = os.getenv('SENTIMENT_MODEL', 'cardiffnlp/twitter-roberta-base-sentiment-latest')
+        self.chunk_words = chunk_words
+        self.long_text_words = long_text_words
+        # Applied on top of the request's decoding preset
+        self.summary_generate_kwargs = dict(summary_generate_kwargs or {})
+        self.paraphrase_generate_kwargs = dict(paraphrase_generate_kwargs or {})
         
-        # Download NLTK data if needed
-        self._download_nltk_data()
-    
-    def _download_nltk_data(self):
-        """Download required NLTK data"""
-        try:
-            nltk.data.find('tokenizers/punkt')
-        except LookupError:
-            print("📥 Downloading NLTK punkt tokenizer...")
-            nltk.download('punkt', quiet=True)
+        # Chunk summaries of long texts, reused when an edited text is summarized again
+        self.chunk_cache = None
+        if similarity_cache_enabled():
+            self.chunk_cache = SimilarityCache(max_entries=int(os.getenv('SIMILARITY_CHUNK_CACHE_SIZE', 50000)))
         
-        try:
-            nltk.data.find('corpora/vader_lexicon')
-        except LookupError:
-            print("📥 Downloading NLTK vader lexicon...")
-            nltk.download('vader_lexicon', quiet=True)
+        # Encoder outputs of recent paraphrase inputs, so more variations only cost decoding
+        self.encoder_cache = None
+        if float(os.getenv('PARAPHRASE_ENCODER_CACHE_MB', 256)) > 0:
+            self.encoder_cache = EncoderCache()
+        
+        # Packaged models load from the local store (and only from there once it exists)
+        self.model_store = get_model_store()
+        
+        # Eager by default; EXECUTION_MODE=compiled compiles each model as it loads
+        self.accelerator = Accelerator()
+        
+        # Models are loaded lazily and may be evicted again when idle or over budget
+        self.model_manager = ModelManager()
+        self.model_manager.register('summarizer', self._load_summarizer)
+        self.model_manager.register(
+            'small_summarizer', lambda: self._load_summarizer(self.small_summarization_model, 'small_summarizer'))
+        self.model_manager.register('paraphraser', self._load_paraphraser)
+        self.model_manager.register('sentiment_analyzer', self._load_sentiment_analyzer)
     
     @property
-    def summarizer(self):
-        """Lazy load summarization model"""
-        if self._summarizer is None:
-            print("🤖 Loading summarization model...")
+    def device(self) -> str:
+        """Inference device, resolved when the first model needs it"""
+        if self._device is None:
+            import torch
+            apply_torch_threads()
+            self._device = "cuda" if torch.cuda.is_available() else "cpu"
+            print(f"🔧 Using device: {self._device}")
+        return self._device
+    
+    def warmup(self, models: Optional[List[str]] = None):
+        """Load (and in compiled mode compile) models ahead of the first request"""
+        for name in models or ['summarizer', 'small_summarizer', 'paraphraser', 'sentiment_analyzer']:
             try:
-                self._summarizer = pipeline(
-                    "summarization",
-                    model="facebook/bart-large-cnn",
-                    device=0 if self.device == "cuda" else -1,
-                    torch_dtype=torch.float16 if self.device == "cuda" else torch.float32
-                )
-                print("✅ Summarization model loaded successfully")
+                self.model_manager.get(name)
             except Exception as e:
-                print(f"⚠️ Failed to load BART model, falling back to lighter model: {e}")
-                # Fallback to a lighter model
-                self._summarizer = pipeline(
-                    "summarization",
-                    model="sshleifer/distilbart-cnn-12-6",
-                    device=0 if self.device == "cuda" else -1
-                )
-        return self._summarizer
+                print(f"⚠️ Warm-up of {name} failed: {e}")
+    
+    @property
+    def model_repos(self) -> List[str]:
+        """Hub names of the models this service loads (what the model store packs)"""
+        return [self.summarization_model, self.small_summarization_model, self.paraphrase_model, self.sentiment_model]
+    
+    @property
+    def summarizer(self):
+        """Summarization model, loaded on demand by the model manager"""
+        return self.model_manager.get('summarizer')
+    
+    @property
+    def small_summarizer(self):
+        """Smaller summarization model the router uses for short and medium inputs"""
+        return self.model_manager.get('small_summarizer')
     
     @property
     def paraphraser(self):
-        """Lazy load paraphrasing model"""
-        if self._paraphraser is None:
-            print("🤖 Loading paraphrasing model...")
-            try:
-                model_name = "tuner007/pegasus_paraphrase"
-                tokenizer = AutoTokenizer.from_pretrained(model_name)
-                model = AutoModelForSeq2SeqLM.from_pretrained(model_name)
-                
-                if self.device == "cuda":
-                    model = model.half().to(self.device)
-                else:
-                    model = model.to(self.device)
-                    
-                self._paraphraser = {
-                    'model': model,
-                    'tokenizer': tokenizer
-                }
-                print("✅ Paraphrasing model loaded successfully")
-            except Exception as e:
-                print(f"⚠️ Failed to load paraphrasing model: {e}")
-                # Fallback to T5 small
-                self._paraphraser = pipeline(
-                    "text2text-generation",
-                    model="t5-small",
-                    device=0 if self.device == "cuda" else -1
-                )
-        return self._paraphraser
+        """Paraphrasing model, loaded on demand by the model manager"""
+        return self.model_manager.get('paraphraser')
     
     @property
     def sentiment_analyzer(self):
-        """Lazy load sentiment analysis model"""
-        if self._sentiment_analyzer is None:
-            print("🤖 Loading sentiment analysis model...")
-            self._sentiment_analyzer = pipeline(
-                "sentiment-analysis",
-                model="cardiffnlp/twitter-roberta-base-sentiment-latest",
+        """Sentiment analysis model, loaded on demand by the model manager"""
+        return self.model_manager.get('sentiment_analyzer')
+    
+    def _load_summarizer(self, model_name: Optional[str] = None, name: str = 'summarizer'):
+        """Load summarization model"""
+        import torch
+        from transformers import pipeline
+        
+        model_name = model_name or self.summarization_model
+        print(f"🤖 Loading summarization model {model_name}...")
+        location, load_kwargs = self.model_store.resolve(model_name)
+        try:
+            summarizer = self.accelerator.load(
+                pipeline,
+                "summarization",
+                model=location,
+                device=0 if self.device == "cuda" else -1,
+                torch_dtype=torch.float16 if self.device == "cuda" else torch.float32,
+                model_kwargs=load_kwargs
+            )
+            print("✅ Summarization model loaded successfully")
+        except Exception as e:
+            print(f"⚠️ Failed to load {model_name}, falling back to lighter model: {e}")
+            # Fallback to a lighter model
+            summarizer = pipeline(
+                "summarization",
+                model="sshleifer/distilbart-cnn-12-6",
                 device=0 if self.device == "cuda" else -1
             )
-            print("✅ Sentiment analysis model loaded successfully")
-        return self._sentiment_analyzer
+        self.accelerator.prepare(name, summarizer.model)
+        self.accelerator.warm_up_generation(name, summarizer.model, summarizer.tokenizer,
+                                            **self._summary_kwargs(get_preset()))
+        return summarizer
     
-    def summarize(self, text: str, max_length: int = 150, min_length: int = 30) -> Dict[str, Any]:
-        """Summarize text using BART model with support for long texts"""
+    def _load_paraphraser(self):
+        """Load paraphrasing model"""
+        from transformers import pipeline, AutoTokenizer, AutoModelForSeq2SeqLM
+        
+        print("🤖 Loading paraphrasing model...")
+        location, load_kwargs = self.model_store.resolve(self.paraphrase_model)
+        try:
+            tokenizer = AutoTokenizer.from_pretrained(location, local_files_only=load_kwargs.get('local_files_only', False))
+            model = self.accelerator.load(AutoModelForSeq2SeqLM.from_pretrained, location, **load_kwargs)
+            
+            if self.device == "cuda":
+                model = model.half().to(self.device)
+            else:
+                model = model.to(self.device)
+                
+            paraphraser = {
+                'model': model,
+                'tokenizer': tokenizer
+            }
+            print("✅ Paraphrasing model loaded successfully")
+            self.accelerator.prepare('paraphraser', model)
+            self.accelerator.warm_up_generation('paraphraser', model, tokenizer,
+                                                **self._paraphrase_kwargs(get_preset(), 1))
+        except Exception as e:
+            print(f"⚠️ Failed to load paraphrasing model: {e}")
+            # Fallback to T5 small
+            paraphraser = pipeline(
+                "text2text-generation",
+                model="t5-small",
+                device=0 if self.device == "cuda" else -1
+            )
+        return paraphraser
+    
+    def _load_sentiment_analyzer(self):
+        """Load sentiment analysis model"""
+        from transformers import pipeline
+        
+        print("🤖 Loading sentiment analysis model...")
+        location, load_kwargs = self.model_store.resolve(self.sentiment_model)
+        sentiment_analyzer = self.accelerator.load(
+            pipeline,
+            "sentiment-analysis",
+            model=location,
+            device=0 if self.device == "cuda" else -1,
+            model_kwargs=load_kwargs
+        )
+        print("✅ Sentiment analysis model loaded successfully")
+        self.accelerator.prepare('sentiment_analyzer', sentiment_analyzer.model)
+        self.accelerator.warm_up_classifier('sentiment_analyzer', sentiment_analyzer)
+        return sentiment_analyzer
+    
+    def summarize(self, text: Union[str, Document], max_length: int = 150,
+                  min_length: int = 30, tier: Optional[str] = None,
+                  preset: Optional[str] = None) -> Dict[str, Any]:
+        """Summarize text using BART model with support for long texts
+        (tier 'small' uses the smaller model; preset picks the decoding settings)"""
         start_time = time.time()
         
         try:
-            # Clean and prepare text
-            cleaned_text = self._clean_text(text)
-            original_word_count = len(cleaned_text.split())
+            decoding = get_preset(preset)
+            # Normalized text, sentences and chunks are parsed once per request
+            doc = as_document(text)
+            original_word_count = doc.word_count
+            # Hold one reference for the whole request so an eviction can't force a reload midway
+            summarizer = self.small_summarizer if tier == 'small' else self.summarizer
             
             # For very long texts, chunk them and summarize each chunk
-            if original_word_count > 1000:
-                summary = self._summarize_long_text(cleaned_text, max_length, min_length)
+            if original_word_count > self.long_text_words:
+                summary = self._summarize_long_text(doc, max_length, min_length, summarizer, decoding)
             else:
                 # Adjust lengths based on input
                 max_length = min(max_length, max(100, original_word_count // 3))
                 min_length = min(min_length, max_length // 3)
                 
                 # Generate summary
-                result = self.summarizer(
-                    cleaned_text,
+                accounting.record(chunks=1)
+                summary = self._generate_summary(
+                    summarizer,
+                    doc.token_ids(summarizer.tokenizer)[0],
                     max_length=max_length,
                     min_length=min_length,
-                    do_sample=False,
-                    truncation=True
+                    decoding=decoding
                 )
-                summary = result[0]['summary_text']
             
             summary_word_count = len(summary.split())
             
@@ -143,65 +233,76 @@ class TextService:
                 'compression_ratio': compression_ratio
             }
             
+        except DecodingError:
+            raise
         except Exception as e:
             print(f"Error in summarization: {e}")
             raise Exception(f"Summarization failed: {str(e)}")
     
-    def paraphrase(self, text: str, num_return_sequences: int = 1) -> Dict[str, Any]:
-        """Paraphrase text using Pegasus model"""
+    def paraphrase(self, text: Union[str, Document], num_return_sequences: int = 1,
+                   seed: Optional[int] = None, page: int = 0, preset: Optional[str] = None) -> Dict[str, Any]:
+        """Paraphrase text using Pegasus model.
+        
+        With a seed, variations come from a deterministic sequence without
+        duplicates (one per preset), and page selects which num_return_sequences
+        of it are returned.
+        """
         start_time = time.time()
         
         try:
-            cleaned_text = self._clean_text(text)
-            original_word_count = len(cleaned_text.split())
+            decoding = get_preset(preset)
+            generate_kwargs = self._paraphrase_kwargs(decoding, num_return_sequences)
+            doc = as_document(text)
+            cleaned_text = doc.normalized
+            original_word_count = doc.word_count
             
-            if isinstance(self.paraphraser, dict):
-                # Using custom Pegasus model
-                model = self.paraphraser['model']
-                tokenizer = self.paraphraser['tokenizer']
-                
-                # Tokenize input
-                inputs = tokenizer(
-                    f"paraphrase: {cleaned_text}",
-                    return_tensors="pt",
-                    max_length=512,
-                    truncation=True
-                ).to(self.device)
-                
-                # Generate paraphrases
-                with torch.no_grad():
-                    outputs = model.generate(
-                        **inputs,
-                        max_length=len(cleaned_text.split()) + 50,
-                        num_return_sequences=num_return_sequences,
-                        temperature=0.7,
-                        do_sample=True,
-                        pad_token_id=tokenizer.eos_token_id
-                    )
+            paraphraser = self.paraphraser
+            if isinstance(paraphraser, dict):
+                # Using custom Pegasus model; the encoder runs once per input text
+                model = paraphraser['model']
+                tokenizer = paraphraser['tokenizer']
+                key, encoded = self._encode_paraphrase_input(model, tokenizer, cleaned_text)
+                max_new_tokens = decoding.paraphrase_tokens(encoded.tokens_in, num_return_sequences, generate_kwargs)
                 
-                # Decode results
-                paraphrases = []
-                for output in outputs:
-                    paraphrase = tokenizer.decode(output, skip_special_tokens=True)
-                    paraphrases.append(paraphrase)
+                def sample(round_seed: Optional[int] = None) -> List[str]:
+                    return self._sample_paraphrases(model, tokenizer, encoded, num_return_sequences,
+                                                    max_new_tokens, generate_kwargs, seed=round_seed)
                 
-                main_paraphrase = paraphrases[0] if paraphrases else cleaned_text
-                variations = paraphrases[1:] if len(paraphrases) > 1 else []
+                if seed is None:
+                    paraphrases = sample()
+                else:
+                    paraphrases = page_variations(encoded, seed, page, num_return_sequences, sample,
+                                                  exclude=cleaned_text, stream=decoding.name)
+                    if self.encoder_cache is not None:
+                        self.encoder_cache.refresh(key)
                 
             else:
                 # Using T5 fallback
                 prompt = f"paraphrase: {cleaned_text}"
-                result = self.paraphraser(
-                    prompt,
-                    max_length=len(cleaned_text.split()) + 50,
-                    num_return_sequences=num_return_sequences,
-                    temperature=0.7,
-                    do_sample=True
+                max_new_tokens = decoding.paraphrase_tokens(
+                    len(paraphraser.tokenizer(prompt, truncation=True)['input_ids']),
+                    num_return_sequences, generate_kwargs
                 )
                 
-                main_paraphrase = result[0]['generated_text'] if result else cleaned_text
-                variations = [r['generated_text'] for r in result[1:]] if len(result) > 1 else []
+                def sample(round_seed: Optional[int] = None) -> List[str]:
+                    with sampling(round_seed, self.device):
+                        result = paraphraser(
+                            prompt,
+                            max_new_tokens=max_new_tokens,
+                            num_return_sequences=num_return_sequences,
+                            **generate_kwargs
+                        )
+                    accounting.record(model_calls=1)
+                    return [r['generated_text'] for r in result]
+                
+                if seed is None:
+                    paraphrases = sample()
+                else:
+                    paraphrases = page_variations(VariationState(), seed, page, num_return_sequences, sample,
+                                                  exclude=cleaned_text)
             
+            main_paraphrase = paraphrases[0] if paraphrases else cleaned_text
+            variations = paraphrases[1:]
             paraphrase_word_count = len(main_paraphrase.split())
             processing_time = time.time() - start_time
             
@@ -213,46 +314,83 @@ class TextService:
                 'paraphrase_word_count': paraphrase_word_count
             }
             
+        except DecodingError:
+            raise
         except Exception as e:
             print(f"Error in paraphrasing: {e}")
             raise Exception(f"Paraphrasing failed: {str(e)}")
     
-    def analyze(self, text: str) -> Dict[str, Any]:
+    def _encode_paraphrase_input(self, model, tokenizer, cleaned_text: str) -> Tuple[Any, EncodedInput]:
+        """Token ids and encoder output for the text, from the encoder cache when seen recently"""
+        key = (model.name_or_path, cleaned_text)
+        if self.encoder_cache is not None:
+            encoded = self.encoder_cache.get(key)
+            if encoded is not None:
+                return key, encoded
+        
+        # Tokenize input (padded to a fixed-shape bucket in compiled mode)
+        input_ids = tokenizer(
+            f"paraphrase: {cleaned_text}",
+            max_length=512,
+            truncation=True
+        )['input_ids']
+        pad_token_id = tokenizer.pad_token_id if tokenizer.pad_token_id is not None else tokenizer.eos_token_id
+        input_tensor, attention_mask = self.accelerator.input_tensors(input_ids, pad_token_id, self.device)
+        
+        import torch
+        with torch.no_grad(), self.accelerator.autocast():
+            hidden_state = model.get_encoder()(
+                input_ids=input_tensor, attention_mask=attention_mask, return_dict=True
+            ).last_hidden_state
+        accounting.record(tokens_in=len(input_ids))
+        
+        encoded = EncodedInput(input_tensor, attention_mask, hidden_state, len(input_ids))
+        if self.encoder_cache is not None:
+            self.encoder_cache.put(key, encoded)
+        return key, encoded
+    
+    def _summary_kwargs(self, decoding: DecodingPreset) -> Dict[str, Any]:
+        return {**decoding.summary, **self.summary_generate_kwargs}
+    
+    def _paraphrase_kwargs(self, decoding: DecodingPreset, num_return_sequences: int) -> Dict[str, Any]:
+        return {**decoding.paraphrase_kwargs(num_return_sequences), **self.paraphrase_generate_kwargs}
+    
+    def _sample_paraphrases(self, model, tokenizer, encoded: EncodedInput, num_return_sequences: int,
+                            max_new_tokens: int, generate_kwargs: Dict[str, Any],
+                            seed: Optional[int] = None) -> List[str]:
+        """Decode paraphrases from a precomputed encoder output (the encoder is not run again)"""
+        import torch
+        pad_token_id = tokenizer.pad_token_id if tokenizer.pad_token_id is not None else tokenizer.eos_token_id
+        with sampling(seed, self.device), \
+                torch.no_grad(), self.accelerator.autocast():
+            outputs = model.generate(
+                encoded.input_tensor,
+                attention_mask=encoded.attention_mask,
+                encoder_outputs=encoded.encoder_outputs(),
+                max_new_tokens=max_new_tokens,
+                num_return_sequences=num_return_sequences,
+                pad_token_id=tokenizer.eos_token_id,
+                **generate_kwargs
+            )
+        generated = outputs != pad_token_id
+        accounting.record(tokens_out=int(generated.sum()), model_calls=1)
+        return [tokenizer.decode(output, skip_special_tokens=True) for output in outputs]
+    
+    def analyze(self, text: Union[str, Document]) -> Dict[str, Any]:
         """Analyze text for various metrics"""
         try:
-            # Basic statistics
-            word_count = len(text.split())
-            sentence_count = len(nltk.sent_tokenize(text))
-            paragraph_count = len([p for p in text.split('\n\n') if p.strip()])
-            character_count = len(text)
-            character_count_no_spaces = len(text.replace(' ', ''))
+            doc = as_document(text)
             
-            # Reading time (average 200 words per minute)
-            reading_time_minutes = word_count / 200
+            # Counts and readability are pure Python; for larger texts they run
+            # on the analysis process pool while the sentiment model runs here
+            statistics = get_analysis_pool().submit('text_statistics', doc)
             
-            # Readability score (Flesch Reading Ease)
-            readability_score = textstat.flesch_reading_ease(text)
-            
-            # Sentiment analysis
-            try:
-                sentiment_result = self.sentiment_analyzer(text[:512])[0]  # Limit to 512 chars
-                sentiment_score = sentiment_result['score']
-                sentiment_label = sentiment_result['label']
-            except Exception as e:
-                print(f"Sentiment analysis error: {e}")
-                sentiment_score = 0.5
-                sentiment_label = "NEUTRAL"
+            sentiment = self.sentiment(doc)
             
             analysis = TextAnalysis(
-                word_count=word_count,
-                sentence_count=sentence_count,
-                paragraph_count=paragraph_count,
-                character_count=character_count,
-                character_count_no_spaces=character_count_no_spaces,
-                reading_time_minutes=reading_time_minutes,
-                readability_score=readability_score,
-                sentiment_score=sentiment_score,
-                sentiment_label=sentiment_label
+                **statistics.result(timeout=get_analysis_pool().timeout),
+                sentiment_score=sentiment['score'],
+                sentiment_label=sentiment['label']
             )
             
             return analysis.to_dict()
@@ -261,64 +399,104 @@ class TextService:
             print(f"Error in text analysis: {e}")
             raise Exception(f"Text analysis failed: {str(e)}")
     
-    def _summarize_long_text(self, text: str, max_length: int, min_length: int) -> str:
-        """Handle summarization of very long texts by chunking"""
-        # Split text into sentences
-        sentences = nltk.sent_tokenize(text)
-        
-        # Group sentences into chunks of ~800 words
-        chunks = []
-        current_chunk = []
-        current_word_count = 0
+    def sentiment(self, text: Union[str, Document]) -> Dict[str, Any]:
+        """Model sentiment of the text, on VADER's [-1, 1] scale (see signed_sentiment)"""
+        try:
+            sentiment_analyzer = self.sentiment_analyzer
+            sample = as_document(text).raw[:512]  # Limit to 512 chars
+            with self.accelerator.autocast():
+                sentiment_result = sentiment_analyzer(
+                    sample, **self.accelerator.classifier_kwargs(sentiment_analyzer.tokenizer, sample)
+                )[0]
+            accounting.record(model_calls=1)
+            score, label = signed_sentiment(sentiment_result['label'], sentiment_result['score'])
+        except Exception as e:
+            print(f"Sentiment analysis error: {e}")
+            score, label = 0.0, 'NEUTRAL'
+        return {'score': score, 'label': label}
+    
+    def _generate_summary(self, summarizer, token_ids: List[int], max_length: int, min_length: int,
+                          decoding: DecodingPreset) -> str:
+        """Run the summarization model on already-tokenized text"""
+        import torch
         
-        for sentence in sentences:
-            sentence_words = len(sentence.split())
-            if current_word_count + sentence_words > 800 and current_chunk:
-                chunks.append(' '.join(current_chunk))
-                current_chunk = [sentence]
-                current_word_count = sentence_words
-            else:
-                current_chunk.append(sentence)
-                current_word_count += sentence_words
+        tokenizer = summarizer.tokenizer
+        model = summarizer.model
+        limit = min(tokenizer.model_max_length, model.config.max_position_embeddings)
+        input_ids = tokenizer.build_inputs_with_special_tokens(token_ids[:limit - 2])
+        input_tensor, attention_mask = self.accelerator.input_tensors(input_ids, tokenizer.pad_token_id, model.device)
+        generate_kwargs = self._summary_kwargs(decoding)
+        max_new_tokens = decoding.summary_tokens(len(input_ids), max_length, generate_kwargs)
         
-        if current_chunk:
-            chunks.append(' '.join(current_chunk))
+        with torch.no_grad(), self.accelerator.autocast():
+            output = model.generate(
+                input_tensor,
+                attention_mask=attention_mask,
+                max_new_tokens=max_new_tokens,
+                min_length=min(min_length, max_new_tokens),
+                **generate_kwargs
+            )
+        accounting.record(tokens_in=len(input_ids), tokens_out=output.shape[-1], model_calls=1)
+        return tokenizer.decode(output[0], skip_special_tokens=True, clean_up_tokenization_spaces=True)
+    
+    def _summarize_long_text(self, doc: Document, max_length: int, min_length: int, summarizer,
+                             decoding: DecodingPreset) -> str:
+        """Handle summarization of very long texts from sentence-aligned chunks of ~800 words"""
+        chunk_spans = doc.chunk_spans(self.chunk_words)
+        accounting.record(chunks=len(chunk_spans))
         
-        # Summarize each chunk
+        # Summarize each chunk, slicing token ids from the single document encoding
         chunk_summaries = []
-        chunk_max_length = max(50, max_length // len(chunks))
-        chunk_min_length = max(20, min_length // len(chunks))
+        chunk_max_length = max(50, max_length // len(chunk_spans))
+        chunk_min_length = max(20, min_length // len(chunk_spans))
         
-        for chunk in chunks:
+        # Per API key: a near-duplicate chunk from another tenant may differ in exactly the names and figures
+        namespace = f'{accounting.tenant()}:chunk:{summarizer.model.name_or_path}:{decoding.name}:{chunk_max_length}:{chunk_min_length}'
+        reused = 0
+        
+        for span in chunk_spans:
+            # Unchanged (or nearly unchanged) chunks of a previously seen text aren't reprocessed
+            if self.chunk_cache is not None:
+                signature = self.chunk_cache.signature(doc.text_at(span))
+                found = self.chunk_cache.lookup(signature, namespace)
+                if found is not None:
+                    chunk_summaries.append(found[0])
+                    reused += 1
+                    continue
             try:
-                result = self.summarizer(
-                    chunk,
+                chunk_summary = self._generate_summary(
+                    summarizer,
+                    doc.span_token_ids(summarizer.tokenizer, span),
                     max_length=chunk_max_length,
                     min_length=chunk_min_length,
-                    do_sample=False,
-                    truncation=True
+                    decoding=decoding
                 )
-                chunk_summaries.append(result[0]['summary_text'])
+                chunk_summaries.append(chunk_summary)
+                if self.chunk_cache is not None:
+                    self.chunk_cache.store(signature, namespace, chunk_summary)
             except Exception as e:
                 print(f"Error summarizing chunk: {e}")
                 # Fallback: use first few sentences of the chunk
-                chunk_sentences = nltk.sent_tokenize(chunk)
+                chunk_sentences = list(doc.iter_sentences(span))
                 fallback_summary = ' '.join(chunk_sentences[:3])
                 chunk_summaries.append(fallback_summary)
         
+        if reused:
+            print(f"♻️ Reused {reused} of {len(chunk_spans)} chunk summaries")
+        
         # If we have multiple summaries, combine and summarize again
         if len(chunk_summaries) > 1:
             combined_summary = ' '.join(chunk_summaries)
             if len(combined_summary.split()) > max_length:
                 try:
-                    final_result = self.summarizer(
-                        combined_summary,
+                    # Same generation path as the chunks, so compiled mode reuses its buckets
+                    return self._generate_summary(
+                        summarizer,
+                        summarizer.tokenizer(combined_summary, add_special_tokens=False, verbose=False)['input_ids'],
                         max_length=max_length,
                         min_length=min_length,
-                        do_sample=False,
-                        truncation=True
+                        decoding=decoding
                     )
-                    return final_result[0]['summary_text']
                 except Exception:
                     # Fallback: return truncated combined summary
                     words = combined_summary.split()
@@ -326,14 +504,8 @@ class TextService:
             else:
                 return combined_summary
         else:
-            return chunk_summaries[0] if chunk_summaries else text[:500] + "..."
+            return chunk_summaries[0] if chunk_summaries else doc.normalized[:500] + "..."
     
     def _clean_text(self, text: str) -> str:
         """Clean and normalize text"""
-        # Remove extra whitespace
-        text = re.sub(r'\s+', ' ', text.strip())
-        
-        # Remove special characters but keep punctuation
-        text = re.sub(r'[^\w\s\.\,\!\?\;\:\-\(\)\"\']+', '', text)
-        
-        return text
\ No newline at end of file
+        return normalize_text(text)
\ No newline at end of file
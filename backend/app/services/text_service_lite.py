@@ -1,14 +1,28 @@
 import time
-import re
 import os
-from typing import Dict, List, Any
-import nltk
-import textstat
+from typing import Dict, List, Any, Optional, Union
 from app.models.text_models import TextAnalysis
+from app.models.document import Document, as_document
+from app.services import accounting
+from app.services.analysis_pool import extractive_summary, get_analysis_pool
+from app.services.decoding import DecodingError, get_preset
+from app.services.encoder_cache import VariationState, page_variations, sampling
+from app.services.model_store import get_model_store
+from app.services.thread_plan import apply_torch_threads
+from app.services.chunker import normalize_text
 
 class TextService:
     """Lightweight service class for text processing operations"""
     
+    # DistilBART is the only summarization model; sentiment is VADER
+    model_tiers = {'summarize': ('small',), 'analyze': ('vader',), 'paraphrase': ('large',)}
+    
+    # Hub names of the models this service loads (what the model store packs)
+    SUMMARIZATION_MODEL = 'sshleifer/distilbart-cnn-6-6'
+    PARAPHRASE_MODEL = 't5-small'
+    SENTIMENT_MODEL = 'distilbert-base-uncased-finetuned-sst-2-english'
+    model_repos = [SUMMARIZATION_MODEL, PARAPHRASE_MODEL, SENTIMENT_MODEL]
+    
     def __init__(self):
         print("🔧 Initializing TextService...")
         
@@ -17,57 +31,52 @@ class TextService:
         self._paraphraser = None
         self._sentiment_analyzer = None
         
-        # Download NLTK data if needed
-        self._download_nltk_data()
-        print("✅ TextService initialized successfully")
-    
-    def _download_nltk_data(self):
-        """Download required NLTK data"""
-        try:
-            nltk.data.find('tokenizers/punkt')
-        except LookupError:
-            print("📥 Downloading NLTK punkt tokenizer...")
-            nltk.download('punkt', quiet=True)
+        # Packaged models load from the local store (and only from there once it exists)
+        self.model_store = get_model_store()
         
-        try:
-            nltk.data.find('corpora/vader_lexicon')
-        except LookupError:
-            print("📥 Downloading NLTK vader lexicon...")
-            nltk.download('vader_lexicon', quiet=True)
+        # NLTK data is loaded from the bundled directory on first use
+        print("✅ TextService initialized successfully")
     
     def _load_transformers_model(self, model_type: str):
         """Load transformers model only when needed"""
         try:
             from transformers import pipeline
+            apply_torch_threads()
             
             if model_type == "summarization":
                 print("🤖 Loading summarization model (this may take a moment)...")
                 # Use a lighter, faster model
+                location, load_kwargs = self.model_store.resolve(self.SUMMARIZATION_MODEL)
                 self._summarizer = pipeline(
                     "summarization",
-                    model="sshleifer/distilbart-cnn-6-6",
+                    model=location,
                     device=-1,  # CPU only for better compatibility
-                    framework="pt"
+                    framework="pt",
+                    model_kwargs=load_kwargs
                 )
                 print("✅ Summarization model loaded successfully")
                 
             elif model_type == "paraphrasing":
                 print("🤖 Loading paraphrasing model...")
                 # Use T5-small for better compatibility
+                location, load_kwargs = self.model_store.resolve(self.PARAPHRASE_MODEL)
                 self._paraphraser = pipeline(
                     "text2text-generation",
-                    model="t5-small",
+                    model=location,
                     device=-1,
-                    framework="pt"
+                    framework="pt",
+                    model_kwargs=load_kwargs
                 )
                 print("✅ Paraphrasing model loaded successfully")
                 
             elif model_type == "sentiment":
                 print("🤖 Loading sentiment analysis model...")
+                location, load_kwargs = self.model_store.resolve(self.SENTIMENT_MODEL)
                 self._sentiment_analyzer = pipeline(
                     "sentiment-analysis",
-                    model="distilbert-base-uncased-finetuned-sst-2-english",
-                    device=-1
+                    model=location,
+                    device=-1,
+                    model_kwargs=load_kwargs
                 )
                 print("✅ Sentiment analysis model loaded successfully")
                 
@@ -75,9 +84,12 @@ class TextService:
             print(f"⚠️ Failed to load {model_type} model: {e}")
             return None
     
-    def summarize(self, text: str, max_length: int = 150, min_length: int = 30) -> Dict[str, Any]:
+    def summarize(self, text: Union[str, Document], max_length: int = 150,
+                  min_length: int = 30, preset: Optional[str] = None) -> Dict[str, Any]:
         """Summarize text using DistilBART model"""
         start_time = time.time()
+        doc = as_document(text)
+        decoding = get_preset(preset)
         
         try:
             # Load model if not already loaded
@@ -86,24 +98,29 @@ class TextService:
             
             # If model loading failed, use extractive summarization fallback
             if self._summarizer is None:
-                return self._extractive_summarization(text, max_length)
+                return self._extractive_summarization(doc, max_length)
             
-            # Clean and prepare text
-            cleaned_text = self._clean_text(text)
-            original_word_count = len(cleaned_text.split())
+            # Clean and prepare text (parsed once per request by the Document)
+            cleaned_text = doc.normalized
+            original_word_count = doc.word_count
             
             # Adjust lengths based on input
             max_length = min(max_length, max(50, original_word_count // 2))
             min_length = min(min_length, max_length // 2)
+            max_new_tokens = decoding.summary_tokens(
+                len(self._summarizer.tokenizer(cleaned_text, truncation=True)['input_ids']),
+                max_length, decoding.summary
+            )
             
             # Generate summary
             result = self._summarizer(
                 cleaned_text,
-                max_length=max_length,
-                min_length=min_length,
-                do_sample=False,
-                truncation=True
+                max_new_tokens=max_new_tokens,
+                min_length=min(min_length, max_new_tokens),
+                truncation=True,
+                **decoding.summary
             )
+            accounting.record(chunks=1, model_calls=1)
             
             summary = result[0]['summary_text']
             summary_word_count = len(summary.split())
@@ -119,38 +136,28 @@ class TextService:
                 'compression_ratio': compression_ratio
             }
             
+        except DecodingError:
+            raise
         except Exception as e:
             print(f"Error in summarization: {e}")
             # Fallback to extractive summarization
-            return self._extractive_summarization(text, max_length)
+            return self._extractive_summarization(doc, max_length)
     
-    def _extractive_summarization(self, text: str, max_length: int) -> Dict[str, Any]:
-        """Fallback extractive summarization using sentence ranking"""
-        start_time = time.time()
-        
-        sentences = nltk.sent_tokenize(text)
-        original_word_count = len(text.split())
-        
-        # Simple extractive summarization: take first few sentences
-        target_sentences = min(3, len(sentences), max_length // 20)
-        summary_sentences = sentences[:target_sentences]
-        summary = ' '.join(summary_sentences)
-        
-        summary_word_count = len(summary.split())
-        processing_time = time.time() - start_time
-        compression_ratio = summary_word_count / original_word_count if original_word_count > 0 else 0
-        
-        return {
-            'summary': summary,
-            'processing_time': processing_time,
-            'original_word_count': original_word_count,
-            'summary_word_count': summary_word_count,
-            'compression_ratio': compression_ratio
-        }
+    def _extractive_summarization(self, doc: Document, max_length: int) -> Dict[str, Any]:
+        """Fallback extractive summarization: the first few sentences"""
+        if doc.parsed:
+            # Only picking sentences is left, which is cheaper than any IPC
+            return extractive_summary(doc, max_length)
+        return get_analysis_pool().run('extractive_summary', doc, max_length=max_length)
     
-    def paraphrase(self, text: str, num_return_sequences: int = 1) -> Dict[str, Any]:
-        """Paraphrase text using T5 model"""
+    def paraphrase(self, text: Union[str, Document], num_return_sequences: int = 1,
+                   seed: Optional[int] = None, page: int = 0, preset: Optional[str] = None) -> Dict[str, Any]:
+        """Paraphrase text using T5 model (seed and page as in the full service, without the encoder cache)"""
         start_time = time.time()
+        doc = as_document(text)
+        text = doc.raw
+        decoding = get_preset(preset)
+        generate_kwargs = decoding.paraphrase_kwargs(num_return_sequences)
         
         try:
             # Load model if not already loaded
@@ -161,22 +168,36 @@ class TextService:
             if self._paraphraser is None:
                 return self._simple_paraphrasing(text)
             
-            cleaned_text = self._clean_text(text)
-            original_word_count = len(cleaned_text.split())
+            cleaned_text = doc.normalized
+            original_word_count = doc.word_count
             
             # Use T5 with paraphrasing prompt
             prompt = f"paraphrase: {cleaned_text}"
-            result = self._paraphraser(
-                prompt,
-                max_length=len(cleaned_text.split()) + 20,
-                num_return_sequences=num_return_sequences,
-                temperature=0.7,
-                do_sample=True,
-                pad_token_id=self._paraphraser.tokenizer.eos_token_id
+            max_new_tokens = decoding.paraphrase_tokens(
+                len(self._paraphraser.tokenizer(prompt, truncation=True)['input_ids']),
+                num_return_sequences, generate_kwargs
             )
             
-            main_paraphrase = result[0]['generated_text'] if result else cleaned_text
-            variations = [r['generated_text'] for r in result[1:]] if len(result) > 1 else []
+            def sample(round_seed: Optional[int] = None) -> List[str]:
+                with sampling(round_seed):
+                    result = self._paraphraser(
+                        prompt,
+                        max_new_tokens=max_new_tokens,
+                        num_return_sequences=num_return_sequences,
+                        pad_token_id=self._paraphraser.tokenizer.eos_token_id,
+                        **generate_kwargs
+                    )
+                accounting.record(model_calls=1)
+                return [r['generated_text'] for r in result]
+            
+            if seed is None:
+                paraphrases = sample()
+            else:
+                paraphrases = page_variations(VariationState(), seed, page, num_return_sequences, sample,
+                                              exclude=cleaned_text)
+            
+            main_paraphrase = paraphrases[0] if paraphrases else cleaned_text
+            variations = paraphrases[1:]
             
             paraphrase_word_count = len(main_paraphrase.split())
             processing_time = time.time() - start_time
@@ -189,6 +210,8 @@ class TextService:
                 'paraphrase_word_count': paraphrase_word_count
             }
             
+        except DecodingError:
+            raise
         except Exception as e:
             print(f"Error in paraphrasing: {e}")
             return self._simple_paraphrasing(text)
@@ -235,57 +258,15 @@ class TextService:
             'paraphrase_word_count': len(paraphrase.split())
         }
     
-    def analyze(self, text: str) -> Dict[str, Any]:
+    def analyze(self, text: Union[str, Document]) -> Dict[str, Any]:
         """Analyze text for various metrics"""
         try:
-            # Basic statistics
-            word_count = len(text.split())
-            sentence_count = len(nltk.sent_tokenize(text))
-            paragraph_count = len([p for p in text.split('\n\n') if p.strip()])
-            character_count = len(text)
-            character_count_no_spaces = len(text.replace(' ', ''))
-            
-            # Reading time (average 200 words per minute)
-            reading_time_minutes = word_count / 200
-            
-            # Readability score (Flesch Reading Ease)
-            try:
-                readability_score = textstat.flesch_reading_ease(text)
-            except:
-                readability_score = 50.0  # Default neutral score
-            
-            # Simple sentiment analysis using VADER (via NLTK)
-            try:
-                from nltk.sentiment import SentimentIntensityAnalyzer
-                sia = SentimentIntensityAnalyzer()
-                sentiment_scores = sia.polarity_scores(text)
-                sentiment_score = sentiment_scores['compound']
-                
-                if sentiment_score >= 0.05:
-                    sentiment_label = "POSITIVE"
-                elif sentiment_score <= -0.05:
-                    sentiment_label = "NEGATIVE"
-                else:
-                    sentiment_label = "NEUTRAL"
-                    
-            except Exception as e:
-                print(f"Sentiment analysis error: {e}")
-                sentiment_score = 0.0
-                sentiment_label = "NEUTRAL"
-            
-            analysis = TextAnalysis(
-                word_count=word_count,
-                sentence_count=sentence_count,
-                paragraph_count=paragraph_count,
-                character_count=character_count,
-                character_count_no_spaces=character_count_no_spaces,
-                reading_time_minutes=reading_time_minutes,
-                readability_score=readability_score,
-                sentiment_score=sentiment_score,
-                sentiment_label=sentiment_label
+            # Counts, readability and VADER sentiment are pure Python, so
+            # larger texts are analyzed on the analysis process pool
+            statistics = get_analysis_pool().run(
+                'text_statistics', as_document(text), sentiment=True, readability_fallback=50.0
             )
-            
-            return analysis.to_dict()
+            return TextAnalysis(**statistics).to_dict()
             
         except Exception as e:
             print(f"Error in text analysis: {e}")
@@ -293,10 +274,4 @@ class TextService:
     
     def _clean_text(self, text: str) -> str:
         """Clean and normalize text"""
-        # Remove extra whitespace
-        text = re.sub(r'\s+', ' ', text.strip())
-        
-        # Remove special characters but keep punctuation
-        text = re.sub(r'[^\w\s\.\,\!\?\;\:\-\(\)\"\']+', '', text)
-        
-        return text
\ No newline at end of file
+        return normalize_text(text)
\ No newline at end of file
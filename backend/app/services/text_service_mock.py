@@ -1,6 +1,9 @@
 import time
 import re
-from typing import Dict, List, Any
+from typing import Dict, Any, Optional, Union
+from app.models.document import Document, as_document
+from app.models.text_models import TextAnalysis
+from app.services.decoding import get_preset
 
 class TextService:
     """Mock service class for text processing operations - for testing UI"""
@@ -9,8 +12,11 @@ class TextService:
         print("🔧 Initializing Mock TextService...")
         print("✅ Mock TextService initialized successfully")
     
-    def summarize(self, text: str, max_length: int = 150, min_length: int = 50) -> Dict[str, Any]:
-        """Mock summarization for testing"""
+    def summarize(self, text: Union[str, Document], max_length: int = 150,
+                  min_length: int = 50, preset: Optional[str] = None) -> Dict[str, Any]:
+        """Mock summarization for testing (the preset is validated, then ignored)"""
+        get_preset(preset)
+        text = as_document(text).raw
         print(f"📝 Mock summarizing text (length: {len(text)})")
         
         start_time = time.time()
@@ -44,8 +50,11 @@ class TextService:
         print(f"✅ Mock summary completed in {processing_time:.2f}s")
         return result
     
-    def paraphrase(self, text: str, num_return_sequences: int = 1) -> Dict[str, Any]:
-        """Mock paraphrasing for testing"""
+    def paraphrase(self, text: Union[str, Document], num_return_sequences: int = 1,
+                   seed: Optional[int] = None, page: int = 0, preset: Optional[str] = None) -> Dict[str, Any]:
+        """Mock paraphrasing for testing (pages through a fixed list; seed and preset are ignored)"""
+        get_preset(preset)
+        text = as_document(text).raw
         print(f"🔄 Mock paraphrasing text (length: {len(text)})")
         
         start_time = time.time()
@@ -58,7 +67,7 @@ class TextService:
         ]
         
         # Select based on requested variations
-        variations = mock_paraphrases[:min(num_return_sequences, len(mock_paraphrases))]
+        variations = mock_paraphrases[page * num_return_sequences:(page + 1) * num_return_sequences]
         primary_paraphrase = variations[0] if variations else f"Paraphrased: {text}"
         
         original_words = len(text.split())
@@ -78,6 +87,24 @@ class TextService:
         print(f"✅ Mock paraphrase completed in {processing_time:.2f}s")
         return result
     
+    def analyze(self, text: Union[str, Document]) -> Dict[str, Any]:
+        """Mock text analysis with the same fields as the real backends"""
+        text = as_document(text).raw
+        result = self.analyze_text(text)
+        
+        analysis = TextAnalysis(
+            word_count=result['word_count'],
+            sentence_count=result['sentence_count'],
+            paragraph_count=len([p for p in text.split('\n\n') if p.strip()]),
+            character_count=result['character_count'],
+            character_count_no_spaces=len(text.replace(' ', '')),
+            reading_time_minutes=result['word_count'] / 200,
+            readability_score=result['readability_score'],
+            sentiment_score=result['sentiment_score'],
+            sentiment_label='NEUTRAL'
+        )
+        return analysis.to_dict()
+    
     def analyze_text(self, text: str) -> Dict[str, Any]:
         """Mock text analysis for testing"""
         print(f"📊 Mock analyzing text (length: {len(text)})")
@@ -91,7 +118,7 @@ class TextService:
         
         # Mock scores
         readability_score = min(100, max(0, 100 - (word_count / 10)))
-        sentiment_score = 0.5  # Neutral
+        sentiment_score = 0.0  # Neutral
         
         processing_time = time.time() - start_time
         
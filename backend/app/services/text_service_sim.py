@@ -0,0 +1,373 @@
+"""Simulation backend for capacity planning.
+
+TEXT_SERVICE_BACKEND=sim serves the same interface and result shapes as the
+real TextService without any models. Each call takes the wall time, burns
+the CPU time and holds the memory that a calibration predicts for its task,
+input length and chunk count, so queueing, admission and memory behaviour of
+the serving stack can be load-tested on any machine.
+
+Calibrate against a real backend, or fit recorded runs:
+
+    python -m app.services.text_service_sim calibrate --backend full --output sim_calibration.json
+    python -m app.services.text_service_sim fit --records runs.jsonl --output sim_calibration.json
+    SIM_CALIBRATION=sim_calibration.json TEXT_SERVICE_BACKEND=sim python run.py
+
+A record is one JSON object per line: task, words, chunks, variations,
+wall_seconds, cpu_seconds and rss_delta_mb (the `usage` returned with
+X-Include-Usage plus the task and word count has all of them).
+"""
+import argparse
+import hashlib
+import json
+import math
+import os
+import random
+import sys
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+from app.models.document import Document, as_document
+from app.models.text_models import TextAnalysis
+from app.services import accounting
+from app.services.analysis_pool import extractive_summary, text_statistics
+from app.services.chunker import CHUNK_WORDS
+from app.services.cost_model import fit_task
+from app.services.decoding import get_preset
+from app.services.model_manager import ModelManager, _current_rss
+
+TASKS = ('summarize', 'paraphrase', 'analyze')
+TASK_MODELS = {'summarize': 'summarizer', 'paraphrase': 'paraphraser', 'analyze': 'sentiment_analyzer'}
+
+# Rough placeholders so the backend runs without a calibration file; they are
+# not measurements, and results mean little until the backend is calibrated
+DEFAULT_CALIBRATION = {
+    'calibrated': False,
+    'tasks': {
+        'summarize': {'base_seconds': 0.5, 'per_word_seconds': 0.001, 'per_chunk_seconds': 1.5,
+                      'per_variation_seconds': 0.0, 'noise_sigma': 0.15, 'cpu_ratio': 1.0,
+                      'memory_mb_per_1k_words': 40.0, 'tokens_per_word': 1.3},
+        'paraphrase': {'base_seconds': 0.4, 'per_word_seconds': 0.01, 'per_chunk_seconds': 0.0,
+                       'per_variation_seconds': 0.3, 'noise_sigma': 0.2, 'cpu_ratio': 1.0,
+                       'memory_mb_per_1k_words': 30.0, 'tokens_per_word': 1.3},
+        'analyze': {'base_seconds': 0.05, 'per_word_seconds': 0.00005, 'per_chunk_seconds': 0.0,
+                    'per_variation_seconds': 0.0, 'noise_sigma': 0.1, 'cpu_ratio': 1.0,
+                    'memory_mb_per_1k_words': 5.0, 'tokens_per_word': 1.3},
+    },
+    'models': {
+        'summarizer': {'load_seconds': 8.0, 'memory_mb': 1600.0},
+        'paraphraser': {'load_seconds': 10.0, 'memory_mb': 2200.0},
+        'sentiment_analyzer': {'load_seconds': 2.0, 'memory_mb': 260.0},
+    }
+}
+
+# Chunked summarization kicks in above this many words, as in the full backend
+LONG_TEXT_WORDS = 1000
+# sha256 releases the GIL for buffers this large, so burning CPU behaves like model kernels
+_BURN_BUFFER = b'\0' * 65536
+
+
+def load_calibration(path: Optional[str] = None) -> Dict[str, Any]:
+    """Calibration from path (or SIM_CALIBRATION) merged over the defaults"""
+    path = path or os.getenv('SIM_CALIBRATION')
+    calibration = json.loads(json.dumps(DEFAULT_CALIBRATION))
+    if not path:
+        return calibration
+    with open(path) as f:
+        loaded = json.load(f)
+    for section in ('tasks', 'models'):
+        for name, values in loaded.get(section, {}).items():
+            calibration[section].setdefault(name, {}).update(values)
+    calibration['calibrated'] = loaded.get('calibrated', True)
+    calibration['source'] = path
+    return calibration
+
+
+def chunk_count(doc: Document, task: str) -> int:
+    """Model passes the full backend makes for this task and text"""
+    if task != 'summarize' or doc.word_count <= LONG_TEXT_WORDS:
+        return 1
+    chunks = len(doc.chunk_spans(CHUNK_WORDS))
+    # Chunk summaries are summarized once more when there are several
+    return chunks + 1 if chunks > 1 else chunks
+
+
+def _burn(seconds: float):
+    """Keep this thread busy for seconds of CPU time without holding the GIL"""
+    end = time.thread_time() + seconds
+    while time.thread_time() < end:
+        hashlib.sha256(_BURN_BUFFER).digest()
+
+
+def spend(wall_seconds: float, cpu_seconds: float, max_threads: int = 1):
+    """Take at least wall_seconds, cpu_seconds of them busy.
+
+    CPU time beyond the wall time (intra-op parallelism) is spread over up to
+    max_threads threads. On a contended machine burning takes longer than
+    planned, so latency grows as it would for real inference.
+    """
+    start = time.perf_counter()
+    threads = 1
+    if wall_seconds > 0 and cpu_seconds > wall_seconds:
+        threads = max(1, min(max_threads, math.ceil(cpu_seconds / wall_seconds)))
+    share = cpu_seconds / threads
+    helpers = [threading.Thread(target=accounting.bind(_burn), args=(share,), daemon=True)
+               for _ in range(threads - 1)]
+    for helper in helpers:
+        helper.start()
+    _burn(share)
+    for helper in helpers:
+        helper.join()
+    remaining = wall_seconds - (time.perf_counter() - start)
+    if remaining > 0:
+        time.sleep(remaining)
+
+
+class SimulatedModel:
+    """Stands in for a loaded model: takes its load time and holds its memory"""
+
+    def __init__(self, name: str, memory_mb: float):
+        self.name = name
+        # bytearray() zero-fills, so the pages are really resident
+        self.weights = bytearray(int(memory_mb * 1024 * 1024))
+
+
+class TextService:
+    """Latency-, CPU- and memory-faithful stand-in for the real TextService"""
+
+    # One calibrated curve per task, so one model tier each
+    model_tiers = {'summarize': ('large',), 'analyze': ('roberta',), 'paraphrase': ('large',)}
+
+    def __init__(self, calibration: Optional[Dict[str, Any]] = None):
+        print("🔧 Initializing simulated TextService...")
+        self.calibration = calibration or load_calibration()
+        self.speed = float(os.getenv('SIM_SPEED', 1.0))
+        self.burn_cpu = os.getenv('SIM_BURN_CPU', 'true').lower() == 'true'
+        self.max_threads = int(os.getenv('SIM_MAX_THREADS', os.cpu_count() or 1))
+        self._random = random.Random(os.getenv('SIM_SEED'))
+        self._lock = threading.Lock()
+        self._calls = {task: 0 for task in TASKS}
+        self._simulated_seconds = {task: 0.0 for task in TASKS}
+
+        # Simulated models go through the real ModelManager, so budgets and eviction behave the same
+        self.model_manager = ModelManager()
+        for name in self.calibration['models']:
+            self.model_manager.register(name, lambda name=name: self._load_model(name))
+
+        if not self.calibration.get('calibrated'):
+            print("⚠️ Simulation is using placeholder timings; set SIM_CALIBRATION to a calibration file")
+        print("✅ Simulated TextService initialized successfully")
+
+    def warmup(self, models: Optional[List[str]] = None):
+        for name in models or list(self.calibration['models']):
+            self.model_manager.get(name)
+
+    def summarize(self, text: Union[str, Document], max_length: int = 150,
+                  min_length: int = 30, preset: Optional[str] = None) -> Dict[str, Any]:
+        start_time = time.time()
+        doc = as_document(text)
+        decoding = get_preset(preset)
+        result = extractive_summary(doc, max_length)
+        self._simulate('summarize', doc, outputs=result['summary_word_count'], cost_factor=decoding.cost_factor)
+        result['processing_time'] = time.time() - start_time
+        return result
+
+    def paraphrase(self, text: Union[str, Document], num_return_sequences: int = 1,
+                   seed: Optional[int] = None, page: int = 0, preset: Optional[str] = None) -> Dict[str, Any]:
+        start_time = time.time()
+        doc = as_document(text)
+        decoding = get_preset(preset)
+        # Rejects the same requests as the real backends' token budget would
+        decoding.paraphrase_tokens(int(doc.word_count * self.calibration['tasks']['paraphrase']['tokens_per_word']),
+                                   num_return_sequences, decoding.paraphrase_kwargs(num_return_sequences))
+        self._simulate('paraphrase', doc, variations=num_return_sequences,
+                       outputs=doc.word_count * num_return_sequences, cost_factor=decoding.cost_factor)
+        sentences = list(doc.iter_sentences())
+        # Rotated sentence order, so variations differ from each other and from the input
+        candidates = [' '.join(sentences[i:] + sentences[:i]) for i in range(max(1, len(sentences)))]
+        first = 1 + page * num_return_sequences
+        paraphrases = [candidates[i % len(candidates)] for i in range(first, first + num_return_sequences)]
+        return {
+            'paraphrase': paraphrases[0],
+            'variations': paraphrases[1:],
+            'processing_time': time.time() - start_time,
+            'original_word_count': doc.word_count,
+            'paraphrase_word_count': len(paraphrases[0].split())
+        }
+
+    def analyze(self, text: Union[str, Document]) -> Dict[str, Any]:
+        doc = as_document(text)
+        self._simulate('analyze', doc)
+        statistics = text_statistics(doc, readability_fallback=50.0)
+        return TextAnalysis(**statistics, sentiment_score=0.0, sentiment_label='NEUTRAL').to_dict()
+
+    def sentiment(self, text: Union[str, Document]) -> Dict[str, Any]:
+        self._simulate('analyze', as_document(text))
+        return {'score': 0.0, 'label': 'NEUTRAL'}
+
+    def sample(self, task: str, words: int, chunks: int = 1, variations: int = 1) -> Tuple[float, float]:
+        """(wall seconds, CPU seconds) for one call, drawn from the calibrated distribution"""
+        params = self.calibration['tasks'][task]
+        mean = (params['base_seconds'] + params['per_word_seconds'] * words
+                + params['per_chunk_seconds'] * chunks + params['per_variation_seconds'] * (variations - 1))
+        sigma = params['noise_sigma']
+        with self._lock:
+            # Log-normal noise with the calibrated mean
+            wall = max(0.0, mean) * math.exp(self._random.gauss(-sigma * sigma / 2, sigma))
+        return wall * self.speed, wall * params['cpu_ratio'] * self.speed
+
+    def simulation_status(self) -> Dict[str, Any]:
+        return {
+            'calibrated': bool(self.calibration.get('calibrated')),
+            'calibration': self.calibration.get('source'),
+            'speed': self.speed,
+            'burn_cpu': self.burn_cpu,
+            'calls': dict(self._calls),
+            'simulated_seconds': {task: round(seconds, 3) for task, seconds in self._simulated_seconds.items()}
+        }
+
+    def _simulate(self, task: str, doc: Document, variations: int = 1, outputs: int = 0,
+                  cost_factor: float = 1.0):
+        """Hold the task's model and spend its calibrated time, CPU and working memory
+        (scaled by the decoding preset's cost factor; calibrations use the default preset)"""
+        params = self.calibration['tasks'][task]
+        model = self.model_manager.get(TASK_MODELS[task])
+        words = doc.word_count
+        chunks = chunk_count(doc, task)
+        wall, cpu = self.sample(task, words, chunks, variations)
+        wall, cpu = wall * cost_factor, cpu * cost_factor
+
+        scratch = bytearray(int(params['memory_mb_per_1k_words'] * words / 1000 * 1024 * 1024))
+        spend(wall, cpu if self.burn_cpu else 0.0, self.max_threads)
+        del scratch, model
+
+        with self._lock:
+            self._calls[task] += 1
+            self._simulated_seconds[task] += wall
+        accounting.record(
+            chunks=chunks,
+            model_calls=chunks,
+            tokens_in=int(words * params['tokens_per_word']),
+            tokens_out=int(outputs * params['tokens_per_word'])
+        )
+
+    def _load_model(self, name: str) -> SimulatedModel:
+        params = self.calibration['models'][name]
+        print(f"📥 Loading simulated {name} ({params['memory_mb']:.0f} MB)")
+        model = SimulatedModel(name, params['memory_mb'])
+        spend(params['load_seconds'] * self.speed, 0.0)
+        return model
+
+
+def fit(records: List[Dict[str, Any]], models: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    calibration = {'calibrated': True, 'records': len(records), 'tasks': {}, 'models': models or {}}
+    for task in TASKS:
+        rows = [r for r in records if r.get('task') == task and r.get('wall_seconds') is not None]
+        if rows:
+            calibration['tasks'][task] = fit_task(rows)
+            print(f"📐 {task}: {len(rows)} records -> {calibration['tasks'][task]}")
+    return calibration
+
+
+def _texts_of_length(corpus: List[str], words: int) -> str:
+    pool = ' '.join(corpus).split()
+    return ' '.join((pool * (words // len(pool) + 1))[:words])
+
+
+def record_runs(service, tasks: List[str], lengths: List[int], repeats: int,
+                corpus: List[str]) -> Tuple[List[Dict[str, Any]], Dict[str, Any]]:
+    """Run the real backend over texts of the given lengths and record each call"""
+    models = {}
+    for task in tasks:
+        name = TASK_MODELS[task]
+        rss_before = _current_rss()
+        start = time.perf_counter()
+        try:
+            getattr(service, name)
+            models[name] = {
+                'load_seconds': round(time.perf_counter() - start, 3),
+                'memory_mb': round(max(0, _current_rss() - rss_before) / (1024 * 1024), 1)
+            }
+            print(f"📥 {name}: {models[name]}")
+        except AttributeError:
+            print(f"⚠️ Backend has no '{name}' attribute; keeping the default load time and memory")
+
+    records = []
+    for task in tasks:
+        for words in lengths:
+            text = _texts_of_length(corpus, words)
+            for variations in ((1, 3) if task == 'paraphrase' else (1,)):
+                for _ in range(repeats):
+                    doc = Document(text)
+                    usage, token = accounting.start()
+                    if task == 'summarize':
+                        service.summarize(doc)
+                    elif task == 'paraphrase':
+                        service.paraphrase(doc, num_return_sequences=variations)
+                    else:
+                        service.analyze(doc)
+                    accounting.finish(usage, token)
+                    record = {
+                        'task': task, 'words': doc.word_count, 'chunks': usage.chunks or chunk_count(doc, task),
+                        'variations': variations, 'wall_seconds': usage.wall_seconds,
+                        'cpu_seconds': usage.cpu_seconds,
+                        'rss_delta_mb': max(usage.rss_delta_mb, usage.peak_memory_delta_mb),
+                        'tokens_in': usage.tokens_in
+                    }
+                    records.append(record)
+                    print(f"⏱️ {task} {words} words x{variations}: {usage.wall_seconds:.2f}s "
+                          f"(cpu {usage.cpu_seconds:.2f}s)")
+    return records, models
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    calibrate = commands.add_parser('calibrate', help='measure a real backend')
+    calibrate.add_argument('--backend', default='full', help='backend to measure (full, lite)')
+    calibrate.add_argument('--tasks', default=','.join(TASKS))
+    calibrate.add_argument('--lengths', default='50,200,800,1500,3000', help='input lengths in words')
+    calibrate.add_argument('--repeats', type=int, default=3)
+    calibrate.add_argument('--corpus', default=os.path.join(os.path.dirname(__file__), '..', '..', 'benchmarks',
+                                                            'corpus', 'summarization.jsonl'))
+    calibrate.add_argument('--records-out', help='also write the raw records (JSONL)')
+    calibrate.add_argument('--output', required=True)
+
+    fit_parser = commands.add_parser('fit', help='fit recorded runs')
+    fit_parser.add_argument('--records', required=True, help='JSONL records')
+    fit_parser.add_argument('--output', required=True)
+    args = parser.parse_args()
+
+    if args.command == 'calibrate':
+        tasks = [task.strip() for task in args.tasks.split(',') if task.strip()]
+        unknown = [task for task in tasks if task not in TASKS]
+        if unknown:
+            parser.error(f"unknown tasks: {', '.join(unknown)}")
+        with open(args.corpus) as f:
+            corpus = [json.loads(line)['text'] for line in f if line.strip()]
+        os.environ['TEXT_SERVICE_BACKEND'] = args.backend
+        # Measure the models themselves, not cache hits
+        os.environ['SIMILARITY_CACHE'] = 'false'
+        from app.services.registry import get_text_service
+        records, models = record_runs(get_text_service(), tasks,
+                                      [int(n) for n in args.lengths.split(',')], args.repeats, corpus)
+        if args.records_out:
+            with open(args.records_out, 'w') as f:
+                for record in records:
+                    f.write(json.dumps(record) + '\n')
+        calibration = fit(records, models)
+        calibration['backend'] = args.backend
+    else:
+        with open(args.records) as f:
+            records = [json.loads(line) for line in f if line.strip()]
+        calibration = fit(records)
+
+    with open(args.output, 'w') as f:
+        json.dump(calibration, f, indent=2)
+    print(f"✅ Wrote {args.output}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
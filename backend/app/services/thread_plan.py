@@ -0,0 +1,179 @@
+import math
+import os
+import sys
+import threading
+from dataclasses import dataclass, field, asdict
+from typing import Any, Dict, List, Optional
+
+_lock = threading.Lock()
+_plan = None
+_torch_configured = False
+# Settings an operator may pin, as they were before configure_threads wrote any of them
+OVERRIDE_VARIABLES = ('TORCH_NUM_THREADS', 'TORCH_INTEROP_THREADS', 'TOKENIZERS_PARALLELISM')
+_operator_env = None
+
+
+def _operator_setting(name: str) -> Optional[str]:
+    """The operator's value of an override variable. The environment is captured
+    on first use, so values written by configure_threads are never read back
+    as overrides when a forked worker plans again."""
+    global _operator_env
+    if _operator_env is None:
+        _operator_env = {variable: os.environ.get(variable) for variable in OVERRIDE_VARIABLES}
+    return _operator_env[name]
+
+
+def _cgroup_cpu_limit() -> Optional[float]:
+    """CPU quota from cgroup v2 (cpu.max) or v1 (cfs quota/period), None if unlimited"""
+    try:
+        with open('/sys/fs/cgroup/cpu.max') as f:
+            quota, period = f.read().split()[:2]
+        if quota != 'max':
+            return int(quota) / int(period)
+        return None
+    except (OSError, ValueError):
+        pass
+    try:
+        with open('/sys/fs/cgroup/cpu/cpu.cfs_quota_us') as f:
+            quota = int(f.read())
+        with open('/sys/fs/cgroup/cpu/cpu.cfs_period_us') as f:
+            period = int(f.read())
+        if quota > 0 and period > 0:
+            return quota / period
+    except (OSError, ValueError):
+        pass
+    return None
+
+
+def _allowed_cores() -> List[int]:
+    if hasattr(os, 'sched_getaffinity'):
+        return sorted(os.sched_getaffinity(0))
+    return list(range(os.cpu_count() or 1))
+
+
+def available_cpus() -> float:
+    """CPUs this process may actually use: affinity mask capped by the cgroup quota"""
+    override = os.getenv('CPU_COUNT')
+    if override:
+        return float(override)
+    cpus = float(len(_allowed_cores()))
+    quota = _cgroup_cpu_limit()
+    return min(cpus, quota) if quota else cpus
+
+
+def configured_workers() -> int:
+    """Worker processes sharing this host (gunicorn -w / WEB_CONCURRENCY)"""
+    return max(1, int(os.getenv('WEB_CONCURRENCY', os.getenv('GUNICORN_WORKERS', 1))))
+
+
+@dataclass
+class ThreadPlan:
+    """Threading layout for one worker process"""
+    cpus: float
+    workers: int
+    worker_index: Optional[int]
+    intra_op_threads: int
+    inter_op_threads: int
+    tokenizers_parallelism: bool
+    affinity: Optional[List[int]] = None
+    overrides: List[str] = field(default_factory=list)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+
+def plan_threads(workers: Optional[int] = None, worker_index: Optional[int] = None,
+                 cpus: Optional[float] = None) -> ThreadPlan:
+    """Split the available CPUs between worker processes without oversubscribing.
+
+    Each worker gets floor(cpus / workers) intra-op threads and a single
+    inter-op thread (generation runs one op graph at a time). Tokenizer
+    parallelism is only left on for a single worker with several cores. With
+    CPU_AFFINITY=true each worker is pinned to its own slice of cores.
+    TORCH_NUM_THREADS, TORCH_INTEROP_THREADS and TOKENIZERS_PARALLELISM
+    override the computed values.
+    """
+    workers = workers or configured_workers()
+    cpus = cpus or available_cpus()
+    per_worker = max(1, math.floor(cpus / workers))
+    overrides = []
+
+    intra_op_threads = per_worker
+    if _operator_setting('TORCH_NUM_THREADS'):
+        intra_op_threads = int(_operator_setting('TORCH_NUM_THREADS'))
+        overrides.append('TORCH_NUM_THREADS')
+
+    inter_op_threads = 1
+    if _operator_setting('TORCH_INTEROP_THREADS'):
+        inter_op_threads = int(_operator_setting('TORCH_INTEROP_THREADS'))
+        overrides.append('TORCH_INTEROP_THREADS')
+
+    tokenizers_parallelism = workers == 1 and per_worker > 1
+    if _operator_setting('TOKENIZERS_PARALLELISM'):
+        tokenizers_parallelism = _operator_setting('TOKENIZERS_PARALLELISM').lower() == 'true'
+        overrides.append('TOKENIZERS_PARALLELISM')
+
+    affinity = None
+    if os.getenv('CPU_AFFINITY', 'false').lower() == 'true' and worker_index is not None:
+        cores = _allowed_cores()
+        slices = max(1, len(cores) // per_worker)
+        start = (worker_index % slices) * per_worker
+        affinity = cores[start:start + per_worker]
+
+    return ThreadPlan(
+        cpus=round(cpus, 2),
+        workers=workers,
+        worker_index=worker_index,
+        intra_op_threads=intra_op_threads,
+        inter_op_threads=inter_op_threads,
+        tokenizers_parallelism=tokenizers_parallelism,
+        affinity=affinity,
+        overrides=overrides
+    )
+
+
+def configure_threads(workers: Optional[int] = None, worker_index: Optional[int] = None) -> ThreadPlan:
+    """Plan and apply threading for this process; call once per worker after fork"""
+    global _plan, _torch_configured
+    with _lock:
+        plan = plan_threads(workers, worker_index)
+        if plan.affinity and hasattr(os, 'sched_setaffinity'):
+            os.sched_setaffinity(0, plan.affinity)
+
+        # Read by OpenMP/MKL and tokenizers when they initialise
+        os.environ['OMP_NUM_THREADS'] = str(plan.intra_op_threads)
+        os.environ['MKL_NUM_THREADS'] = str(plan.intra_op_threads)
+        os.environ['TOKENIZERS_PARALLELISM'] = 'true' if plan.tokenizers_parallelism else 'false'
+
+        _plan = plan
+        _torch_configured = False
+    if 'torch' in sys.modules:
+        apply_torch_threads()
+    return plan
+
+
+def current_plan() -> ThreadPlan:
+    if _plan is None:
+        return configure_threads()
+    return _plan
+
+
+def apply_torch_threads():
+    """Apply the plan to torch; called wherever torch is first imported"""
+    global _torch_configured
+    if _torch_configured:
+        return
+    plan = current_plan()
+    import torch
+
+    with _lock:
+        if _torch_configured:
+            return
+        torch.set_num_threads(plan.intra_op_threads)
+        try:
+            torch.set_num_interop_threads(plan.inter_op_threads)
+        except RuntimeError:
+            # Only settable before the first parallel op ran in this process
+            print("⚠️ torch inter-op threads were already initialised; keeping the current value")
+        _torch_configured = True
+        print(f"🧵 torch threads: intra-op={plan.intra_op_threads}, inter-op={plan.inter_op_threads}")
@@ -0,0 +1 @@
+# Benchmark scripts; run from the backend directory with `python -m benchmarks.<name>`
@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+Cold-load time per model: hub cache versus the packaged model store.
+
+Every load runs in a fresh interpreter. "hub" loads the model by its hub
+name from the local Hugging Face cache, the way the services did before the
+model store (no network: HF_HUB_OFFLINE=1). "store" loads the packaged
+safetensors copy through the model store. The report shows the first load
+(the page cache may still be cold) and the median of the rest, the time to
+import torch/transformers, and the RSS after loading.
+
+    python -m app.services.model_store pack          # once
+    python -m benchmarks.cold_load --runs 5
+    python -m benchmarks.cold_load --models facebook/bart-large-cnn --sources store
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Runs in a fresh interpreter: import torch/transformers, then load one model
+LOAD_SNIPPET = """
+import json, sys, time
+start = time.perf_counter()
+import torch, transformers
+from app.services.model_manager import _current_rss
+from app.services.model_store import ModelStore, _model_class
+imported = time.perf_counter()
+repo, source = sys.argv[1], sys.argv[2]
+if source == 'store':
+    location, kwargs = ModelStore(offline=True).resolve(repo)
+else:
+    location, kwargs = repo, {'local_files_only': True}
+config = transformers.AutoConfig.from_pretrained(location, local_files_only=True)
+model = _model_class(config).from_pretrained(location, **kwargs)
+loaded = time.perf_counter()
+print(json.dumps({
+    'import_seconds': imported - start,
+    'load_seconds': loaded - imported,
+    'rss_mb': _current_rss() / (1024 * 1024),
+}))
+"""
+
+
+def load_once(repo: str, source: str) -> dict:
+    env = {**os.environ, 'HF_HUB_OFFLINE': '1', 'TRANSFORMERS_OFFLINE': '1'}
+    completed = subprocess.run(
+        [sys.executable, '-c', LOAD_SNIPPET, repo, source],
+        cwd=BACKEND_DIR, env=env, capture_output=True, text=True
+    )
+    if completed.returncode != 0:
+        raise RuntimeError(completed.stderr.strip().splitlines()[-1] if completed.stderr.strip() else 'load failed')
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+
+def measure(repo: str, source: str, runs: int) -> dict:
+    results = [load_once(repo, source) for _ in range(runs)]
+    rest = results[1:] or results
+    return {
+        'first_seconds': results[0]['load_seconds'],
+        'median_seconds': statistics.median(r['load_seconds'] for r in rest),
+        'import_seconds': statistics.median(r['import_seconds'] for r in results),
+        'rss_mb': statistics.median(r['rss_mb'] for r in results),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--models', default=None, help='comma-separated hub names (default: every packaged model)')
+    parser.add_argument('--sources', default='hub,store', help='comma-separated: hub, store')
+    parser.add_argument('--runs', type=int, default=3, help='loads per model and source')
+    parser.add_argument('--output', default=None, help='also write the results as JSON')
+    args = parser.parse_args()
+
+    from app.services.model_store import ModelStore
+
+    store = ModelStore(offline=False)
+    repos = [m.strip() for m in args.models.split(',') if m.strip()] if args.models else list(store.models)
+    if not repos:
+        print("❌ No models given and the model store is empty; run 'python -m app.services.model_store pack'")
+        return 1
+    sources = [s.strip() for s in args.sources.split(',') if s.strip()]
+
+    print(f"🚀 Cold-loading {len(repos)} models from {', '.join(sources)} ({args.runs} runs each)")
+    report = {}
+    for repo in repos:
+        report[repo] = {}
+        for source in sources:
+            try:
+                stats = measure(repo, source, max(1, args.runs))
+            except Exception as e:
+                print(f"   ⚠️ {repo} from {source}: {e}")
+                continue
+            report[repo][source] = stats
+            print(f"   {repo} [{source}]: first {stats['first_seconds']:.2f}s, median {stats['median_seconds']:.2f}s, "
+                  f"imports {stats['import_seconds']:.2f}s, RSS {stats['rss_mb']:.0f} MB")
+        if 'hub' in report[repo] and 'store' in report[repo] and report[repo]['store']['median_seconds']:
+            speedup = report[repo]['hub']['median_seconds'] / report[repo]['store']['median_seconds']
+            print(f"   {repo}: store loads {speedup:.2f}x as fast as the hub cache")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+    print("✅ Done")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""
+Compare eager and compiled execution (EXECUTION_MODE) for the full TextService.
+
+Each mode runs in a fresh process: the models for the selected tasks are
+loaded and warmed up (in compiled mode this is where torch.compile runs),
+then every task is timed on inputs of several lengths. The report shows
+warm-up/compile time, first-request latency and steady-state latency per
+mode, with the speedup over eager.
+
+    python -m benchmarks.execution_modes --tasks summarize,analyze --requests 5
+    python -m benchmarks.execution_modes --tiny      # tiny random models, quick check
+"""
+
+import argparse
+import multiprocessing
+import os
+import statistics
+import sys
+import time
+
+SAMPLE_TEXT = (
+    "The city council voted to expand its bike-sharing program to twelve new neighborhoods by next spring. "
+    "The expansion will add roughly 1,500 bicycles and 140 docking stations, nearly doubling the network. "
+    "Council members said the decision followed a year-long pilot in the eastern districts, where ridership "
+    "grew by 40 percent and surveys showed that most trips replaced short car journeys. The program will be "
+    "funded through advertising revenue, a state transportation grant and a small increase in membership fees. "
+)
+
+# Input lengths in words; they fall into different padding buckets
+LENGTHS = (40, 150, 400)
+
+TASK_MODELS = {
+    'summarize': 'summarizer',
+    'paraphrase': 'paraphraser',
+    'analyze': 'sentiment_analyzer',
+}
+
+
+def _text(words: int) -> str:
+    base = SAMPLE_TEXT.split()
+    return ' '.join((base * (words // len(base) + 1))[:words])
+
+
+def _call(service, task: str, text: str):
+    if task == 'summarize':
+        return service.summarize(text, max_length=60, min_length=10)
+    if task == 'paraphrase':
+        return service.paraphrase(' '.join(text.split()[:60]))
+    return service.analyze(text)
+
+
+def _run_mode(mode, tasks, requests, tiny, results):
+    os.environ['EXECUTION_MODE'] = mode
+    os.environ['EXECUTION_WARMUP'] = 'false'
+    os.environ.setdefault('HF_HUB_OFFLINE', '1')
+
+    from app.services.text_service import TextService
+
+    options = {}
+    if tiny:
+        options = {'summarization_model': 'sshleifer/bart-tiny-random',
+                   'paraphrase_model': 'patrickvonplaten/t5-tiny-random'}
+    service = TextService(**options)
+
+    row = {'mode': mode, 'tasks': {}}
+    for task in tasks:
+        start = time.perf_counter()
+        service.warmup([TASK_MODELS[task]])
+        warmup = time.perf_counter() - start
+
+        latencies = []
+        first = None
+        for words in LENGTHS:
+            for _ in range(requests):
+                start = time.perf_counter()
+                _call(service, task, _text(words))
+                elapsed = time.perf_counter() - start
+                first = elapsed if first is None else first
+                latencies.append(elapsed)
+
+        latencies.sort()
+        row['tasks'][task] = {
+            'warmup': warmup,
+            'first': first,
+            'mean': statistics.mean(latencies),
+            'p95': latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))],
+        }
+    row['execution'] = service.accelerator.status()
+    results.put(row)
+
+
+def run_mode(mode: str, tasks, requests: int, tiny: bool) -> dict:
+    context = multiprocessing.get_context('spawn')
+    results = context.Queue()
+    process = context.Process(target=_run_mode, args=(mode, tasks, requests, tiny, results))
+    process.start()
+    row = results.get()
+    process.join()
+    return row
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--modes', default='eager,compiled', help='comma-separated execution modes')
+    parser.add_argument('--tasks', default='summarize', help=f"comma-separated: {', '.join(TASK_MODELS)}")
+    parser.add_argument('--requests', type=int, default=3, help='requests per task and input length')
+    parser.add_argument('--tiny', action='store_true', help='use tiny random models')
+    args = parser.parse_args()
+
+    tasks = [task.strip() for task in args.tasks.split(',') if task.strip()]
+    unknown = [task for task in tasks if task not in TASK_MODELS]
+    if unknown:
+        parser.error(f"unknown task(s): {', '.join(unknown)}")
+
+    print(f"🚀 Benchmarking execution modes {args.modes} on {', '.join(tasks)} (input lengths {LENGTHS} words)")
+    rows = [run_mode(mode.strip(), tasks, args.requests, args.tiny) for mode in args.modes.split(',')]
+
+    baseline = rows[0]
+    for row in rows:
+        execution = row['execution']
+        print(f"   {row['mode']} (bf16 autocast: {execution['bf16_autocast']})")
+        for task, stats in row['tasks'].items():
+            speedup = baseline['tasks'][task]['mean'] / stats['mean'] if stats['mean'] else 0.0
+            print(f"      {task}: warm-up {stats['warmup']:.1f}s, first {stats['first']:.3f}s, "
+                  f"mean {stats['mean']:.3f}s, p95 {stats['p95']:.3f}s, {speedup:.2f}x vs {baseline['mode']}")
+
+    print("✅ Done")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
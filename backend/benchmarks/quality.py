@@ -0,0 +1,350 @@
+#!/usr/bin/env python3
+"""
+Quality-versus-speed regression harness for model and decoding changes.
+
+Runs TextService.summarize/paraphrase configurations over the bundled corpus
+(benchmarks/corpus) and reports ROUGE/overlap metrics, latency and peak
+memory per configuration, a Pareto table, and an accept/reject verdict for
+each configuration against the baseline. Every configuration runs in its own
+process with HF_HUB_OFFLINE=1, so models must already be in the local cache.
+
+    # all configurations in benchmarks/quality_configs.json
+    python -m benchmarks.quality
+
+    # the decoding presets (a configuration's "preset" is passed with every call)
+    python -m benchmarks.quality --only preset-fast,preset-quality --output presets.json
+
+    # CI: tiny random models, two documents, fail if a configuration is rejected
+    python -m benchmarks.quality --tiny --limit 2 --fail-on-reject
+"""
+
+import argparse
+import json
+import math
+import multiprocessing
+import os
+import queue
+import re
+import statistics
+import sys
+import time
+from collections import Counter
+from pathlib import Path
+
+BENCHMARK_DIR = Path(__file__).resolve().parent
+CORPUS_DIR = BENCHMARK_DIR / 'corpus'
+DEFAULT_CONFIGS = BENCHMARK_DIR / 'quality_configs.json'
+
+# Random-weight models of the production architectures; quality numbers are
+# meaningless but the whole pipeline runs in seconds
+TINY_MODELS = {
+    'summarization_model': 'sshleifer/bart-tiny-random',
+    'paraphrase_model': 'patrickvonplaten/t5-tiny-random',
+}
+
+METRICS = ('rouge1', 'rouge2', 'rougeL', 'paraphrase_rougeL', 'paraphrase_novelty')
+
+
+def load_jsonl(path: Path, limit: int = 0) -> list:
+    with open(path) as f:
+        items = [json.loads(line) for line in f if line.strip()]
+    return items[:limit] if limit else items
+
+
+def tokens(text: str) -> list:
+    return re.findall(r"[a-z0-9]+", text.lower())
+
+
+def _ngrams(words: list, n: int) -> Counter:
+    return Counter(tuple(words[i:i + n]) for i in range(len(words) - n + 1))
+
+
+def _f1(overlap: int, candidate_total: int, reference_total: int) -> float:
+    if not overlap or not candidate_total or not reference_total:
+        return 0.0
+    precision = overlap / candidate_total
+    recall = overlap / reference_total
+    return 2 * precision * recall / (precision + recall)
+
+
+def rouge_n(candidate: str, reference: str, n: int) -> float:
+    """ROUGE-N F1 over lowercased word n-grams"""
+    cand, ref = _ngrams(tokens(candidate), n), _ngrams(tokens(reference), n)
+    overlap = sum((cand & ref).values())
+    return _f1(overlap, sum(cand.values()), sum(ref.values()))
+
+
+def rouge_l(candidate: str, reference: str) -> float:
+    """ROUGE-L F1 from the longest common subsequence of words"""
+    cand, ref = tokens(candidate), tokens(reference)
+    if not cand or not ref:
+        return 0.0
+    previous = [0] * (len(ref) + 1)
+    for word in cand:
+        current = [0]
+        for j, ref_word in enumerate(ref):
+            current.append(previous[j] + 1 if word == ref_word else max(previous[j + 1], current[j]))
+        previous = current
+    return _f1(previous[-1], len(cand), len(ref))
+
+
+def novelty(candidate: str, source: str) -> float:
+    """Share of the candidate's word bigrams that do not appear in the source"""
+    cand = _ngrams(tokens(candidate), 2)
+    if not cand:
+        return 0.0
+    source_bigrams = _ngrams(tokens(source), 2)
+    return sum(count for gram, count in cand.items() if gram not in source_bigrams) / sum(cand.values())
+
+
+def _peak_rss_mb() -> float:
+    import resource
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+def _percentile(values: list, p: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p))] if values else 0.0
+
+
+def _run_config(config, summaries, paraphrases, backend, tiny, offline, results):
+    """Evaluate one configuration; runs in a fresh process so memory is per configuration"""
+    if offline:
+        os.environ['HF_HUB_OFFLINE'] = '1'
+        os.environ['TRANSFORMERS_OFFLINE'] = '1'
+    rss_before = _peak_rss_mb()
+
+    import importlib
+    import random
+    from app.services.registry import BACKENDS
+
+    options = dict(config.get('service', {}))
+    if tiny:
+        options.update(TINY_MODELS)
+    module = importlib.import_module(BACKENDS[backend])
+    # Only the full backend takes model and decoding options
+    service = module.TextService(**options) if backend == 'full' else module.TextService()
+
+    # Any backend takes a decoding preset
+    calls = {'preset': config['preset']} if config.get('preset') else {}
+    row = {'name': config['name'], 'errors': 0}
+    latencies = {'summarize': [], 'paraphrase': []}
+    scores = {metric: [] for metric in METRICS}
+    try:
+        # Load models before timing so latency is per call, not per cold start
+        if summaries:
+            service.summarize(summaries[0]['text'], max_length=80, min_length=20, **calls)
+        if paraphrases:
+            service.paraphrase(paraphrases[0]['text'], **calls)
+        random.seed(0)
+        if 'torch' in sys.modules:
+            sys.modules['torch'].manual_seed(0)
+
+        for item in summaries:
+            start = time.perf_counter()
+            try:
+                summary = service.summarize(item['text'], max_length=80, min_length=20, **calls)['summary']
+            except Exception as e:
+                print(f"⚠️ {config['name']}: summarize failed on {item['id']}: {e}")
+                row['errors'] += 1
+                continue
+            latencies['summarize'].append(time.perf_counter() - start)
+            scores['rouge1'].append(rouge_n(summary, item['reference'], 1))
+            scores['rouge2'].append(rouge_n(summary, item['reference'], 2))
+            scores['rougeL'].append(rouge_l(summary, item['reference']))
+
+        for item in paraphrases:
+            start = time.perf_counter()
+            try:
+                paraphrase = service.paraphrase(item['text'], **calls)['paraphrase']
+            except Exception as e:
+                print(f"⚠️ {config['name']}: paraphrase failed on {item['id']}: {e}")
+                row['errors'] += 1
+                continue
+            latencies['paraphrase'].append(time.perf_counter() - start)
+            scores['paraphrase_rougeL'].append(max(rouge_l(paraphrase, ref) for ref in item['references']))
+            scores['paraphrase_novelty'].append(novelty(paraphrase, item['text']))
+    except Exception as e:
+        print(f"❌ {config['name']}: {e}")
+        row['errors'] += 1
+
+    for metric, values in scores.items():
+        row[metric] = round(statistics.mean(values), 4) if values else None
+    for task, values in latencies.items():
+        row[f'{task}_latency_mean'] = round(statistics.mean(values), 3) if values else None
+        row[f'{task}_latency_p95'] = round(_percentile(values, 0.95), 3) if values else None
+    row['peak_memory_mb'] = round(_peak_rss_mb() - rss_before, 1)
+    results.put(row)
+
+
+def _error_row(name: str) -> dict:
+    row = {'name': name, 'errors': 1, 'peak_memory_mb': None}
+    row.update({metric: None for metric in METRICS})
+    for task in ('summarize', 'paraphrase'):
+        row[f'{task}_latency_mean'] = row[f'{task}_latency_p95'] = None
+    return row
+
+
+def run_config(config, summaries, paraphrases, backend, tiny, offline, timeout: float = 0) -> dict:
+    """Evaluate a configuration in a child process; a child that crashes, or runs
+    longer than timeout seconds (0 for no limit), gives an error row"""
+    context = multiprocessing.get_context('spawn')
+    results = context.Queue()
+    process = context.Process(target=_run_config,
+                              args=(config, summaries, paraphrases, backend, tiny, offline, results))
+    process.start()
+    deadline = time.monotonic() + timeout if timeout > 0 else math.inf
+    row = None
+    try:
+        while row is None:
+            try:
+                row = results.get(timeout=1)
+            except queue.Empty:
+                if not process.is_alive():
+                    # The row may have been flushed just before the child exited
+                    try:
+                        row = results.get(timeout=1)
+                    except queue.Empty:
+                        print(f"❌ {config['name']}: evaluation process exited with code {process.exitcode}")
+                        row = _error_row(config['name'])
+                elif time.monotonic() > deadline:
+                    print(f"❌ {config['name']}: evaluation timed out after {timeout:.0f}s")
+                    process.terminate()
+                    row = _error_row(config['name'])
+    except KeyboardInterrupt:
+        process.terminate()
+        raise
+    process.join()
+    return row
+
+
+def _value(row, key, default):
+    value = row.get(key)
+    return default if value is None else value
+
+
+def pareto_front(rows, metric: str) -> set:
+    """Names of configurations no other configuration beats on quality, latency and memory"""
+    def point(row):
+        return (_value(row, metric, 0.0), -_value(row, 'summarize_latency_mean', math.inf),
+                -_value(row, 'peak_memory_mb', math.inf))
+
+    front = set()
+    for row in rows:
+        mine = point(row)
+        dominated = any(
+            all(a >= b for a, b in zip(point(other), mine)) and point(other) != mine
+            for other in rows if other is not row
+        )
+        if not dominated and not row['errors']:
+            front.add(row['name'])
+    return front
+
+
+def _gain(row, baseline, key: str) -> float:
+    """Relative reduction in key against the baseline (0.1 is 10% lower)"""
+    before = _value(baseline, key, math.inf)
+    after = _value(row, key, math.inf)
+    if not before or math.isinf(before) or math.isinf(after):
+        return 0.0
+    return (before - after) / before
+
+
+def verdict(row, baseline, metric: str, max_quality_drop: float, min_gain: float = 0.05) -> str:
+    """Accept a configuration if it is at least min_gain faster or smaller (relative
+    to the baseline) at an acceptable quality cost"""
+    if row is baseline:
+        return 'baseline'
+    if row['errors']:
+        return 'reject (errors)'
+    drop = _value(baseline, metric, 0.0) - _value(row, metric, 0.0)
+    if drop > max_quality_drop:
+        return f'reject (-{drop:.3f} {metric})'
+    faster = _gain(row, baseline, 'summarize_latency_mean') >= min_gain
+    smaller = _gain(row, baseline, 'peak_memory_mb') >= min_gain
+    if not (faster or smaller):
+        return 'no gain'
+    return 'accept'
+
+
+def _fmt(value, spec):
+    return '-' if value is None else format(value, spec)
+
+
+def print_table(rows, front, verdicts):
+    header = (f"{'config':<20} {'R-1':>6} {'R-2':>6} {'R-L':>6} {'P-RL':>6} {'P-nov':>6} "
+              f"{'sum s':>7} {'p95':>7} {'para s':>7} {'mem MB':>8}  verdict")
+    print(header)
+    print('-' * len(header))
+    for row in rows:
+        marker = '*' if row['name'] in front else ' '
+        print(f"{marker}{row['name']:<19} {_fmt(row['rouge1'], '6.3f')} {_fmt(row['rouge2'], '6.3f')} "
+              f"{_fmt(row['rougeL'], '6.3f')} {_fmt(row['paraphrase_rougeL'], '6.3f')} "
+              f"{_fmt(row['paraphrase_novelty'], '6.3f')} {_fmt(row['summarize_latency_mean'], '7.3f')} "
+              f"{_fmt(row['summarize_latency_p95'], '7.3f')} {_fmt(row['paraphrase_latency_mean'], '7.3f')} "
+              f"{_fmt(row['peak_memory_mb'], '8.1f')}  {verdicts[row['name']]}")
+    print("* Pareto-optimal on quality, summarize latency and memory")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--configs', default=str(DEFAULT_CONFIGS), help='JSON list of configurations')
+    parser.add_argument('--only', help='comma-separated configuration names to run')
+    parser.add_argument('--baseline', default='baseline', help='configuration the others are judged against')
+    parser.add_argument('--metric', default='rougeL', choices=METRICS, help='quality metric for verdicts')
+    parser.add_argument('--max-quality-drop', type=float, default=0.01,
+                        help='largest acceptable absolute drop in the quality metric')
+    parser.add_argument('--min-gain', type=float, default=0.05,
+                        help='smallest relative latency or memory reduction that counts as a gain')
+    parser.add_argument('--timeout', type=float, default=0,
+                        help='seconds allowed per configuration (0 for no limit)')
+    parser.add_argument('--limit', type=int, default=0, help='only use the first N corpus items per task')
+    parser.add_argument('--backend', default='full', choices=('full', 'lite', 'mock'),
+                        help='TextService backend; only full applies the configuration options')
+    parser.add_argument('--tiny', action='store_true', help='use tiny random models (CI smoke run)')
+    parser.add_argument('--allow-download', action='store_true', help='do not force offline mode')
+    parser.add_argument('--output', help='write the result rows to this JSON file')
+    parser.add_argument('--fail-on-reject', action='store_true', help='exit 1 if any configuration is rejected')
+    args = parser.parse_args()
+
+    with open(args.configs) as f:
+        configs = json.load(f)
+    if args.only:
+        wanted = {name.strip() for name in args.only.split(',')} | {args.baseline}
+        configs = [config for config in configs if config['name'] in wanted]
+    if not any(config['name'] == args.baseline for config in configs):
+        parser.error(f"baseline configuration '{args.baseline}' not found")
+
+    summaries = load_jsonl(CORPUS_DIR / 'summarization.jsonl', args.limit)
+    paraphrases = load_jsonl(CORPUS_DIR / 'paraphrase.jsonl', args.limit)
+    print(f"🚀 Evaluating {len(configs)} configurations on {len(summaries)} summarization and "
+          f"{len(paraphrases)} paraphrase items ({args.backend} backend{', tiny models' if args.tiny else ''})")
+
+    rows = []
+    for config in configs:
+        print(f"   ⏱️ {config['name']}: {config.get('description', '')}")
+        rows.append(run_config(config, summaries, paraphrases, args.backend, args.tiny, not args.allow_download,
+                               args.timeout))
+
+    baseline = next(row for row in rows if row['name'] == args.baseline)
+    verdicts = {row['name']: verdict(row, baseline, args.metric, args.max_quality_drop, args.min_gain)
+                for row in rows}
+    print()
+    print_table(rows, pareto_front(rows, args.metric), verdicts)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump([{**row, 'verdict': verdicts[row['name']]} for row in rows], f, indent=2)
+        print(f"📊 Results written to {args.output}")
+
+    if args.fail_on_reject and any(v.startswith('reject') for v in verdicts.values()):
+        print("❌ At least one configuration was rejected")
+        return 1
+    print("✅ Evaluation complete")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+"""
+Benchmark the near-duplicate similarity cache.
+
+Accuracy: every corpus document is stored, then looked up again after
+whitespace changes, URL tracking parameters, an appended signature line and
+small word edits (should hit) and as the other documents (should miss).
+
+Scale: the index is filled with --entries synthetic signatures, then
+near-duplicate and unrelated lookups are timed and the index memory is
+reported. Signature cost per document length is reported as well.
+
+    python -m benchmarks.similarity_cache --entries 1000000
+"""
+
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import time
+from array import array
+from pathlib import Path
+
+from app.services.model_manager import _current_rss
+from app.services.similarity_cache import NUM_PERMUTATIONS, SimilarityCache, SimilarityIndex
+
+CORPUS = Path(__file__).resolve().parent / 'corpus' / 'summarization.jsonl'
+
+
+def _variants(text: str, rng: random.Random) -> dict:
+    words = text.split()
+    edited = list(words)
+    for _ in range(2):
+        edited[rng.randrange(len(edited))] = 'revised'
+    return {
+        'whitespace': '  '.join(words).replace('. ', '.\n\n'),
+        'tracking': text + ' Source: https://news.example.com/article?utm_source=feed&utm_medium=rss',
+        'signature': text + '\n\n-- \nSent from my phone',
+        'two edits': ' '.join(edited),
+    }
+
+
+def accuracy(threshold: float) -> None:
+    with open(CORPUS) as f:
+        docs = [json.loads(line)['text'] for line in f if line.strip()]
+    rng = random.Random(0)
+    cache = SimilarityCache(max_entries=len(docs), threshold=threshold)
+    for i, doc in enumerate(docs):
+        cache.store(cache.signature(doc), 'analyze', i)
+
+    hits = {}
+    for i, doc in enumerate(docs):
+        for name, variant in _variants(doc, rng).items():
+            found = cache.lookup(cache.signature(variant), 'analyze')
+            hits.setdefault(name, []).append(found is not None and found[0] == i)
+
+    false_hits = 0
+    probe = SimilarityCache(max_entries=1, threshold=threshold)
+    for i, doc in enumerate(docs):
+        probe.store(probe.signature(doc), 'analyze', i)
+        false_hits += sum(probe.lookup(probe.signature(other), 'analyze') is not None
+                          for j, other in enumerate(docs) if j != i)
+    pairs = len(docs) * (len(docs) - 1)
+
+    print(f"🎯 Accuracy at threshold {threshold} over {len(docs)} documents")
+    for name, results in hits.items():
+        print(f"   {name}: {sum(results)}/{len(results)} found")
+    print(f"   unrelated documents: {false_hits}/{pairs} false matches")
+
+
+def _perturbed(signature: array, rng: random.Random, share: float) -> array:
+    copy = array('I', signature)
+    for position in rng.sample(range(len(copy)), int(len(copy) * share)):
+        copy[position] = rng.getrandbits(32)
+    return copy
+
+
+def _timed_lookups(index: SimilarityIndex, queries) -> list:
+    latencies = []
+    for query in queries:
+        start = time.perf_counter()
+        index.get(query, 'summarize')
+        latencies.append(time.perf_counter() - start)
+    latencies.sort()
+    return latencies
+
+
+def scale(entries: int, lookups: int, threshold: float) -> None:
+    rng = random.Random(1)
+    index = SimilarityIndex(max_entries=entries, threshold=threshold)
+    rss_before = _current_rss()
+
+    start = time.perf_counter()
+    stored = []
+    for i in range(entries):
+        signature = array('I')
+        signature.frombytes(os.urandom(4 * NUM_PERMUTATIONS))
+        index.put(signature, 'summarize', i)
+        if i % max(1, entries // lookups) == 0:
+            stored.append(signature)
+    insert_seconds = time.perf_counter() - start
+    memory_mb = (_current_rss() - rss_before) / (1024 * 1024)
+
+    near = [_perturbed(signature, rng, 1 - threshold - 0.05) for signature in stored[:lookups]]
+    unrelated = []
+    for _ in range(lookups):
+        signature = array('I')
+        signature.frombytes(os.urandom(4 * NUM_PERMUTATIONS))
+        unrelated.append(signature)
+
+    hit_latencies = _timed_lookups(index, near)
+    miss_latencies = _timed_lookups(index, unrelated)
+    found = index.hits
+
+    print(f"📦 Index with {len(index)} entries: {insert_seconds:.1f}s to build "
+          f"({len(index) / insert_seconds:.0f} inserts/s), ~{memory_mb:.0f} MB "
+          f"({memory_mb * 1024 * 1024 / max(1, len(index)):.0f} bytes/entry)")
+    for name, latencies in (('near-duplicate', hit_latencies), ('unrelated', miss_latencies)):
+        print(f"   {name} lookups: p50 {statistics.median(latencies) * 1e6:.1f}µs, "
+              f"p99 {latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))] * 1e6:.1f}µs")
+    print(f"   near-duplicates found: {found}/{len(near)}")
+
+
+def signature_cost() -> None:
+    cache = SimilarityCache(max_entries=1)
+    with open(CORPUS) as f:
+        words = ' '.join(json.loads(line)['text'] for line in f if line.strip()).split()
+    print("✍️ Signature cost")
+    for length in (100, 800, 5000):
+        text = ' '.join((words * (length // len(words) + 1))[:length])
+        start = time.perf_counter()
+        for _ in range(5):
+            cache.signature(text)
+        print(f"   {length} words: {(time.perf_counter() - start) / 5 * 1000:.1f}ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--entries', type=int, default=1000000, help='synthetic entries for the scale test')
+    parser.add_argument('--lookups', type=int, default=2000, help='timed lookups of each kind')
+    parser.add_argument('--threshold', type=float, default=float(os.getenv('SIMILARITY_THRESHOLD', 0.85)))
+    args = parser.parse_args()
+
+    accuracy(args.threshold)
+    signature_cost()
+    scale(args.entries, args.lookups, args.threshold)
+    print("✅ Done")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+Cold start benchmark and import-time profile for the Rephrasely API.
+
+    python -m benchmarks.startup              # measure; exit 1 if cold start regressed
+    python -m benchmarks.startup --profile    # show the slowest imports (python -X importtime)
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BUDGET_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'startup_budget.json')
+
+# Runs in a fresh interpreter: import the app, create it and serve one request
+STARTUP_SNIPPET = """
+import json, sys, time
+start = time.perf_counter()
+from app import create_app
+imported = time.perf_counter()
+app = create_app()
+created = time.perf_counter()
+app.test_client().get('/health')
+served = time.perf_counter()
+heavy = sorted(m for m in ('torch', 'transformers', 'nltk', 'textstat') if m in sys.modules)
+print(json.dumps({
+    'import_seconds': imported - start,
+    'create_app_seconds': created - imported,
+    'first_request_seconds': served - created,
+    'heavy_modules': heavy,
+}))
+"""
+
+
+def run_once() -> dict:
+    """Start a fresh interpreter and measure its cold start"""
+    start = time.perf_counter()
+    output = subprocess.run(
+        [sys.executable, '-c', STARTUP_SNIPPET],
+        cwd=BACKEND_DIR, capture_output=True, text=True, check=True
+    ).stdout
+    total = time.perf_counter() - start
+    result = json.loads(output.strip().splitlines()[-1])
+    result['process_seconds'] = total
+    return result
+
+
+def profile_imports(top: int):
+    """Print the imports with the largest cumulative time"""
+    stderr = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', 'from app import create_app; create_app()'],
+        cwd=BACKEND_DIR, capture_output=True, text=True, check=True
+    ).stderr
+
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|', 2)
+        rows.append((int(cumulative_us), int(self_us), name.rstrip()))
+
+    rows.sort(reverse=True)
+    print(f"{'cumulative ms':>14} {'self ms':>9}  module")
+    for cumulative_us, self_us, name in rows[:top]:
+        print(f"{cumulative_us / 1000:>14.1f} {self_us / 1000:>9.1f}  {name}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--profile', action='store_true', help='show an import-time profile instead')
+    parser.add_argument('--top', type=int, default=25, help='rows to show in the profile')
+    parser.add_argument('--runs', type=int, default=5, help='cold starts to measure')
+    args = parser.parse_args()
+
+    if args.profile:
+        profile_imports(args.top)
+        return 0
+
+    with open(BUDGET_FILE) as f:
+        budget = json.load(f)
+
+    print(f"🚀 Measuring {args.runs} cold starts...")
+    runs = [run_once() for _ in range(args.runs)]
+    median = {
+        key: statistics.median(run[key] for run in runs)
+        for key in ('process_seconds', 'import_seconds', 'create_app_seconds', 'first_request_seconds')
+    }
+    for key, value in median.items():
+        limit = budget.get(f'max_{key}')
+        suffix = f" (budget {limit:.2f}s)" if limit is not None else ''
+        print(f"⏱️ {key}: {value:.3f}s{suffix}")
+
+    failures = []
+    for key, value in median.items():
+        limit = budget.get(f'max_{key}')
+        if limit is not None and value > limit:
+            failures.append(f"{key} {value:.3f}s exceeds budget {limit:.2f}s")
+
+    heavy = sorted(set(m for run in runs for m in run['heavy_modules']))
+    forbidden = sorted(set(heavy) & set(budget.get('forbidden_modules', [])))
+    if forbidden:
+        failures.append(f"heavy modules imported at startup: {', '.join(forbidden)}")
+
+    if failures:
+        for failure in failures:
+            print(f"❌ {failure}")
+        return 1
+
+    print("✅ Cold start within budget")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
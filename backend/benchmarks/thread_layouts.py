@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+Compare summarization throughput across worker/thread layouts.
+
+Each layout 'WxT' starts W worker processes with T torch threads each; all
+workers summarize the same text concurrently and the script reports
+throughput and latency per layout.
+
+    python -m benchmarks.thread_layouts --layouts 1x4,2x2,4x1 --requests 8
+"""
+
+import argparse
+import multiprocessing
+import os
+import statistics
+import sys
+import time
+
+SAMPLE_TEXT = (
+    "Artificial intelligence has emerged as one of the most transformative technologies of the "
+    "21st century, reshaping how we work, communicate and solve complex problems. Machine learning "
+    "systems analyze vast datasets and identify patterns that would be impossible for humans to "
+    "detect manually. In healthcare, models can find early signs of disease in medical images, "
+    "while in finance, algorithmic systems process millions of transactions per second. These "
+    "advances raise questions about privacy, bias and accountability that society must address. "
+) * 6
+
+
+def _worker(index, workers, threads, backend, requests, barrier, results):
+    os.environ['TEXT_SERVICE_BACKEND'] = backend
+    os.environ['TORCH_NUM_THREADS'] = str(threads)
+    os.environ['CPU_AFFINITY'] = os.getenv('CPU_AFFINITY', 'false')
+
+    from app.services.thread_plan import configure_threads
+    from app.services.registry import get_text_service
+
+    configure_threads(workers=workers, worker_index=index)
+    service = get_text_service()
+    service.summarize(SAMPLE_TEXT, max_length=80, min_length=30)  # warm-up and model load
+
+    barrier.wait()
+    latencies = []
+    for _ in range(requests):
+        start = time.perf_counter()
+        service.summarize(SAMPLE_TEXT, max_length=80, min_length=30)
+        latencies.append(time.perf_counter() - start)
+    results.put(latencies)
+
+
+def run_layout(workers: int, threads: int, backend: str, requests: int) -> dict:
+    context = multiprocessing.get_context('spawn')
+    barrier = context.Barrier(workers + 1)
+    results = context.Queue()
+    processes = [
+        context.Process(target=_worker, args=(i, workers, threads, backend, requests, barrier, results))
+        for i in range(workers)
+    ]
+    for process in processes:
+        process.start()
+
+    barrier.wait()
+    start = time.perf_counter()
+    latencies = []
+    for _ in processes:
+        latencies.extend(results.get())
+    elapsed = time.perf_counter() - start
+    for process in processes:
+        process.join()
+
+    latencies.sort()
+    return {
+        'layout': f'{workers}x{threads}',
+        'throughput': len(latencies) / elapsed,
+        'p50': statistics.median(latencies),
+        'p99': latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--layouts', default='1x4,2x2,4x1',
+                        help='comma-separated WORKERSxTHREADS layouts')
+    parser.add_argument('--requests', type=int, default=8, help='requests per worker')
+    parser.add_argument('--backend', default='full', help='TextService backend (full, lite, mock)')
+    args = parser.parse_args()
+
+    print(f"🚀 Benchmarking layouts {args.layouts} on the {args.backend} backend")
+    rows = []
+    for layout in args.layouts.split(','):
+        workers, threads = (int(part) for part in layout.lower().split('x'))
+        rows.append(run_layout(workers, threads, args.backend, args.requests))
+        row = rows[-1]
+        print(f"   {row['layout']}: {row['throughput']:.2f} req/s, p50 {row['p50']:.2f}s, p99 {row['p99']:.2f}s")
+
+    best = max(rows, key=lambda row: row['throughput'])
+    print(f"✅ Highest throughput: {best['layout']} ({best['throughput']:.2f} req/s)")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,15 @@
+# Gunicorn settings for the Rephrasely API: gunicorn run:app
+import os
+
+bind = f"{os.getenv('API_HOST', '0.0.0.0')}:{os.getenv('API_PORT', 5000)}"
+workers = int(os.getenv('WEB_CONCURRENCY', 4))
+timeout = int(os.getenv('GUNICORN_TIMEOUT', 120))
+
+
+def post_fork(server, worker):
+    """Give each worker its share of the CPUs before any model is loaded"""
+    from app.services.thread_plan import configure_threads
+
+    plan = configure_threads(workers=server.cfg.workers, worker_index=(worker.age - 1) % server.cfg.workers)
+    server.log.info(f"Worker {worker.pid}: {plan.intra_op_threads} intra-op threads, "
+                    f"affinity={plan.affinity or 'all'}")
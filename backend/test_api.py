@@ -122,6 +122,53 @@ def test_analysis():
     except requests.exceptions.RequestException as e:
         print(f"❌ Request failed: {e}")
 
+def test_process():
+    """Test the combined processing endpoint"""
+    print("\n🧪 Testing Combined Processing API...")
+    
+    data = {
+        "text": LONG_TEXT,
+        "tasks": ["summarize", "analyze"],
+        "max_length": 100,
+        "min_length": 50
+    }
+    
+    try:
+        response = requests.post(
+            f"{BASE_URL}/process",
+            json=data,
+            headers={"Content-Type": "application/json"},
+            timeout=60
+        )
+        
+        if response.status_code == 200:
+            result = response.json()
+            print("✅ Combined processing successful!")
+            for task, seconds in result.get('timings', {}).items():
+                print(f"⏱️ {task}: {seconds}s")
+            print(f"⏱️ Total: {result.get('processing_time', 'N/A')}s "
+                  f"(sequential would be {result.get('sequential_time', 'N/A')}s)")
+        else:
+            print(f"❌ Error: {response.status_code}")
+            print(f"Response: {response.text}")
+            
+    except requests.exceptions.RequestException as e:
+        print(f"❌ Request failed: {e}")
+
+def test_streamed_chunking():
+    """Chunking text as it arrives must match chunking the whole body"""
+    print("\n🧪 Testing streamed chunking...")
+    from app.services.chunker import chunk_text, normalize_text, sentence_spans, stream_chunks
+
+    text = LONG_TEXT + ' He said "Stop." Then Dr. Smith left the U.S. at 5 p.m. (finally.) Done!'
+    normalized = normalize_text(text)
+    for size in (1, 2, 3, 7, 64, len(text)):
+        chunker = stream_chunks([text[i:i + size] for i in range(0, len(text), size)], max_words=40)
+        assert chunker.text == normalized
+        assert chunker.sentences == sentence_spans(normalized)
+        assert chunker.chunks == chunk_text(normalized, 40)
+    print(f"✅ {len(chunker.sentences)} sentences, {len(chunker.chunks)} chunks match at every fragment size")
+
 if __name__ == "__main__":
     print("🚀 Starting Rephrasely API Tests")
     print(f"📏 Test text length: {len(LONG_TEXT)} characters (~{len(LONG_TEXT.split())} words)")
@@ -131,6 +178,8 @@ if __name__ == "__main__":
     test_summarization()
     test_paraphrasing()
     test_analysis()
+    test_process()
+    test_streamed_chunking()
     
     print("\n" + "=" * 50)
     print("🏁 Tests completed!")
\ No newline at end of file